@@ -0,0 +1,133 @@
+# benchmark_features.py
+
+"""
+Benchmarks for the vectorized market-structure features in utils/feature_engineer.
+swings       : detect_bos (swing highs/lows via utils.feature_engineer._swing_points)
+order_blocks : detect_order_blocks + detect_breaker_blocks (via _order_blocks)
+Each section times the vectorized version on BENCH_ROWS synthetic M15 bars and the
+original per-row df.loc loops (kept below as the reference) on the first LOOP_ROWS bars,
+extrapolated to BENCH_ROWS, and checks both produce identical columns on those bars.
+
+Usage:
+    python benchmark_features.py [swings] [order_blocks] [ROWS]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.feature_engineer import detect_bos, detect_breaker_blocks, detect_order_blocks
+
+BENCH_ROWS = 500_000
+LOOP_ROWS = 5_000
+SWING_COLUMNS = ["Swing_High", "Swing_Low", "Prev_Swing_High", "Prev_Swing_Low"]
+ORDER_BLOCK_COLUMNS = ["Bullish_OB", "Bearish_OB", "OB_Low", "OB_High", "OB_Mitigated", "Breaker_Block"]
+
+
+# === Reference loops (the implementation before vectorization) ===
+def loop_detect_bos(df):
+    df['Swing_High'] = np.nan
+    df['Swing_Low'] = np.nan
+    for i in range(5, len(df)-5):
+        if df.loc[i, 'High'] > max(df.loc[i-5:i-1, 'High']) and df.loc[i, 'High'] > max(df.loc[i+1:i+5, 'High']):
+            df.loc[i, 'Swing_High'] = df.loc[i, 'High']
+        if df.loc[i, 'Low'] < min(df.loc[i-5:i-1, 'Low']) and df.loc[i, 'Low'] < min(df.loc[i+1:i+5, 'Low']):
+            df.loc[i, 'Swing_Low'] = df.loc[i, 'Low']
+    df['Prev_Swing_High'] = df['Swing_High'].ffill().shift(1)
+    df['Prev_Swing_Low'] = df['Swing_Low'].ffill().shift(1)
+    df['Prev_Highs'] = df['High'].rolling(window=20).max().shift(1)
+    df['Prev_Lows'] = df['Low'].rolling(window=20).min().shift(1)
+    return df
+
+def loop_detect_order_blocks(df):
+    df['Bullish_OB'] = 0
+    df['Bearish_OB'] = 0
+    df['OB_Low'] = np.nan
+    df['OB_High'] = np.nan
+    for i in range(len(df) - 5):
+        body = abs(df.loc[i, 'Close'] - df.loc[i, 'Open'])
+        rng = df.loc[i, 'High'] - df.loc[i, 'Low']
+        if rng == 0 or (body / rng) < 0.6:
+            continue
+        if df.loc[i, 'Close'] < df.loc[i, 'Open'] and df.loc[i+1:i+5, 'High'].max() > df.loc[i, 'High']:
+            df.loc[i, 'Bullish_OB'] = 1
+            df.loc[i, 'OB_Low'] = df.loc[i, 'Low']
+            df.loc[i, 'OB_High'] = df.loc[i, 'High']
+        if df.loc[i, 'Close'] > df.loc[i, 'Open'] and df.loc[i+1:i+5, 'Low'].min() < df.loc[i, 'Low']:
+            df.loc[i, 'Bearish_OB'] = 1
+            df.loc[i, 'OB_Low'] = df.loc[i, 'Low']
+            df.loc[i, 'OB_High'] = df.loc[i, 'High']
+    df['OB_Mitigated'] = 0
+    for i in range(1, len(df)):
+        if df.loc[i, 'Bullish_OB'] == 0 and df.loc[i, 'Low'] <= df.loc[i - 1, 'OB_High'] and df.loc[i - 1, 'Bullish_OB'] == 1:
+            df.loc[i, 'OB_Mitigated'] = 1
+        elif df.loc[i, 'Bearish_OB'] == 0 and df.loc[i, 'High'] >= df.loc[i - 1, 'OB_Low'] and df.loc[i - 1, 'Bearish_OB'] == 1:
+            df.loc[i, 'OB_Mitigated'] = 1
+    return df
+
+def loop_detect_breaker_blocks(df):
+    df['Breaker_Block'] = 0
+    for i in range(1, len(df)):
+        if df.loc[i-1, 'Bullish_OB'] == 1 and df.loc[i, 'Close'] < df.loc[i-1, 'OB_Low']:
+            df.loc[i, 'Breaker_Block'] = 1
+        elif df.loc[i-1, 'Bearish_OB'] == 1 and df.loc[i, 'Close'] > df.loc[i-1, 'OB_High']:
+            df.loc[i, 'Breaker_Block'] = 1
+    return df
+
+
+# === Benchmarks ===
+def synthetic_bars(rows: int, seed: int = 0, tick: float = 1.0) -> pd.DataFrame:
+    """Random-walk M15 OHLCV bars; prices are rounded to `tick` so equal highs/lows (ties) occur."""
+    rng = np.random.default_rng(seed)
+    close = np.round((30000 + np.cumsum(rng.normal(0, 40, rows))) / tick) * tick
+    open_ = np.round((np.r_[close[:1], close[:-1]] + rng.normal(0, 5, rows)) / tick) * tick
+    wicks = np.round(rng.exponential(15, (2, rows)) / tick) * tick
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + wicks[0],
+        "Low": np.minimum(open_, close) - wicks[1],
+        "Close": close,
+        "Volume": rng.integers(1, 1000, rows).astype(float),
+    })
+
+def _run(label, fast, slow, columns, rows):
+    bars = synthetic_bars(rows)
+    start = time.perf_counter()
+    fast(bars.copy())
+    fast_secs = time.perf_counter() - start
+
+    sample = bars.iloc[:min(LOOP_ROWS, rows)]
+    start = time.perf_counter()
+    expected = slow(sample.copy())
+    slow_secs = (time.perf_counter() - start) * rows / len(sample)
+    same = expected[columns].equals(fast(sample.copy())[columns])
+    print(f" {label:<12} {rows:>8,} rows: vectorized {fast_secs:8.3f}s | loop ~{slow_secs:9.1f}s "
+          f"(extrapolated from {len(sample):,}) | x{slow_secs / fast_secs:7.0f} | identical: {same}")
+    return same
+
+def bench_swings(rows):
+    return _run("detect_bos", detect_bos, loop_detect_bos, SWING_COLUMNS, rows)
+
+def bench_order_blocks(rows):
+    return _run("order_blocks", lambda df: detect_breaker_blocks(detect_order_blocks(df)),
+                lambda df: loop_detect_breaker_blocks(loop_detect_order_blocks(df)), ORDER_BLOCK_COLUMNS, rows)
+
+BENCHMARKS = {"swings": bench_swings, "order_blocks": bench_order_blocks}
+
+def main(argv):
+    names = [a for a in argv[1:] if not a.isdigit()] or list(BENCHMARKS)
+    rows = next((int(a) for a in argv[1:] if a.isdigit()), BENCH_ROWS)
+    ok = True
+    for name in names:
+        if name not in BENCHMARKS:
+            print(__doc__)
+            return 1
+        print(f"=== {name} ===")
+        ok = BENCHMARKS[name](rows) and ok
+    print(" Outputs are identical." if ok else " Outputs differ!")
+    return 0 if ok else 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
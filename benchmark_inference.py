@@ -0,0 +1,183 @@
+# benchmark_inference.py
+
+"""
+Microbenchmarks for the live inference path in utils/newpredict.
+keras : Keras model.predict() vs the traced tf.function path (INFERENCE_MODE="compiled")
+        for a single row and a 64-row batch, plus the largest probability difference.
+numpy : exported NumPy runtime (utils/numpy_runtime, INFERENCE_MODE="numpy") vs the
+        compiled Keras path; needs the .npz exports next to the .keras models.
+xgboost : Booster.predict(DMatrix(frame)) (the old XGBWrapper path) vs inplace_predict on a
+        contiguous float32 array (the current one) for 1 and 10k rows.
+trees : xgboost inplace_predict vs the NumPy tree evaluator (utils/tree_runtime, XGB_BACKEND=numpy)
+        for 1, 8 and 10k rows, plus the exactness check against Booster.predict.
+scale : `frame[rfe_features]` + StandardScaler.transform + DataFrame (the old path) vs the fused
+        select+scale stage (utils/fused_scaler) for the last row of a 200-row frame and 4096 rows.
+batch : newpredict.predict_batch over a year of M15 rows (~35k) vs scoring rows one at a
+        time (timed on the first LOOP_ROWS and extrapolated), plus the largest difference.
+
+Usage:
+    python benchmark_inference.py [keras] [numpy] [xgboost] [trees] [scale] [batch]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+TOLERANCE = 1e-5
+YEAR_OF_M15_BARS = 365 * 96
+LOOP_ROWS = 200
+
+
+def time_call(func, repeats):
+    """Median seconds per call after one warm-up call."""
+    func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+def bench_keras():
+    from utils import newpredict
+
+    rng = np.random.default_rng(0)
+    n_features = len(newpredict.rfe_features)
+    ok = True
+    for rows, repeats in ((1, 200), (64, 50)):
+        X = rng.standard_normal((rows, n_features)).astype(np.float32)  # already-scaled inputs
+        for name, model, infer in (("transformer", newpredict.transformer_model, newpredict.transformer_infer),
+                                   ("nbeats", newpredict.nbeats_model, newpredict.nbeats_infer)):
+            slow = time_call(lambda: newpredict.run_model(model, infer, X, "predict"), repeats)
+            fast = time_call(lambda: newpredict.run_model(model, infer, X, "compiled"), repeats)
+            diff = np.abs(newpredict.run_model(model, infer, X, "predict") -
+                          newpredict.run_model(model, infer, X, "compiled")).max()
+            ok = ok and diff <= TOLERANCE
+            print(f" {name:<11} {rows:>3} row(s): predict {slow * 1e3:8.3f}ms | compiled {fast * 1e3:8.3f}ms "
+                  f"| x{slow / fast:5.1f} | max |diff| {diff:.2e}")
+    return ok
+
+def bench_numpy():
+    from utils import newpredict
+    from utils.numpy_runtime import NumpyModel
+
+    rng = np.random.default_rng(0)
+    n_features = len(newpredict.rfe_features)
+    ok = True
+    for rows, repeats in ((1, 200), (64, 50)):
+        X = rng.standard_normal((rows, n_features)).astype(np.float32)
+        for name, model, infer, npz_path in (
+                ("transformer", newpredict.transformer_model, newpredict.transformer_infer, newpredict.TRANSFORMER_NPZ_PATH),
+                ("nbeats", newpredict.nbeats_model, newpredict.nbeats_infer, newpredict.NBEATS_NPZ_PATH)):
+            exported = NumpyModel.load(npz_path)
+            keras_time = time_call(lambda: newpredict.run_model(model, infer, X, "compiled"), repeats)
+            numpy_time = time_call(lambda: exported.predict(X), repeats)
+            diff = np.abs(newpredict.run_model(model, infer, X, "compiled") - exported.predict(X)).max()
+            ok = ok and diff <= TOLERANCE
+            print(f" {name:<11} {rows:>3} row(s): compiled {keras_time * 1e3:8.3f}ms | numpy {numpy_time * 1e3:8.3f}ms "
+                  f"| x{keras_time / numpy_time:5.1f} | max |diff| {diff:.2e}")
+    return ok
+
+def bench_xgboost():
+    import pandas as pd
+    import xgboost as xgb
+    from utils import newpredict
+
+    rng = np.random.default_rng(0)
+    features = newpredict.rfe_features
+    booster, wrapper = newpredict.xgb_booster, newpredict.xgb_wrapper
+    ok = True
+    for rows, repeats in ((1, 500), (10_000, 10)):
+        scaled = pd.DataFrame(rng.standard_normal((rows, len(features))), columns=features)
+        before = time_call(lambda: booster.predict(xgb.DMatrix(scaled)), repeats)
+        after = time_call(lambda: wrapper.predict_proba(scaled), repeats)
+        diff = np.abs(booster.predict(xgb.DMatrix(scaled)) - wrapper.predict_proba(scaled)).max()
+        ok = ok and diff <= TOLERANCE
+        print(f" xgboost {rows:>6} row(s): DMatrix {before * 1e3:8.3f}ms | inplace {after * 1e3:8.3f}ms "
+              f"| x{before / after:5.1f} | max |diff| {diff:.2e}")
+    return ok
+
+def bench_trees():
+    import xgboost as xgb
+    from utils import newpredict
+    from utils.tree_runtime import NumpyTreeEnsemble, check_exactness, exactness_inputs
+
+    booster = xgb.Booster()
+    booster.load_model(newpredict.XGB_PATH)
+    trees = NumpyTreeEnsemble.load(newpredict.XGB_PATH)
+    rng = np.random.default_rng(0)
+    for rows, repeats in ((1, 500), (8, 200), (10_000, 5)):
+        X = rng.standard_normal((rows, trees.num_features)).astype(np.float32)
+        native = time_call(lambda: booster.inplace_predict(X, validate_features=False), repeats)
+        numpy_time = time_call(lambda: trees.predict_proba(X), repeats)
+        print(f" trees {rows:>6} row(s): inplace {native * 1e3:8.3f}ms | numpy {numpy_time * 1e3:8.3f}ms "
+              f"| x{native / numpy_time:5.2f}")
+    report = check_exactness(booster, trees, exactness_inputs(trees))
+    print(f" {report['rows']} rows incl. NaN and on-threshold values: {report['margin_mismatches']} margins differ, "
+          f"max |probability diff| {report['max_proba_diff']:.2e}")
+    return report["margin_mismatches"] == 0 and report["max_proba_diff"] <= TOLERANCE
+
+def bench_scale():
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    from utils import newpredict
+    from utils.feature_engineer import FINAL_COLUMNS
+
+    stage = newpredict.get_models().input_stage
+    features = stage.features
+    scaler = StandardScaler()
+    scaler.mean_, scaler.scale_, scaler.n_features_in_ = stage.mean, stage.scale, len(features)
+    scaler.feature_names_in_ = np.array(features, dtype=object)
+
+    rng = np.random.default_rng(0)
+    ok = True
+    for rows, label, repeats in ((200, "last row", 500), (4096, "4096 rows", 50)):
+        frame = pd.DataFrame(rng.standard_normal((rows, len(FINAL_COLUMNS))) * 100, columns=FINAL_COLUMNS)
+        part = frame.tail(1) if label == "last row" else frame
+        before = time_call(lambda: pd.DataFrame(scaler.transform(part[features]), columns=features), repeats)
+        after = time_call(lambda: stage.transform(part), repeats)
+        same = np.array_equal(scaler.transform(part[features]).astype(np.float32), stage.transform(part))
+        ok = ok and same
+        print(f" scale {label:>9}: select+transform {before * 1e3:8.3f}ms | fused {after * 1e3:8.3f}ms "
+              f"| x{before / after:5.1f} | bit-identical: {same}")
+    return ok
+
+def bench_batch():
+    import pandas as pd
+    from utils import newpredict
+
+    rng = np.random.default_rng(0)
+    features = newpredict.rfe_features
+    frame = pd.DataFrame(rng.standard_normal((YEAR_OF_M15_BARS, len(features))), columns=features)
+
+    start = time.perf_counter()
+    batch = newpredict.predict_batch(frame)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = [newpredict.get_models().predict(frame, row=i) for i in range(LOOP_ROWS)]
+    loop_time = (time.perf_counter() - start) / LOOP_ROWS * len(frame)
+
+    diff = max(np.abs(np.asarray(probs["ensemble"]) - batch["ensemble"][i]).max() for i, (_, probs) in enumerate(rows))
+    same_class = all(final_class == batch["final_class"][i] for i, (final_class, _) in enumerate(rows))
+    print(f" {len(frame)} rows: batch {batch_time:7.2f}s | row by row ~{loop_time:7.2f}s (extrapolated) "
+          f"| x{loop_time / batch_time:6.1f} | max |diff| {diff:.2e} | classes match: {same_class}")
+    return diff <= TOLERANCE and same_class
+
+BENCHMARKS = {"keras": bench_keras, "numpy": bench_numpy, "xgboost": bench_xgboost, "trees": bench_trees, "scale": bench_scale, "batch": bench_batch}
+
+def main(argv):
+    names = argv[1:] or list(BENCHMARKS)
+    ok = True
+    for name in names:
+        if name not in BENCHMARKS:
+            print(__doc__)
+            return 1
+        print(f"=== {name} ===")
+        ok = BENCHMARKS[name]() and ok
+    print(" Outputs match within tolerance." if ok else " Outputs differ beyond tolerance!")
+    return 0 if ok else 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,177 @@
+# benchmark_trade_store.py
+
+"""
+Benchmarks for the SQLite trade store (utils/trade_store.SQLiteTradeStore) on a large
+synthetic history (BENCH_ROWS trades, 1M by default) in a temporary database.
+The history is always bulk-loaded first with insert_many, and the load time reported.
+queries : the dashboard's SQLite queries (summary, closed_pnl, breakdown, newest
+          HISTORY_ROWS of history) vs the JSONL dashboard path: parse every record (from
+          in-memory JSON lines, so disk reads are not counted) and compute the same figures
+          with pandas, plus whether both agree.
+writes  : one entry insert and one close_trade on the loaded table, as the logger issues them.
+
+Usage:
+    python benchmark_trade_store.py [queries] [writes] [ROWS]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.trade_store import SQLiteTradeStore
+
+BENCH_ROWS = 1_000_000
+HISTORY_ROWS = 1000
+SYMBOLS = ["BTCUSD", "ETHUSD", "XAUUSD"]
+SELECTED = ["BTCUSD", "XAUUSD"]
+
+
+def time_call(func, repeats):
+    """Median seconds per call after one warm-up call."""
+    func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+def synthetic_trades(rows: int, seed: int = 0) -> list:
+    """Entries as trader.py logs them; ~80% executed and closed, the rest open or failed."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2020, 1, 1)
+    kind = rng.random(rows)
+    pnl = np.round(rng.uniform(-500, 1000, rows), 2)
+    records = []
+    for i in range(rows):
+        opened = start + timedelta(minutes=15 * i)
+        record = {
+            "status": "failed" if kind[i] > 0.95 else "executed",
+            "reason": "executed",
+            "timestamp": str(opened),
+            "symbol": SYMBOLS[i % len(SYMBOLS)],
+            "direction": "buy" if kind[i] < 0.45 else "sell",
+            "confidence": 60.0,
+            "entry_price": 50000.0,
+            "lot": 0.02,
+            "prediction_class": int(kind[i] * 5),
+            "ticket": 1_000_000_000 + i,
+            "log_type": "entry",
+        }
+        if kind[i] < 0.8:
+            record.update({
+                "exit_time": str(opened + timedelta(minutes=30)),
+                "exit_price": 50000.0 + pnl[i],
+                "exit_reason": "tp1 hit" if pnl[i] > 0 else "sl hit",
+                "pnl_usd": float(pnl[i]),
+                "tp1_hit": bool(pnl[i] > 0),
+                "tp2_hit": False,
+                "sl_hit": bool(pnl[i] <= 0),
+                "log_type": "closed",
+            })
+        records.append(record)
+    return records
+
+def pandas_dashboard(lines):
+    """The dashboard's JSONL-path figures: every record is parsed, then filtered in pandas."""
+    df = pd.DataFrame([json.loads(line) for line in lines])
+    df = df[df["symbol"].isin(SELECTED)].sort_values("timestamp", ascending=False)
+    closed = df[df["log_type"] == "closed"].sort_values("exit_time")
+    return {
+        "total": len(df),
+        "executed": int((df["status"] == "executed").sum()),
+        "closed": len(closed),
+        "pnl": float(closed["pnl_usd"].sum()),
+        "tp1_hits": int(closed["tp1_hit"].sum()),
+        "history": df["ticket"].head(HISTORY_ROWS).tolist(),
+    }
+
+def store_dashboard(store: SQLiteTradeStore):
+    summary = store.summary(SELECTED)
+    closed = store.closed_pnl(SELECTED)
+    breakdown = store.breakdown(SELECTED)
+    history = store.history(SELECTED, limit=HISTORY_ROWS)
+    return {
+        "total": summary["total"],
+        "executed": summary["executed"],
+        "closed": summary["closed"],
+        "pnl": float(closed["pnl_usd"].sum()),
+        "tp1_hits": breakdown["tp1_hits"],
+        "history": history["ticket"].tolist(),
+    }
+
+
+# === Benchmarks (each gets the loaded store and the source records) ===
+def bench_queries(store, records):
+    lines = [json.dumps(record) for record in records]
+    for name, func, repeats in (
+        ("summary", lambda: store.summary(SELECTED), 5),
+        ("closed_pnl", lambda: store.closed_pnl(SELECTED), 5),
+        ("breakdown", lambda: store.breakdown(SELECTED), 5),
+        (f"history {HISTORY_ROWS}", lambda: store.history(SELECTED, limit=HISTORY_ROWS), 20),
+    ):
+        print(f" {name:<13}: sqlite {time_call(func, repeats) * 1e3:9.2f}ms")
+    slow = time_call(lambda: pandas_dashboard(lines), 3)
+    fast = time_call(lambda: store_dashboard(store), 3)
+    same = pandas_dashboard(lines) == store_dashboard(store)
+    print(f" all dashboard figures: JSONL + pandas over {len(lines):,} records {slow:7.3f}s | sqlite {fast:7.3f}s "
+          f"| x{slow / fast:5.1f} | identical: {same}")
+    return same
+
+def bench_writes(store, records, repeats=200):
+    tickets = iter(range(2_000_000_000, 2_000_000_000 + 2 * repeats + 2))
+
+    def entry(ticket):
+        store.insert({"status": "executed", "timestamp": str(datetime(2030, 1, 1)), "symbol": "BTCUSD",
+                      "direction": "buy", "ticket": ticket, "log_type": "entry"})
+
+    entry_secs = time_call(lambda: entry(next(tickets)), repeats)
+    open_tickets = iter(range(2_100_000_000, 2_100_000_000 + repeats + 1))
+    for ticket in range(2_100_000_000, 2_100_000_000 + repeats + 1):
+        entry(ticket)
+    ok = True
+
+    def close():
+        nonlocal ok
+        ok = store.close_trade(next(open_tickets), {"exit_time": str(datetime(2030, 1, 2)), "pnl_usd": 1.0,
+                                                    "log_type": "closed"}) and ok
+
+    exit_secs = time_call(close, repeats)
+    print(f" single entry insert: {entry_secs * 1e3:.3f}ms | close_trade: {exit_secs * 1e3:.3f}ms")
+    return ok
+
+BENCHMARKS = {"queries": bench_queries, "writes": bench_writes}
+
+def main(argv):
+    names = [a for a in argv[1:] if not a.isdigit()] or list(BENCHMARKS)
+    rows = next((int(a) for a in argv[1:] if a.isdigit()), BENCH_ROWS)
+    if any(name not in BENCHMARKS for name in names):
+        print(__doc__)
+        return 1
+
+    print(f" Generating {rows:,} trades...")
+    records = synthetic_trades(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteTradeStore(os.path.join(tmp, "trade_log.db"))
+        try:
+            start = time.perf_counter()
+            store.insert_many(records)
+            seconds = time.perf_counter() - start
+            ok = store.summary(None)["total"] == len(records)
+            print(f" insert_many {len(records):,} rows: {seconds:.2f}s ({len(records) / seconds:,.0f} rows/s)")
+            for name in names:
+                print(f"=== {name} ===")
+                ok = BENCHMARKS[name](store, records) and ok
+        finally:
+            store.close()
+    print(" SQLite results match." if ok else " SQLite results differ!")
+    return 0 if ok else 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -399,9 +399,33 @@ h4.sort_values("Timestamp", inplace=True)
 daily.sort_values("Timestamp", inplace=True)
 
 #  Step 3: Merge H1, H4, and Daily Data Using Nearest Past Timestamp
-merged_df = pd.merge_asof(m15, h1, on="Timestamp", direction="backward", suffixes=('', '_H1'))
-merged_df = pd.merge_asof(merged_df, h4, on="Timestamp", direction="backward", suffixes=('', '_H4'))
-merged_df = pd.merge_asof(merged_df, daily, on="Timestamp", direction="backward", suffixes=('', '_D'))
+# Single pass: each timeframe's match index is computed once and its columns are gathered
+# straight into the output (same result as chaining merge_asof(direction="backward"))
+import numpy as np
+
+# True: attach only H1/H4/Daily bars that had closed by the end of each M15 bar (no lookahead).
+# Keep in sync with CLOSED_HTF_BARS_ONLY in utils/datafeed.py used for live inference.
+CLOSED_BARS_ONLY = False
+
+def align_timeframes(base, higher, suffixes, shifts=None):
+    base_keys = base["Timestamp"].to_numpy()
+    columns = {name: base[name].to_numpy() for name in base.columns}
+    for frame, suffix, shift in zip(higher, suffixes, shifts or [pd.Timedelta(0)] * len(higher)):
+        # Row of the latest bar at or before each base timestamp (-1 if none yet);
+        # a shift moves each bar's key from its open to when it becomes usable
+        keys = frame["Timestamp"].to_numpy() + shift.to_timedelta64()
+        starts = np.searchsorted(base_keys, keys, side="left")
+        idx = np.cumsum(np.bincount(starts, minlength=len(base_keys) + 1)[:len(base_keys)]) - 1
+        for name in frame.columns.drop("Timestamp"):
+            target = f"{name}{suffix}" if name in columns else name
+            columns[target] = pd.api.extensions.take(frame[name].to_numpy(), idx, allow_fill=bool((idx < 0).any()))
+    return pd.DataFrame(columns)
+
+# A closed bar is usable from the M15 row closing with it: shift = bar length - 15 minutes
+shifts = [pd.Timedelta(hours=1) - pd.Timedelta(minutes=15),
+          pd.Timedelta(hours=4) - pd.Timedelta(minutes=15),
+          pd.Timedelta(days=1) - pd.Timedelta(minutes=15)] if CLOSED_BARS_ONLY else None
+merged_df = align_timeframes(m15, [h1, h4, daily], suffixes=['_H1', '_H4', '_D'], shifts=shifts)
 
 #  Step 4: Final Check - Ensure Row Count Matches M15
 assert len(merged_df) == len(m15), f"Row count mismatch! Expected {len(m15)}, but got {len(merged_df)}"
@@ -2,7 +2,7 @@
 
 """
 This is the main performance dashboard for the live BTCUSD AI trading system, built with Streamlit.
-It reads real trade logs (logs/trade_log.json) and provides:
+It reads real trade logs (logs/trade_log.jsonl) and provides:
 1. Live trade history
 2. Trade outcome stats
 3. Cumulative PnL curve
@@ -12,65 +12,91 @@ It reads real trade logs (logs/trade_log.json) and provides:
 
 import streamlit as st
 import pandas as pd
-import json
 import os
 from datetime import datetime
+from utils.logger import LOG_BACKEND, LOG_FILE, get_trade_store, read_trade_log
 
 # === App Config ===
 st.set_page_config(page_title="BTCUSD Dashboard", layout="wide")
 st.title("📈 BTCUSD AI Trading Performance Dashboard")
 
-LOG_PATH = "logs/trade_log.json"
+LOG_PATH = LOG_FILE
+HISTORY_ROWS = 1000  # newest rows shown in the history table with the SQLite backend
 
 @st.cache_data
 def load_trade_log(path):
     if not os.path.exists(path):
         return pd.DataFrame()
-    with open(path, "r") as f:
-        raw = json.load(f)
-    df = pd.DataFrame(raw)
+    df = pd.DataFrame(read_trade_log(path))
     if "timestamp" in df.columns:
         df["timestamp"] = pd.to_datetime(df["timestamp"])
     if "exit_time" in df.columns:
         df["exit_time"] = pd.to_datetime(df["exit_time"])
     return df
 
-df = load_trade_log(LOG_PATH)
+if LOG_BACKEND == "sqlite":
+    # Let SQLite filter and aggregate; only displayed rows are loaded
+    store = get_trade_store()
+    if store.summary(None)["total"] == 0:
+        st.warning("⚠️ No trades logged yet.")
+        st.stop()
 
-if df.empty:
-    st.warning("⚠️ No trades logged yet.")
-    st.stop()
+    # === Sidebar Filters ===
+    symbols = store.symbols()
+    selected_symbols = st.sidebar.multiselect("🔍 Filter by Symbol", symbols, default=symbols)
+    summary = store.summary(selected_symbols)
+    df = store.history(selected_symbols, limit=HISTORY_ROWS)
+    closed = store.closed_pnl(selected_symbols)
+    closed["exit_time"] = pd.to_datetime(closed["exit_time"])
+    breakdown = store.breakdown(selected_symbols)
+else:
+    df = load_trade_log(LOG_PATH)
 
-# === Sidebar Filters ===
-symbols = df["symbol"].dropna().unique().tolist()
-selected_symbols = st.sidebar.multiselect("🔍 Filter by Symbol", symbols, default=symbols)
-df = df[df["symbol"].isin(selected_symbols)]
-df.sort_values("timestamp", ascending=False, inplace=True)
+    if df.empty:
+        st.warning("⚠️ No trades logged yet.")
+        st.stop()
+
+    # === Sidebar Filters ===
+    symbols = df["symbol"].dropna().unique().tolist()
+    selected_symbols = st.sidebar.multiselect("🔍 Filter by Symbol", symbols, default=symbols)
+    df = df[df["symbol"].isin(selected_symbols)]
+    df.sort_values("timestamp", ascending=False, inplace=True)
+    summary = {
+        "total": len(df),
+        "executed": (df["status"] == "executed").sum(),
+        "closed": (df["log_type"] == "closed").sum(),
+    }
+
+    closed = df[df["log_type"] == "closed"].copy()
+    closed.sort_values("exit_time", inplace=True)
+    closed["cumulative_pnl"] = closed["pnl_usd"].cumsum()
+    breakdown = {
+        "tp1_hits": closed["tp1_hit"].sum() if "tp1_hit" in closed.columns else None,
+        "sl_hits": closed["sl_hit"].sum() if "sl_hit" in closed.columns else None,
+        "mean_pnl": closed["pnl_usd"].mean(),
+        "directions": closed["direction"].value_counts(),
+    }
 
 # === Summary Metrics ===
 st.subheader("📊 Summary Metrics")
 col1, col2, col3 = st.columns(3)
-col1.metric("Total Trades", len(df))
-col2.metric("Executed Trades", (df["status"] == "executed").sum())
-col3.metric("Closed Trades", (df["log_type"] == "closed").sum())
+col1.metric("Total Trades", summary["total"])
+col2.metric("Executed Trades", summary["executed"])
+col3.metric("Closed Trades", summary["closed"])
 
 # === Trade Table ===
 st.subheader("📜 Trade History")
 st.dataframe(df, use_container_width=True)
 
 # === Cumulative PnL Curve ===
-closed = df[df["log_type"] == "closed"].copy()
 if not closed.empty:
-    closed.sort_values("exit_time", inplace=True)
-    closed["cumulative_pnl"] = closed["pnl_usd"].cumsum()
-
     st.subheader("📈 Cumulative PnL Over Time")
     st.line_chart(closed.set_index("exit_time")["cumulative_pnl"])
 
 # === Additional Insights ===
 with st.expander("📌 Performance Breakdown"):
-    if "tp1_hit" in closed.columns:
-        st.write("✅ TP1 Hits:", closed["tp1_hit"].sum())
-        st.write("❌ SL Hits:", closed["sl_hit"].sum())
-    st.write("📈 Mean PnL:", f"${closed['pnl_usd'].mean():.2f}")
-    st.bar_chart(closed["direction"].value_counts())
+    if breakdown["tp1_hits"] is not None:
+        st.write("✅ TP1 Hits:", breakdown["tp1_hits"])
+        st.write("❌ SL Hits:", breakdown["sl_hits"])
+    st.write("📈 Mean PnL:", f"${breakdown['mean_pnl']:.2f}")
+    st.bar_chart(breakdown["directions"])
@@ -2,43 +2,79 @@
 
 """
 Master loop for BTCUSD algorithmic trading.
-- Executes main.py every 15 minutes (prediction + trading)
-- Runs live_monitor.py every 30 seconds (manage SL/TP, log updates)
+Runs as a single resident daemon so TensorFlow, the ensemble models, the scaler
+and the MT5 session are loaded once and stay warm between cycles:
+- Runs the prediction + trading cycle (main.run_cycle) at every M15 bar close plus a settle delay
+- Runs the position monitor (live_monitor.check_positions) every 30 seconds
+- Reports the latency of every cycle, measured from bar close
+With main.USE_INCREMENTAL_FEATURES the feature engine also stays resident: it is seeded
+once with WARMUP_BARS of history and then consumes only each cycle's new bars.
+Both jobs share one scheduler thread; the per-timeframe fetch workers inside a cycle
+reach MT5 one call at a time through the lock in utils/broker.
+Set MARKET_BACKEND=replay to drive the same loop from historical bars (utils/broker.py).
 """
 
-import subprocess
-import threading
 import time
 import traceback
 
+from utils.broker import mt5
+from utils.logger import logging_metrics, shutdown_logging
+from utils.scheduler import BarScheduler
+
 # === Configurations ===
 MAIN_INTERVAL_MINUTES = 15
 MONITOR_INTERVAL_SECONDS = 30
+SETTLE_DELAY_SECONDS = 2  # give the broker time to publish the closed bar
 
-def run_main_trading():
-    while True:
-        try:
-            print(f" Running main.py at {time.ctime()}...")
-            subprocess.run(["python", "main.py"])
-        except Exception as e:
-            print(" Error in main.py:", e)
-            traceback.print_exc()
-        time.sleep(MAIN_INTERVAL_MINUTES * 60)
-
-def run_monitoring():
-    while True:
-        try:
-            print(f" Running live_monitor.py at {time.ctime()}...")
-            subprocess.run(["python", "live_monitor.py"])
-        except Exception as e:
-            print(" Error in live_monitor.py:", e)
-            traceback.print_exc()
-        time.sleep(MONITOR_INTERVAL_SECONDS)
+def ensure_mt5():
+    # Reconnect only if the terminal session was lost
+    if mt5.terminal_info() is None and not mt5.initialize():
+        raise ConnectionError(f"MT5 initialization failed: {mt5.last_error()}")
 
-if __name__ == "__main__":
+def run_job(scheduler, func):
+    start = time.perf_counter()
+    bar_close = scheduler.begin()
+    try:
+        ensure_mt5()
+        func()
+    except Exception as e:
+        print(f" Error in {scheduler.name}:", e)
+        traceback.print_exc()
+    latency = scheduler.finish(bar_close)
+    stats = scheduler.metrics()
+    log_stats = logging_metrics()
+    print(f" {scheduler.name} cycle took {time.perf_counter() - start:.3f}s "
+          f"({latency:.3f}s after bar close, missed {stats['missed_ticks']}, late {stats['late_ticks']}; "
+          f"log backlog {log_stats['backlog']}, dropped {log_stats['dropped']})")
+
+def run_daemon():
     print(" Starting BTCUSD Live Trading System...")
+    ensure_mt5()
 
-    monitor_thread = threading.Thread(target=run_monitoring, daemon=True)
-    monitor_thread.start()
+    from main import run_cycle
+    from live_monitor import check_positions
+    from utils import newpredict
+    from utils.model_loader import startup_report
 
-    run_main_trading()  # Main thread handles trading
+    # Models, scaler and feature list load once for the daemon's lifetime, in the background
+    # while the scheduler waits for the first bar close (the first cycle waits if still loading)
+    newpredict.preload_models(on_loaded=lambda: print(startup_report()))
+
+    # Schedulers follow the backend clock, which runs accelerated under MARKET_BACKEND=replay
+    trading = BarScheduler(MAIN_INTERVAL_MINUTES * 60, settle_delay=SETTLE_DELAY_SECONDS, name="trading",
+                           clock=mt5.time, sleep=mt5.sleep)
+    monitor = BarScheduler(MONITOR_INTERVAL_SECONDS, name="monitor", clock=mt5.time, sleep=mt5.sleep)
+    jobs = [(trading, run_cycle), (monitor, check_positions)]
+    try:
+        while True:
+            scheduler, func = min(jobs, key=lambda job: job[0].next_due())
+            scheduler.sleep_until_due()
+            if scheduler is trading:
+                print(f" Running trading cycle at {mt5.now():%Y-%m-%d %H:%M:%S} UTC...")
+            run_job(scheduler, func)
+    finally:
+        shutdown_logging()
+        mt5.shutdown()
+
+if __name__ == "__main__":
+    run_daemon()
@@ -7,10 +7,10 @@ trade log. This module ensures accurate,
 real-time tracking of trade lifecycle for analytics and dashboard reporting.
 """
 
-import MetaTrader5 as mt5
-import time
+from utils.broker import mt5
 from datetime import datetime
 from utils.logger import update_trade_exit
+from utils.scheduler import BarScheduler
 
 # === Parameters ===
 SYMBOL = "BTCUSD"
@@ -25,59 +25,60 @@ def get_current_price(direction):
     tick = mt5.symbol_info_tick(SYMBOL)
     return tick.bid if direction == "sell" else tick.ask
 
-def monitor_trades():
-    print(" Starting live trade monitor...")
-    while True:
-        positions = fetch_open_positions()
-        if positions:
-            for p in positions:
-                ticket = p.ticket
-                direction = "buy" if p.type == mt5.ORDER_TYPE_BUY else "sell"
-                entry_price = p.price_open
-                sl = p.sl
-                volume = p.volume
-                current_price = get_current_price(direction)
+def check_positions():
+    """Single pass over open positions: manage SL and log exits."""
+    positions = fetch_open_positions()
+    if positions:
+        for p in positions:
+            ticket = p.ticket
+            direction = "buy" if p.type == mt5.ORDER_TYPE_BUY else "sell"
+            entry_price = p.price_open
+            sl = p.sl
+            volume = p.volume
+            current_price = get_current_price(direction)
 
-                # === Check TP1 hit ===
-                if direction == "buy":
-                    tp1_hit = current_price >= entry_price + TP1_PROFIT
-                    breakeven = entry_price + 30  # small buffer
-                    new_sl = max(sl, current_price - TRAILING_DISTANCE)
-                else:
-                    tp1_hit = current_price <= entry_price - TP1_PROFIT
-                    breakeven = entry_price - 30
-                    new_sl = min(sl, current_price + TRAILING_DISTANCE)
+            # === Check TP1 hit ===
+            if direction == "buy":
+                tp1_hit = current_price >= entry_price + TP1_PROFIT
+                breakeven = entry_price + 30  # small buffer
+                new_sl = max(sl, current_price - TRAILING_DISTANCE)
+            else:
+                tp1_hit = current_price <= entry_price - TP1_PROFIT
+                breakeven = entry_price - 30
+                new_sl = min(sl, current_price + TRAILING_DISTANCE)
 
-                # === If TP1 hit, move SL to breakeven ===
-                if tp1_hit:
-                    modify_request = {
-                        "action": mt5.TRADE_ACTION_SLTP,
-                        "position": ticket,
-                        "sl": round(breakeven, 2),
-                        "tp": p.tp,
-                    }
-                    result = mt5.order_send(modify_request)
-                    if result.retcode == mt5.TRADE_RETCODE_DONE:
-                        print(f" SL moved to breakeven for ticket {ticket}")
-                    else:
-                        print(f" Failed to move SL for ticket {ticket}: {result.comment}")
+            # === If TP1 hit, move SL to breakeven ===
+            if tp1_hit:
+                modify_request = {
+                    "action": mt5.TRADE_ACTION_SLTP,
+                    "position": ticket,
+                    "sl": round(breakeven, 2),
+                    "tp": p.tp,
+                }
+                result = mt5.order_send(modify_request)
+                if result.retcode == mt5.TRADE_RETCODE_DONE:
+                    print(f" SL moved to breakeven for ticket {ticket}")
+                else:
+                    print(f" Failed to move SL for ticket {ticket}: {result.comment}")
 
-                # === Check for exit ===
-                pnl = p.profit
-                if pnl <= -500 or pnl >= TP1_PROFIT:
-                    update_trade_exit(ticket, {
-                        "exit_time": str(datetime.utcnow()),
-                        "exit_price": current_price,
-                        "exit_reason": "tp1 hit" if pnl >= TP1_PROFIT else "sl hit",
-                        "pnl_usd": pnl,
-                        "tp1_hit": pnl >= TP1_PROFIT,
-                        "tp2_hit": False,
-                        "sl_hit": pnl <= -500
-                    })
-        else:
-            print(" No open trades.")
+            # === Check for exit ===
+            pnl = p.profit
+            if pnl <= -500 or pnl >= TP1_PROFIT:
+                update_trade_exit(ticket, {
+                    "exit_time": str(datetime.utcnow()),
+                    "exit_price": current_price,
+                    "exit_reason": "tp1 hit" if pnl >= TP1_PROFIT else "sl hit",
+                    "pnl_usd": pnl,
+                    "tp1_hit": pnl >= TP1_PROFIT,
+                    "tp2_hit": False,
+                    "sl_hit": pnl <= -500
+                })
+    else:
+        print(" No open trades.")
 
-        time.sleep(CHECK_INTERVAL)
+def monitor_trades():
+    print(" Starting live trade monitor...")
+    BarScheduler(CHECK_INTERVAL, name="monitor", clock=mt5.time, sleep=mt5.sleep).run_forever(check_positions)
 
 if __name__ == "__main__":
     if not mt5.initialize():
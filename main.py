@@ -12,17 +12,29 @@ Handles:
 import warnings
 warnings.filterwarnings("ignore")
 
-import MetaTrader5 as mt5
+import time
+from utils.broker import mt5
 import numpy as np
 from utils.datafeed import get_merged_ohlcv
 from utils.feature_engineer import engineer_features
+from utils.incremental_features import WARMUP_BARS, LiveFeatureStream
 from utils.news import get_upcoming_news
-from utils.newpredict import predict_with_ensemble
+from utils.model_loader import startup_report
+from utils.model_server import get_model_server
+from utils.newpredict import predict_from_features
 from utils.trader import smart_trade
 
 # === Configuration ===
 BAR_COUNT = 200
 SYMBOL = "BTCUSD"
+USE_MODEL_SERVER = False  # route predictions through the batching model server (utils/model_server.py)
+# Keep features in a resident IncrementalFeatureEngine (live_loop daemon) instead of running
+# engineer_features over the BAR_COUNT window each cycle. Its vector covers all bars since a
+# WARMUP_BARS seed, so EMA_200/SMA_200 differ from the 200-bar batch path (see utils/incremental_features).
+USE_INCREMENTAL_FEATURES = False
+
+_feature_stream = LiveFeatureStream(lambda num_candles: get_merged_ohlcv(SYMBOL, num_candles=num_candles),
+                                    WARMUP_BARS)
 
 def get_account_balance():
     info = mt5.account_info()
@@ -30,29 +42,42 @@ def get_account_balance():
         raise RuntimeError(" Could not retrieve account info. Is MT5 running and logged in?")
     return info.balance
 
-def main():
-    print("Starting BTCUSD AI Trading...")
-
-    if not mt5.initialize():
-        raise RuntimeError(" MT5 initialization failed.")
-    print(" MT5 connection established.")
-
+def run_cycle():
+    """
+    One prediction + trade cycle. Assumes an MT5 session is already open so a
+    long-lived process (live_loop.py) can reuse the session and loaded models.
+    """
     # 1. Fetch upcoming news (optional)
     news_events = get_upcoming_news()
 
+    timings = {}
+
     # 2. Pull and merge price data
     print(" Fetching market data...")
+    start = time.perf_counter()
     raw_df = get_merged_ohlcv(SYMBOL, num_candles=BAR_COUNT)
+    timings["fetch"] = time.perf_counter() - start
 
     # 3. Engineer features
     print(" Engineering features...")
-    feat_df = engineer_features(raw_df)
+    start = time.perf_counter()
+    if USE_INCREMENTAL_FEATURES:
+        feat_df = _feature_stream.features_for(raw_df)
+    else:
+        feat_df = engineer_features(raw_df)
+    timings["engineer"] = time.perf_counter() - start
 
-    # 4. Make prediction
+    # 4. Make prediction on the features built above (no second fetch)
     print(" Running ensemble prediction...")
-    prediction, probs = predict_with_ensemble(SYMBOL)
+    start = time.perf_counter()
+    if USE_MODEL_SERVER:
+        prediction, probs = get_model_server().predict(feat_df)
+    else:
+        prediction, probs = predict_from_features(feat_df)
+    timings["predict"] = time.perf_counter() - start
     confidence = float(np.max(probs['ensemble'])) * 100
     print(f" Prediction Class: {prediction} | Confidence: {confidence:.2f}%")
+    print(" Stage timings: " + " | ".join(f"{stage} {secs:.3f}s" for stage, secs in timings.items()))
 
     # 5. Print account balance
     balance = get_account_balance()
@@ -66,9 +91,21 @@ def main():
         symbol_data=raw_df,
         symbol=SYMBOL
     )
+    return timings
+
+def main():
+    print("Starting BTCUSD AI Trading...")
+
+    if not mt5.initialize():
+        raise RuntimeError(" MT5 initialization failed.")
+    print(" MT5 connection established.")
 
-    # 7. Shutdown MT5 session
-    mt5.shutdown()
+    try:
+        run_cycle()
+        print(startup_report())
+    finally:
+        # 7. Shutdown MT5 session
+        mt5.shutdown()
     print(" Trade attempt complete. MT5 shutdown successful.")
 
 if __name__ == "__main__":
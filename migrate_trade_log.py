@@ -0,0 +1,51 @@
+# migrate_trade_log.py
+
+"""
+Maintenance tool for the append-only trade journal (logs/trade_log.jsonl).
+1. migrate: converts a legacy logs/trade_log.json array into the JSONL journal
+2. compact: folds exit events into their entries and drops truncated lines
+Both rebuild the ticket index (logs/trade_log.idx) afterwards.
+3. to-sqlite: loads the journal into logs/trade_log.db for TRADE_LOG_BACKEND=sqlite
+
+Usage:
+    python migrate_trade_log.py migrate [path/to/trade_log.json]
+    python migrate_trade_log.py compact
+    python migrate_trade_log.py to-sqlite
+"""
+
+import os
+import sys
+from utils.logger import (DB_FILE, LEGACY_LOG_FILE, LOG_FILE, compact_log, get_trade_store,
+                          migrate_json_log, read_trade_log)
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "migrate"
+
+    if command == "migrate":
+        source = argv[2] if len(argv) > 2 else LEGACY_LOG_FILE
+        if not os.path.exists(source):
+            print(f" No legacy log found at {source}.")
+            return 1
+        if os.path.exists(LOG_FILE):
+            print(f" {LOG_FILE} already exists; refusing to overwrite it.")
+            return 1
+        count = migrate_json_log(source)
+        print(f" Migrated {count} records from {source} to {LOG_FILE}.")
+    elif command == "compact":
+        count = compact_log()
+        print(f" Compacted {LOG_FILE} to {count} records.")
+    elif command == "to-sqlite":
+        store = get_trade_store()
+        if store.summary(None)["total"]:
+            print(f" {DB_FILE} already holds trades; refusing to import twice.")
+            return 1
+        records = read_trade_log()
+        store.insert_many(records)
+        print(f" Imported {len(records)} records from {LOG_FILE} into {DB_FILE}.")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
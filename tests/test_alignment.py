@@ -0,0 +1,72 @@
+# tests/test_alignment.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.alignment import align_timeframes, asof_indices
+
+M15 = pd.Timedelta(minutes=15)
+HIGHER = {"H1": pd.Timedelta(hours=1), "H4": pd.Timedelta(hours=4), "Daily": pd.Timedelta(days=1)}
+
+
+def bars(start: str, periods: int, freq: pd.Timedelta, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Timestamp": pd.date_range(start, periods=periods, freq=freq, tz="UTC"),
+        "Open": rng.normal(30000, 100, periods),
+        "Close": rng.normal(30000, 100, periods),
+        "Volume": rng.integers(1, 1000, periods),
+    })
+
+
+def chained_merge_asof(base, higher, shifts):
+    merged = base
+    for (prefix, frame), shift in zip(higher.items(), shifts):
+        right = frame.rename(columns={c: f"{prefix}_{c}" for c in frame.columns if c != "Timestamp"})
+        if shift is not None:
+            right["Timestamp"] = right["Timestamp"] + shift
+        merged = pd.merge_asof(merged, right, on="Timestamp", direction="backward")
+    return merged
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_asof_indices_match_searchsorted(seed):
+    rng = np.random.default_rng(seed)
+    base = np.sort(rng.integers(0, 200, 300))
+    other = np.sort(rng.integers(-20, 220, 40))  # duplicates, keys before and after the base range
+    np.testing.assert_array_equal(asof_indices(base, other), np.searchsorted(other, base, side="right") - 1)
+
+
+@pytest.mark.parametrize("closed_only", [False, True])
+def test_align_timeframes_matches_chained_merge_asof(closed_only):
+    # The base starts mid-day, so the first rows have no H4 / Daily bar yet (int Volume -> float64)
+    base = bars("2024-03-01 13:15", 700, M15, 0)
+    higher = {name: bars("2024-03-01", 200, period, i) for i, (name, period) in enumerate(HIGHER.items(), 1)}
+    higher["H4"] = higher["H4"][higher["H4"]["Timestamp"] >= "2024-03-01 16:00"]
+    higher["Daily"] = higher["Daily"][higher["Daily"]["Timestamp"] >= "2024-03-02"]
+    # datafeed.get_merged_ohlcv's closed_only shifts: a bar matches the M15 row that closes with it
+    shifts = [period - M15 if closed_only else None for period in HIGHER.values()]
+
+    aligned = align_timeframes(base, list(higher.values()), on="Timestamp", prefixes=list(higher), shifts=shifts)
+    pd.testing.assert_frame_equal(aligned, chained_merge_asof(base, higher, shifts))
+
+
+def test_closed_bar_shift_only_exposes_completed_bars():
+    base = pd.DataFrame({"Timestamp": pd.to_datetime(["2024-03-01 10:30", "2024-03-01 10:45", "2024-03-01 11:00"], utc=True)})
+    h1 = pd.DataFrame({"Timestamp": pd.to_datetime(["2024-03-01 09:00", "2024-03-01 10:00", "2024-03-01 11:00"], utc=True),
+                       "Close": [1.0, 2.0, 3.0]})
+    forming = align_timeframes(base, [h1], prefixes=["H1"])
+    closed = align_timeframes(base, [h1], prefixes=["H1"], shifts=[HIGHER["H1"] - M15])
+    assert forming["H1_Close"].tolist() == [2.0, 2.0, 3.0]
+    # The 10:00 H1 bar closes at 11:00, together with the M15 bar opened at 10:45
+    assert closed["H1_Close"].tolist() == [1.0, 2.0, 2.0]
+
+
+def test_overlapping_columns_need_a_suffix():
+    base = bars("2024-03-01", 8, M15, 0)
+    h1 = bars("2024-03-01", 2, HIGHER["H1"], 1)
+    with pytest.raises(ValueError):
+        align_timeframes(base, [h1])
+    pd.testing.assert_frame_equal(align_timeframes(base, [h1], suffixes=["_h1"]),
+                                  pd.merge_asof(base, h1, on="Timestamp", suffixes=("", "_h1")))
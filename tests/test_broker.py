@@ -0,0 +1,97 @@
+# tests/test_broker.py
+
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.broker import Broker, LazyBackend, MarketDataSource, ReplayBackend
+
+
+def test_incomplete_backend_fails_at_construction():
+    class QuotesOnly(MarketDataSource, Broker):
+        def symbol_info_tick(self, symbol):
+            return None
+
+    with pytest.raises(TypeError):
+        QuotesOnly()
+
+
+def test_lazy_backend_is_created_on_first_use():
+    created = []
+    backend = LazyBackend(lambda: created.append(ReplayBackend()) or created[0])
+    assert created == []
+    assert backend.TIMEFRAME_D1 == ReplayBackend.TIMEFRAME_D1
+    assert backend.get() is created[0] and len(created) == 1
+
+
+def test_importing_the_pipeline_does_not_load_metatrader5():
+    code = ("import sys, utils.datafeed, utils.newpredict, utils.trader; "
+            "sys.exit('MetaTrader5' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_backend_calls_are_serialized_but_the_clock_is_not():
+    class SlowReplay(ReplayBackend):
+        active = peak = 0
+
+        def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+            SlowReplay.active += 1
+            SlowReplay.peak = max(SlowReplay.peak, SlowReplay.active)
+            time.sleep(0.02)
+            SlowReplay.active -= 1
+            return None
+
+    backend = LazyBackend(lambda: SlowReplay(start="2024-01-01"))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: backend.copy_rates_from_pos("X", 15, 0, 1), range(8)))
+    assert SlowReplay.peak == 1
+
+    with backend._call_lock:
+        clock = threading.Thread(target=backend.time)
+        clock.start()
+        clock.join(timeout=1)
+    assert not clock.is_alive()
+
+
+def write_replay_dir(path, days=3):
+    """BTCUSD M15 bars from midnight, plus the H1 bars they aggregate to."""
+    rng = np.random.default_rng(0)
+    rows = days * 96
+    times = 1704067200 + 900 * np.arange(rows)  # 2024-01-01 00:00 UTC
+    close = 40000 + np.cumsum(rng.normal(0, 30, rows))
+    open_ = np.r_[close[:1], close[:-1]]
+    m15 = pd.DataFrame({"time": times, "open": open_, "high": np.maximum(open_, close) + 5,
+                        "low": np.minimum(open_, close) - 5, "close": close,
+                        "tick_volume": rng.integers(1, 100, rows)})
+    groups = m15.groupby(m15["time"] // 3600 * 3600)
+    h1 = pd.DataFrame({"time": groups["time"].first(), "open": groups["open"].first(),
+                       "high": groups["high"].max(), "low": groups["low"].min(),
+                       "close": groups["close"].last(), "tick_volume": groups["tick_volume"].sum()})
+    m15.to_csv(path / "BTCUSD_M15.csv", index=False)
+    h1.to_csv(path / "BTCUSD_H1.csv", index=False)
+    return m15.set_index("time")
+
+
+def test_replay_serves_the_forming_bar_like_mt5(tmp_path):
+    m15 = write_replay_dir(tmp_path)
+    backend = ReplayBackend(data_dir=str(tmp_path), speed=1e-9, start="2024-01-02 10:32")
+
+    bars = backend.copy_rates_from_pos("BTCUSD", backend.TIMEFRAME_M15, 0, 3)
+    opened = m15.loc[1704191400]  # 10:30, two minutes old
+    assert list(bars["time"]) == [1704189600, 1704190500, 1704191400]
+    assert bars[-1]["open"] == bars[-1]["high"] == bars[-1]["low"] == bars[-1]["close"] == opened["open"]
+    assert bars[-1]["tick_volume"] == 1 and bars[-2]["close"] == m15.loc[1704190500, "close"]
+
+    hour = backend.copy_rates_from_pos("BTCUSD", backend.TIMEFRAME_H1, 0, 2)
+    closed = m15.loc[1704189600:1704190500]  # 10:00 and 10:15
+    assert list(hour["time"]) == [1704186000, 1704189600]
+    assert hour[-1]["open"] == closed["open"].iloc[0] and hour[-1]["close"] == opened["open"]
+    assert hour[-1]["high"] == max(closed["high"].max(), opened["open"])
+    assert hour[-1]["tick_volume"] == closed["tick_volume"].sum() + 1
+    assert backend.symbol_info_tick("BTCUSD").bid == opened["open"]
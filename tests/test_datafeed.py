@@ -0,0 +1,110 @@
+# tests/test_datafeed.py
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import datafeed
+from utils.broker import RATES_DTYPE, ReplayBackend
+
+
+def synthetic_m15(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 50, rows))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = rng.uniform(0, 40, rows)
+    return pd.DataFrame({
+        "Timestamp": pd.date_range("2024-01-01 07:30", periods=rows, freq="15min", tz="UTC"),
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(1, 1000, rows),
+    })
+
+
+@pytest.mark.parametrize("num_candles", [200, 37])
+def test_resampled_merge_requests_one_day_of_extra_m15_bars(monkeypatch, num_candles):
+    history = synthetic_m15(5000)
+    requested = []
+
+    def fake_fetch(symbol, timeframe, count):
+        requested.append((timeframe, count))
+        datafeed.fetch_latency[timeframe] = 0.0
+        return history.iloc[-count:].reset_index(drop=True)
+
+    monkeypatch.setattr(datafeed, "RESAMPLE_HIGHER_TIMEFRAMES", True)
+    monkeypatch.setattr(datafeed, "initialize_mt5", lambda: None)
+    monkeypatch.setattr(datafeed, "_fetch_frame", fake_fetch)
+    merged = datafeed.get_merged_ohlcv("BTCUSD", num_candles=num_candles)
+    assert requested == [("M15", num_candles + 96)]
+
+    # Same higher-timeframe values as resampling the whole history
+    monkeypatch.setattr(datafeed, "_fetch_frame", lambda symbol, timeframe, count: history)
+    reference = datafeed.get_merged_ohlcv("BTCUSD", num_candles=num_candles)
+    pd.testing.assert_frame_equal(merged, reference)
+
+
+class ServerTimeBackend:
+    """MT5 stand-in whose bars are stamped in trade-server time, three hours ahead of UTC."""
+
+    cache_namespace = "mt5"
+    TIMEFRAME_M15 = 15
+
+    def __init__(self, rows=1500):
+        self.utc = 1704200000.0
+        self.calls = []
+        self.rows = rows
+
+    def _bars(self):
+        last = int(self.utc + 3 * 3600) // 900 * 900
+        bars = np.zeros(self.rows, dtype=RATES_DTYPE)
+        bars["time"] = last - 900 * np.arange(self.rows)[::-1]
+        bars["close"] = bars["time"] / 1e5
+        return bars
+
+    def now(self):
+        return datetime.fromtimestamp(self.utc, timezone.utc)
+
+    def bar_time_cutoff(self):
+        return None
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.calls.append("from_pos")
+        return self._bars()[-count:]
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.calls.append("range")
+        bars = self._bars()
+        return bars[(bars["time"] >= date_from.timestamp()) & (bars["time"] <= date_to.timestamp())]
+
+
+def test_mt5_server_time_bars_are_neither_clipped_nor_refetched(monkeypatch, tmp_path):
+    backend = ServerTimeBackend()
+    monkeypatch.setattr(datafeed, "mt5", backend)
+    monkeypatch.setattr(datafeed, "CACHE_DIR", str(tmp_path))
+
+    first = datafeed.sync_bar_cache("BTCUSD", "M15", 200)
+    backend.utc += 1800  # two bars later
+    second = datafeed.sync_bar_cache("BTCUSD", "M15", 200)
+    assert backend.calls == ["from_pos", "range"]  # the second sync is incremental
+    assert first["time"][-1] == backend._bars()["time"][-3]
+    np.testing.assert_array_equal(second[-200:], backend._bars()[-200:])
+
+
+def test_an_earlier_replay_run_never_sees_a_later_runs_bars(monkeypatch, tmp_path):
+    replay_dir = tmp_path / "dataset"
+    replay_dir.mkdir()
+    bars = np.zeros(3000, dtype=RATES_DTYPE)
+    bars["time"] = 1704067200 + 900 * np.arange(len(bars))
+    bars["open"] = bars["high"] = bars["low"] = bars["close"] = 40000.0
+    pd.DataFrame(bars).to_csv(replay_dir / "BTCUSD_M15.csv", index=False)
+    monkeypatch.setattr(datafeed, "CACHE_DIR", str(tmp_path / "cache"))
+
+    for start in ("2024-01-30 12:00", "2024-01-20 12:00"):
+        backend = ReplayBackend(data_dir=str(replay_dir), speed=1e-9, start=start)
+        monkeypatch.setattr(datafeed, "mt5", backend)
+        synced = datafeed.sync_bar_cache("BTCUSD", "M15", 200)
+        assert synced["time"][-1] == pd.Timestamp(start, tz="UTC").timestamp()  # the forming bar
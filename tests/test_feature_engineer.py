@@ -0,0 +1,51 @@
+# tests/test_feature_engineer.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_features import (ORDER_BLOCK_COLUMNS, SWING_COLUMNS, loop_detect_bos, loop_detect_breaker_blocks,
+                                loop_detect_order_blocks, synthetic_bars)
+from utils.feature_engineer import detect_bos, detect_breaker_blocks, detect_fvg, detect_order_blocks
+
+
+# Coarse ticks make equal highs/lows common, which is where strict comparisons matter
+@pytest.mark.parametrize("rows, tick", [(0, 1.0), (4, 1.0), (10, 1.0), (11, 1.0), (12, 25.0), (1500, 1.0), (1500, 25.0)])
+def test_swing_points_match_the_loop_reference(rows, tick):
+    bars = synthetic_bars(rows, seed=rows, tick=tick)
+    pd.testing.assert_frame_equal(detect_bos(bars.copy())[SWING_COLUMNS], loop_detect_bos(bars.copy())[SWING_COLUMNS])
+
+
+@pytest.mark.parametrize("rows, tick", [(0, 1.0), (5, 1.0), (6, 1.0), (7, 25.0), (1500, 1.0), (1500, 25.0)])
+def test_order_blocks_match_the_loop_reference(rows, tick):
+    bars = synthetic_bars(rows, seed=rows, tick=tick)
+    # Flat candles (zero range) must never be order blocks
+    bars.loc[bars.index[::97], ["Open", "High", "Low", "Close"]] = 30000.0
+    fast = detect_breaker_blocks(detect_order_blocks(bars.copy()))
+    slow = loop_detect_breaker_blocks(loop_detect_order_blocks(bars.copy()))
+    pd.testing.assert_frame_equal(fast[ORDER_BLOCK_COLUMNS], slow[ORDER_BLOCK_COLUMNS])
+
+
+
+# (High, Low) of each bar and the (FVG_Low, FVG_High) detect_fvg produces, comparing bar i-2 with bar i
+FVG_FIXTURE = [
+    (105.0, 100.0, np.nan, np.nan),
+    (108.0, 104.0, np.nan, np.nan),
+    (112.0, 107.0, 105.0, 107.0),    # bullish: bar 0 high 105 < low 107
+    (111.0, 108.0, np.nan, np.nan),  # bar 1 high 108 == low 108 is no gap
+    (109.0, 107.0, np.nan, np.nan),  # overlapping ranges
+    (106.0, 103.0, 106.0, 108.0),    # bearish: bar 3 low 108 > high 106
+    (107.0, 106.0, np.nan, np.nan),  # bar 4 low 107 == high 107 is no gap
+    (104.0, 100.0, np.nan, np.nan),
+    (120.0, 115.0, 107.0, 115.0),    # bullish: bar 6 high 107 < low 115
+    (95.0, 110.0, 104.0, 110.0),     # malformed bar meeting both conditions: bullish wins
+]
+
+FVG_COLUMNS = ["High", "Low", "FVG_Low", "FVG_High"]
+
+
+@pytest.mark.parametrize("rows", [0, 1, 2, len(FVG_FIXTURE)])
+def test_detect_fvg_fixture(rows):
+    fixture = pd.DataFrame(FVG_FIXTURE[:rows], columns=FVG_COLUMNS, dtype=np.float64)
+    out = detect_fvg(fixture[["High", "Low"]].copy())
+    pd.testing.assert_frame_equal(out[FVG_COLUMNS], fixture)
@@ -0,0 +1,31 @@
+# tests/test_fused_scaler.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from utils.feature_engineer import FINAL_COLUMNS
+from utils.fused_scaler import FusedScaler
+
+RFE_FEATURES = FINAL_COLUMNS[::-3]
+
+
+@pytest.mark.parametrize("with_mean", [True, False])
+@pytest.mark.parametrize("with_std", [True, False])
+def test_from_estimator_matches_standard_scaler(with_mean, with_std):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.normal(30000, 500, (300, len(FINAL_COLUMNS))), columns=FINAL_COLUMNS)
+    scaler = StandardScaler(with_mean=with_mean, with_std=with_std).fit(frame[RFE_FEATURES])
+
+    stage = FusedScaler.from_estimator(scaler, RFE_FEATURES)
+    expected = scaler.transform(frame[RFE_FEATURES]).astype(np.float32)
+    np.testing.assert_array_equal(stage.transform(frame), expected)
+    np.testing.assert_array_equal(stage.transform(frame.to_numpy()[-1]), expected[-1])
+
+
+def test_from_estimator_rejects_a_different_feature_order():
+    frame = pd.DataFrame(np.ones((3, len(RFE_FEATURES))), columns=RFE_FEATURES)
+    scaler = StandardScaler().fit(frame)
+    with pytest.raises(ValueError):
+        FusedScaler.from_estimator(scaler, RFE_FEATURES[::-1])
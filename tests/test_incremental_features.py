@@ -0,0 +1,108 @@
+# tests/test_incremental_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.feature_engineer import FINAL_COLUMNS, engineer_features
+from utils.incremental_features import IncrementalFeatureEngine, LiveFeatureStream
+
+HTF_COLUMNS = ["H1_Open", "H1_Low", "H1_Close", "H1_Volume", "H4_High", "H4_Low", "H4_Close",
+               "H4_Volume", "Daily_Open", "Daily_High", "Daily_Low", "Daily_Close", "Daily_Volume"]
+
+
+def synthetic_merged(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 60, rows))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 5, rows)
+    wick = rng.exponential(30, (2, rows))
+    df = pd.DataFrame({
+        "Timestamp": pd.date_range("2024-01-01", periods=rows, freq="15min", tz="UTC"),
+        "Open": open_,
+        "High": np.maximum(open_, close) + wick[0],
+        "Low": np.minimum(open_, close) - wick[1],
+        "Close": close,
+        "Volume": rng.integers(1, 1000, rows).astype(float),
+    })
+    for col in HTF_COLUMNS:
+        df[col] = rng.normal(30000, 100, rows)
+    return df
+
+
+def batch_last_row(df: pd.DataFrame) -> np.ndarray:
+    return engineer_features(df.copy()).iloc[-1][FINAL_COLUMNS].to_numpy(dtype=np.float64)
+
+
+def assert_matches(vector: pd.Series, expected: np.ndarray):
+    np.testing.assert_allclose(vector[FINAL_COLUMNS].to_numpy(dtype=np.float64), expected,
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("seed_bars", [3, 30, 250])
+def test_engine_matches_engineer_features_over_all_seen_bars(seed_bars):
+    # Short seeds cover the bfill/ffill edges (SMA_200, swings and order blocks still undefined)
+    df = synthetic_merged(seed_bars + 60)
+    engine = IncrementalFeatureEngine()
+    assert_matches(engine.warm_start(df.iloc[:seed_bars]), batch_last_row(df.iloc[:seed_bars]))
+    for end in range(seed_bars + 1, len(df) + 1):
+        assert_matches(engine.update(df.iloc[end - 1]), batch_last_row(df.iloc[:end]))
+
+
+def test_engine_window_is_its_history_not_the_last_200_bars():
+    df = synthetic_merged(600)
+    vector = IncrementalFeatureEngine().warm_start(df)
+    trailing = dict(zip(FINAL_COLUMNS, batch_last_row(df.iloc[-200:])))
+    assert vector["EMA_200"] != pytest.approx(trailing["EMA_200"], rel=1e-6)
+    assert vector["SMA_200"] == pytest.approx(trailing["SMA_200"], rel=1e-9)
+
+
+def test_live_stream_catches_up_and_reseeds_after_a_gap():
+    history = synthetic_merged(900)
+    cycle_end = 0
+    fetched = []
+
+    def fetch(num_candles):
+        fetched.append(num_candles)
+        return history.iloc[max(0, cycle_end - num_candles):cycle_end]
+
+    stream = LiveFeatureStream(fetch, warmup_bars=400)
+    seed_start = None
+    for cycle_end in [500, 501, 503, 520, 700, 701]:  # 520 -> 700 skips more than a cycle window
+        if cycle_end == 700:
+            seed_start = cycle_end - 400
+        raw_df = history.iloc[cycle_end - 100:cycle_end].reset_index(drop=True)
+        vector = stream.features_for(raw_df)
+        start = 100 if seed_start is None else seed_start
+        assert_matches(vector, batch_last_row(history.iloc[start:cycle_end]))
+    assert fetched == [400, 400] and stream.seeds == 2
+
+
+def forming(bar: pd.Series) -> pd.Series:
+    """The same bar a few seconds after it opened, as MT5 returns it at position 0."""
+    partial = bar.copy()
+    partial["High"] = partial["Low"] = partial["Close"] = partial["Open"]
+    partial["Volume"] = 1.0
+    return partial
+
+
+def test_live_stream_only_consumes_bars_once_they_have_closed():
+    history = synthetic_merged(700)
+    cycle_end = 0
+
+    def with_forming_bar(frame):
+        return pd.concat([frame.iloc[:-1], forming(frame.iloc[-1]).to_frame().T], ignore_index=True) \
+            .astype(frame.dtypes.to_dict())
+
+    def fetch(num_candles):
+        return with_forming_bar(history.iloc[cycle_end - num_candles:cycle_end])
+
+    stream = LiveFeatureStream(fetch, warmup_bars=300)
+    for cycle_end in range(400, 440):
+        raw_df = with_forming_bar(history.iloc[cycle_end - 100:cycle_end]).reset_index(drop=True)
+        vector = stream.features_for(raw_df)
+        # Closed bars in their final form, the forming one as it is now (what the batch path sees)
+        expected = with_forming_bar(history.iloc[100:cycle_end])
+        assert_matches(vector, batch_last_row(expected))
+    assert stream.seeds == 1
+    # The engine's own state never saw a partial bar
+    assert_matches(stream.engine.features, batch_last_row(history.iloc[100:cycle_end - 1]))
@@ -0,0 +1,54 @@
+# tests/test_logger.py
+
+import json
+
+import pytest
+
+from utils import logger
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """A fresh JSONL journal in tmp_path, written synchronously."""
+    monkeypatch.setattr(logger, "LOG_FILE", str(tmp_path / "trade_log.jsonl"))
+    monkeypatch.setattr(logger, "INDEX_FILE", str(tmp_path / "trade_log.idx"))
+    monkeypatch.setattr(logger, "LEGACY_LOG_FILE", str(tmp_path / "trade_log.json"))
+    monkeypatch.setattr(logger, "LOG_BACKEND", "jsonl")
+    monkeypatch.setattr(logger, "_index", None)
+    return tmp_path
+
+def entry(ticket):
+    return {"status": "executed", "symbol": "BTCUSD", "direction": "buy", "entry_price": 50000.0,
+            "ticket": ticket, "log_type": "entry"}
+
+def exit_(ticket):
+    return {"exit_price": 50100.0, "exit_reason": "tp1 hit", "pnl_usd": 100.0, "ticket": ticket,
+            "log_type": "closed"}
+
+
+@pytest.mark.parametrize("torn", ["journal", "index"])
+def test_events_after_a_torn_write_are_kept_and_indexed(journal, torn):
+    logger._write_batch([("entry", entry(1)), ("entry", entry(2)), ("exit", exit_(1))])
+    # Crash mid-write: half of ticket 99's line reaches disk, then the process restarts
+    path = logger.LOG_FILE if torn == "journal" else logger.INDEX_FILE
+    with open(path, "ab") as f:
+        f.write(json.dumps(entry(99)).encode("utf-8")[:30])
+    logger._index = None
+
+    logger._write_batch([("entry", entry(3)), ("exit", exit_(3)), ("exit", exit_(2))])
+
+    records = {record["ticket"]: record for record in logger.read_trade_log(logger.LOG_FILE)}
+    assert sorted(records) == [1, 2, 3]
+    assert records[3]["direction"] == "buy" and records[3]["pnl_usd"] == 100.0
+    assert all(record["log_type"] == "closed" for record in records.values())
+
+    # Every indexed offset starts a line, in memory and as reloaded from disk
+    with open(logger.LOG_FILE, "rb") as f:
+        data = f.read()
+    assert data.endswith(b"\n")
+    for index in (logger._get_index(), (setattr(logger, "_index", None), logger._get_index())[1]):
+        for ticket, slot in index.items():
+            for kind, offset in slot.items():
+                assert offset == 0 or data[offset - 1:offset] == b"\n"
+                event = json.loads(data[offset:data.index(b"\n", offset)])
+                assert (event["ticket"], event["log_type"]) == (ticket, {"entry": "entry", "exit": "closed"}[kind])
@@ -0,0 +1,121 @@
+# tests/test_numpy_runtime.py
+
+import numpy as np
+import pytest
+
+from utils.numpy_runtime import PARITY_TOLERANCE, NumpyModel, _fold_dense_chain, _leaf_layers, check_parity, export_arrays, export_model
+
+
+# === Stub layers (only what the exporter reads from Keras layers) ===
+def relu(x):
+    return np.maximum(x, 0)
+
+def linear(x):
+    return x
+
+def softmax(x):
+    z = np.exp(x - x.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+class Dense:
+    def __init__(self, rng, n_in, n_out, activation):
+        self.weights = [rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)), rng.normal(0, 0.1, n_out)]
+        self.activation = activation
+
+    def get_weights(self):
+        return self.weights
+
+    def __call__(self, x):
+        return self.activation(x @ self.weights[0] + self.weights[1])
+
+class BatchNormalization:
+    def __init__(self, rng, n, epsilon=1e-3):
+        # Moving statistics far from the (0, 1) defaults, so a wrong fold cannot pass
+        self.weights = [rng.uniform(0.5, 2, n), rng.normal(0, 0.5, n), rng.normal(0, 1, n), rng.uniform(0.2, 3, n)]
+        self.epsilon = epsilon
+
+    def get_weights(self):
+        return self.weights
+
+    def __call__(self, x):
+        gamma, beta, mean, var = self.weights
+        return (x - mean) / np.sqrt(var + self.epsilon) * gamma + beta
+
+class Dropout:
+    def __call__(self, x):
+        return x
+
+class Block:
+    """A nested functional model; the exporter flattens its layers."""
+
+    def __init__(self, layers):
+        self.layers = layers
+
+def nbeats_stub(input_dim: int, hidden_dim: int = 32, seed: int = 0) -> Block:
+    """Same layer sequence as utils/predictor.build_improved_nbeats, at a smaller width."""
+    rng = np.random.default_rng(seed)
+    blocks = [Block([
+        Dense(rng, input_dim, hidden_dim, relu), BatchNormalization(rng, hidden_dim), Dropout(),
+        Dense(rng, hidden_dim, hidden_dim, relu), BatchNormalization(rng, hidden_dim),
+        Dense(rng, hidden_dim, input_dim, linear),
+    ]) for _ in range(3)]
+    return Block(blocks + [
+        Dense(rng, input_dim, hidden_dim, relu), BatchNormalization(rng, hidden_dim), Dropout(),
+        Dense(rng, hidden_dim, 16, relu), Dense(rng, 16, 5, softmax),
+    ])
+
+def unfolded_forward(model, X):
+    x = np.asarray(X, dtype=np.float64)
+    for layer in _leaf_layers(model):
+        x = layer(x)
+    return x
+
+
+def test_folded_chain_matches_the_unfolded_forward_pass():
+    model = nbeats_stub(input_dim=24)
+    numpy_model = NumpyModel(export_arrays(model, "nbeats"))
+    # 5 BatchNorms folded away, 3 linear Dense layers merged into the Dense after them
+    assert [activation for _, _, activation in numpy_model.chain] == ["relu"] * 8 + ["softmax"]
+
+    X = np.random.default_rng(1).standard_normal((256, 24)).astype(np.float32)
+    probs = numpy_model.predict(X)
+    assert probs.dtype == np.float32 and probs.shape == (256, 5)
+    assert np.abs(probs - unfolded_forward(model, X)).max() <= PARITY_TOLERANCE
+
+def test_consecutive_batchnorms_and_linear_layers_fold_exactly():
+    rng = np.random.default_rng(2)
+    layers = [BatchNormalization(rng, 8), BatchNormalization(rng, 8), Dense(rng, 8, 6, linear),
+              Dense(rng, 6, 6, linear), BatchNormalization(rng, 6), Dense(rng, 6, 4, relu)]
+    chain = _fold_dense_chain(layers)
+    assert len(chain) == 1
+
+    X = rng.standard_normal((64, 8))
+    W, b, _ = chain[0]
+    np.testing.assert_allclose(relu(X @ W + b), unfolded_forward(Block(layers), X), rtol=1e-10, atol=1e-12)
+
+def test_batchnorm_after_the_last_dense_is_rejected():
+    rng = np.random.default_rng(3)
+    with pytest.raises(ValueError):
+        _fold_dense_chain([Dense(rng, 4, 4, relu), BatchNormalization(rng, 4)])
+
+
+# === Parity with Keras (needs TensorFlow) ===
+@pytest.mark.parametrize("kind", ["transformer", "nbeats"])
+def test_exported_model_matches_keras_inference(tmp_path, kind):
+    pytest.importorskip("tensorflow")
+    from utils.predictor import ARCHITECTURES
+
+    model = ARCHITECTURES[kind](24)
+    rng = np.random.default_rng(0)
+    for layer in _leaf_layers(model):
+        name = type(layer).__name__
+        if name == "BatchNormalization":
+            n = layer.get_weights()[0].shape[0]
+            layer.set_weights([rng.uniform(0.5, 2, n), rng.normal(0, 0.5, n), rng.normal(0, 1, n), rng.uniform(0.2, 3, n)])
+        elif name == "LayerNormalization":
+            layer.set_weights([rng.uniform(0.5, 2, w.shape) if i == 0 else rng.normal(0, 0.5, w.shape)
+                               for i, w in enumerate(layer.get_weights())])
+
+    export_model(model, kind, str(tmp_path / f"{kind}.npz"))
+    numpy_model = NumpyModel.load(str(tmp_path / f"{kind}.npz"))
+    assert check_parity(model, numpy_model) <= PARITY_TOLERANCE
@@ -0,0 +1,48 @@
+# tests/test_tree_runtime.py
+
+import json
+
+import numpy as np
+import pytest
+
+xgb = pytest.importorskip("xgboost")
+
+from utils.tree_runtime import PROBABILITY_TOLERANCE, NumpyTreeEnsemble, check_exactness, exactness_inputs
+
+
+def train(objective: str, seed: int, **params):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((800, 12)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan  # learn default directions too
+    signal = np.nan_to_num(X[:, 0] + 0.5 * X[:, 1] * X[:, 2]) + rng.normal(0, 0.5, len(X))
+    if objective == "multi:softprob":
+        y = np.digitize(signal, [-1.0, -0.3, 0.3, 1.0])
+        params["num_class"] = 5
+    elif objective == "binary:logistic":
+        y = (signal > 0.2 * seed).astype(int)  # a different base_score per seed
+    else:
+        y = 100 * signal
+    booster = xgb.train({"objective": objective, "max_depth": 5, "eta": 0.3, "seed": seed, **params},
+                        xgb.DMatrix(X, y), num_boost_round=40)
+    return booster, NumpyTreeEnsemble(json.loads(booster.save_raw("json")))
+
+
+@pytest.mark.parametrize("objective", ["multi:softprob", "binary:logistic", "reg:squarederror"])
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_margins_are_bit_identical_to_booster(objective, seed):
+    booster, ensemble = train(objective, seed)
+    report = check_exactness(booster, ensemble, exactness_inputs(ensemble, seed=seed))
+    assert report["margin_mismatches"] == 0, report
+    if objective != "reg:squarederror":
+        assert report["max_proba_diff"] <= PROBABILITY_TOLERANCE, report
+
+
+def test_predict_proba_shapes_follow_the_booster():
+    booster, ensemble = train("multi:softprob", 0)
+    X = exactness_inputs(ensemble, rows=7)
+    proba = ensemble.predict_proba(X)
+    assert proba.shape == (7, 5) and proba.dtype == np.float32
+    np.testing.assert_allclose(proba.sum(axis=1), 1, rtol=1e-6)
+
+    booster, ensemble = train("binary:logistic", 1)
+    assert ensemble.predict_proba(X).shape == booster.predict(xgb.DMatrix(X)).shape
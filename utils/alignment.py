@@ -0,0 +1,134 @@
+# utils/alignment.py
+
+"""
+Single-pass multi-timeframe alignment.
+align_timeframes() joins any number of higher-timeframe frames onto a base
+timeframe with "latest bar at or before" semantics - the same result as chaining
+pd.merge_asof(direction="backward") - but computes each join index once with
+np.searchsorted and gathers every column straight into the output, instead of
+building a full intermediate frame per merge.
+Per-frame key shifts support lookahead-safe joins: shifting a higher timeframe's
+open times to the moment its bar closes attaches only bars that had completed.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+
+def _key_values(series: pd.Series, unit: str = None) -> np.ndarray:
+    # Datetimes compare as int64 ticks, converted to a common unit only when they differ
+    if isinstance(series.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(series.dtype):
+        index = pd.DatetimeIndex(series)
+        return (index if unit in (None, index.unit) else index.as_unit(unit)).asi8
+    return series.to_numpy()
+
+def _shift_ticks(shift, unit: str):
+    # Timedelta shifts are expressed in the key's tick unit; numeric keys shift as-is
+    if unit is None:
+        return shift
+    return pd.Timedelta(shift) // pd.Timedelta(1, unit=unit)
+
+def _compatible_keys(left, right) -> bool:
+    # Datetime keys may differ in resolution but not in timezone
+    is_datetime = pd.api.types.is_datetime64_any_dtype
+    if is_datetime(left) and is_datetime(right):
+        return str(getattr(left, "tz", None)) == str(getattr(right, "tz", None))
+    return left == right
+
+def _sorted(frame: pd.DataFrame, on: str) -> pd.DataFrame:
+    return frame if frame[on].is_monotonic_increasing else frame.sort_values(on, kind="stable")
+
+def _values(series: pd.Series):
+    # Extension arrays (e.g. tz-aware datetimes) keep their dtype through take()
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        return series.array
+    return series.to_numpy()
+
+def asof_indices(base_keys: np.ndarray, other_keys: np.ndarray) -> np.ndarray:
+    """Position of the last `other_keys` entry <= each base key (-1 if none). Both sorted."""
+    # Higher timeframes have far fewer bars, so search their keys into the base keys
+    # and count, per base row, how many of them have started: O(m log n + n)
+    starts = np.searchsorted(base_keys, other_keys, side="left")
+    return np.cumsum(np.bincount(starts, minlength=len(base_keys) + 1)[:len(base_keys)]) - 1
+
+def align_timeframes(base: pd.DataFrame, higher: list, on: str = "Timestamp",
+                     prefixes: list = None, suffixes: list = None, shifts: list = None) -> pd.DataFrame:
+    """
+    Attaches every frame in `higher` to `base` by backward as-of match on `on`.
+    Frames are sorted by `on` first if needed.
+    `prefixes` optionally names each higher frame's columns "<prefix>_<column>"
+    (e.g. H1_Close), so frames can be passed without renaming them first.
+    `suffixes` optionally gives, per higher frame, the suffix appended to columns
+    already present in the output (merge_asof's right-hand suffix); without one,
+    overlapping names raise ValueError.
+    `shifts` optionally delays each higher frame's keys (e.g. by its bar duration minus
+    the base bar duration, so a bar only matches once it has closed).
+    Columns with unmatched rows are upcast exactly as merge_asof does (int -> float64).
+    """
+    prefixes = prefixes or [None] * len(higher)
+    suffixes = suffixes or [None] * len(higher)
+    shifts = shifts or [None] * len(higher)
+    base = _sorted(base, on)
+    base_keys = _key_values(base[on])
+    unit = base[on].dt.unit if hasattr(base[on], "dt") else None
+
+    order = list(base.columns)
+    parts = _gather(base, order, order, None)
+    for frame, prefix, suffix, shift in zip(higher, prefixes, suffixes, shifts):
+        if not _compatible_keys(base[on].dtype, frame[on].dtype):
+            raise ValueError(f"Incompatible '{on}' dtypes: {base[on].dtype} vs {frame[on].dtype}")
+        frame = _sorted(frame, on)
+        keys = _key_values(frame[on], unit)
+        if shift:
+            keys = keys + _shift_ticks(shift, unit)
+        idx = asof_indices(base_keys, keys)
+        names = [name for name in frame.columns if name != on]
+        targets = []
+        for name in names:
+            target = f"{prefix}_{name}" if prefix else name
+            if target in order:
+                if not suffix:
+                    raise ValueError(f"Column '{target}' overlaps and no suffix was given")
+                target = f"{target}{suffix}"
+            targets.append(target)
+            order.append(target)
+        parts += _gather(frame, names, targets, idx)
+
+    # One block per source frame and dtype; concatenating them does not consolidate or copy
+    return pd.concat(parts, axis=1)[order]
+
+def _gather(frame: pd.DataFrame, names: list, targets: list, idx) -> list:
+    """Rows `idx` of `frame[names]` (all rows if idx is None) as frames, one per dtype."""
+    # Indices are non-decreasing, so unmatched rows (-1) form a leading run
+    missing = 0 if idx is None else int(np.searchsorted(idx, 0))
+    groups = {}
+    for name, target in zip(names, targets):
+        values = _values(frame[name])
+        groups.setdefault(values.dtype, []).append((target, values))
+
+    parts = []
+    for dtype, columns in groups.items():
+        if not isinstance(dtype, np.dtype):
+            for target, values in columns:
+                values = values.copy() if idx is None else take(values, idx, allow_fill=missing > 0)
+                parts.append(pd.DataFrame({target: values}))
+            continue
+
+        if missing and dtype.kind in "iu":
+            dtype = np.dtype(np.float64)
+        elif missing and dtype.kind == "b":
+            dtype = np.dtype(object)
+        block = np.empty((len(columns), len(idx) if idx is not None else len(frame)), dtype=dtype)
+        for row, (_, values) in enumerate(columns):
+            if idx is None:
+                block[row] = values
+            elif values.dtype == dtype:
+                # mode="clip" avoids take()'s buffered out=; the -1 rows are overwritten below
+                np.take(values, idx, out=block[row], mode="clip")
+            else:
+                block[row] = values[idx]
+        if missing:
+            block[:, :missing] = None if dtype == object else np.nan
+        parts.append(pd.DataFrame(block.T, columns=[c[0] for c in columns], copy=False))
+    return parts
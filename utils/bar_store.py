@@ -0,0 +1,101 @@
+# utils/bar_store.py
+
+"""
+Persistent local OHLCV cache, one file pair per symbol/timeframe under
+data_cache/<backend namespace>/ (utils/broker: mt5, replay/<dataset>):
+- <SYMBOL>_<TF>.bin  : MT5 rate records (time, open, high, low, close, volumes...)
+                       stored back to back so they can be memory-mapped
+- <SYMBOL>_<TF>.json : dtype description plus the last synced bar time
+utils/datafeed uses it to ask MT5 only for bars newer than what is already on disk.
+Writes overwrite from the first incoming bar onwards, so a revised last bar
+(the one still forming at the previous sync) simply replaces the stored one.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+CACHE_DIR = "data_cache"
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class BarStore:
+    def __init__(self, symbol: str, timeframe: str, root: str = CACHE_DIR):
+        os.makedirs(root, exist_ok=True)
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.data_path = os.path.join(root, f"{symbol}_{timeframe}.bin")
+        self.meta_path = os.path.join(root, f"{symbol}_{timeframe}.json")
+        with _locks_guard:
+            self.lock = _locks.setdefault(self.data_path, threading.Lock())
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, "r") as f:
+            return json.load(f)
+
+    def _dtype(self):
+        meta = self._load_meta()
+        if meta is None:
+            return None
+        return np.lib.format.descr_to_dtype([tuple(field) for field in meta["dtype"]])
+
+    def read(self) -> np.ndarray:
+        """All cached bars, oldest first, as a read-only memory map (empty if none)."""
+        dtype = self._dtype()
+        if dtype is None or not os.path.exists(self.data_path):
+            return np.empty(0, dtype=dtype or [("time", "<i8")])
+        # Derive the count from the file size so a crash between data and meta writes is harmless
+        count = os.path.getsize(self.data_path) // dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.data_path, dtype=dtype, mode="r", shape=(count,))
+
+    def last_time(self):
+        bars = self.read()
+        return int(bars["time"][-1]) if len(bars) else None
+
+    def clear(self):
+        for path in (self.data_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write(self, rates: np.ndarray) -> int:
+        """
+        Merges freshly fetched bars (sorted by time) into the store: everything from
+        the first incoming bar's time onwards is replaced. Returns the stored bar count.
+        """
+        if len(rates) == 0:
+            return len(self.read())
+        rates = np.ascontiguousarray(rates)
+        existing = self.read()
+        if len(existing) and existing.dtype != rates.dtype:
+            existing = existing[:0]  # layout changed; start over
+        pos = int(np.searchsorted(existing["time"], rates["time"][0], side="left")) if len(existing) else 0
+        del existing  # release the memory map before writing
+
+        mode = "r+b" if pos and os.path.exists(self.data_path) else "wb"
+        with open(self.data_path, mode) as f:
+            f.seek(pos * rates.dtype.itemsize)
+            f.write(rates.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        meta = {
+            "dtype": np.lib.format.dtype_to_descr(rates.dtype),
+            "count": pos + len(rates),
+            "last_time": int(rates["time"][-1]),
+            "synced_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        return pos + len(rates)
@@ -0,0 +1,479 @@
+# utils/broker.py
+
+"""
+Pluggable market-data / order-routing backend for the live pipeline.
+Call sites import `mt5` from here instead of importing MetaTrader5 directly;
+it exposes the MetaTrader5 calls and constants the bot uses, plus a clock
+(now / time / sleep) so schedulers and cooldowns follow the backend's time.
+
+The MetaTrader5 package is not thread-safe, so every call through `mt5` is serialized
+on one lock (the clock methods excepted); callers may still use worker threads for the
+work around those calls.
+
+Backends (selected with MARKET_BACKEND):
+- "mt5"    : the real MetaTrader5 terminal (Windows), imported on first use
+- "replay" : serves copy_rates_*, symbol_info_tick, positions_get and order_send
+             from historical CSV/Parquet bars in REPLAY_DIR on a virtual clock running
+             REPLAY_SPEED times faster than real time, so the full live pipeline can
+             be run and load-tested on Linux without a terminal. Like MT5, the newest
+             bar of every timeframe is the one still forming (see ReplayBackend._visible).
+"""
+
+import os
+import threading
+import time as _time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+# === Configuration ===
+MARKET_BACKEND = os.getenv("MARKET_BACKEND", "mt5")  # "mt5" or "replay"
+REPLAY_DIR = os.getenv("REPLAY_DIR", os.path.join("Data", "replay"))
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1000"))
+REPLAY_START = os.getenv("REPLAY_START")  # ISO timestamp; defaults to data start + warmup
+REPLAY_WARMUP_DAYS = 200  # enough D1 history for the 200-bar window
+REPLAY_SPREAD = 20.0      # USD between bid and ask
+REPLAY_BALANCE = 10000.0
+UNLOCKED_CALLS = frozenset({"now", "time", "sleep", "bar_time_cutoff"})  # clock reads, never blocked behind a data call
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last"])
+Position = namedtuple("Position", ["ticket", "symbol", "type", "volume", "price_open",
+                                   "sl", "tp", "profit", "time"])
+OrderSendResult = namedtuple("OrderSendResult", ["retcode", "order", "comment"])
+AccountInfo = namedtuple("AccountInfo", ["balance", "equity", "margin_level"])
+TerminalInfo = namedtuple("TerminalInfo", ["connected", "name"])
+
+
+# === Interfaces ===
+class MarketDataSource(ABC):
+    """Bars and quotes, mirroring the MetaTrader5 call signatures."""
+
+    # Sub-directory of the local bar cache (utils/bar_store) holding this source's bars,
+    # so bars from different backends or replay datasets never mix
+    cache_namespace = "default"
+
+    @abstractmethod
+    def initialize(self):
+        ...
+
+    @abstractmethod
+    def shutdown(self):
+        ...
+
+    @abstractmethod
+    def last_error(self):
+        ...
+
+    @abstractmethod
+    def terminal_info(self):
+        ...
+
+    @abstractmethod
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        ...
+
+    @abstractmethod
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        ...
+
+    @abstractmethod
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        ...
+
+    @abstractmethod
+    def symbol_info_tick(self, symbol):
+        ...
+
+    def bar_time_cutoff(self):
+        """
+        Epoch time after which no bar can have been published yet, or None when bar times
+        are not on this backend's clock. MT5 stamps bars in trade-server time, which can run
+        hours ahead of UTC, so its bars cannot be checked against now().
+        """
+        return None
+
+    # Clock used by schedulers, cooldowns and "now"-relative data requests
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def time(self) -> float:
+        return _time.time()
+
+    def sleep(self, seconds: float):
+        _time.sleep(seconds)
+
+
+class Broker(ABC):
+    """Account, positions and order routing."""
+
+    @abstractmethod
+    def account_info(self):
+        ...
+
+    @abstractmethod
+    def positions_get(self, symbol=None):
+        ...
+
+    @abstractmethod
+    def order_send(self, request: dict):
+        ...
+
+
+# === MetaTrader5 Implementation ===
+class MT5Backend(MarketDataSource, Broker):
+    """Thin pass-through to the MetaTrader5 package (constants included)."""
+
+    cache_namespace = "mt5"
+
+    def __init__(self):
+        self._module = None
+
+    def _mt5(self):
+        if self._module is None:
+            import MetaTrader5
+            self._module = MetaTrader5
+        return self._module
+
+    def __getattr__(self, name):
+        # Constants and any call not wrapped explicitly
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._mt5(), name)
+
+    def initialize(self, *args, **kwargs):
+        return self._mt5().initialize(*args, **kwargs)
+
+    def shutdown(self):
+        return self._mt5().shutdown()
+
+    def last_error(self):
+        return self._mt5().last_error()
+
+    def terminal_info(self):
+        return self._mt5().terminal_info()
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        return self._mt5().copy_rates_from(symbol, timeframe, date_from, count)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        return self._mt5().copy_rates_from_pos(symbol, timeframe, start_pos, count)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        return self._mt5().copy_rates_range(symbol, timeframe, date_from, date_to)
+
+    def symbol_info_tick(self, symbol):
+        return self._mt5().symbol_info_tick(symbol)
+
+    def account_info(self):
+        return self._mt5().account_info()
+
+    def positions_get(self, symbol=None):
+        if symbol is None:
+            return self._mt5().positions_get()
+        return self._mt5().positions_get(symbol=symbol)
+
+    def order_send(self, request: dict):
+        return self._mt5().order_send(request)
+
+
+# === Historical Replay Implementation ===
+class ReplayBackend(MarketDataSource, Broker):
+    # MetaTrader5-compatible constants
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_D1 = 16408
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_SLTP = 6
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    ORDER_TIME_GTC = 0
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+
+    TIMEFRAMES = {TIMEFRAME_M15: ("M15", 900), TIMEFRAME_H1: ("H1", 3600),
+                  TIMEFRAME_H4: ("H4", 14400), TIMEFRAME_D1: ("D1", 86400)}
+
+    def __init__(self, data_dir=REPLAY_DIR, speed=REPLAY_SPEED, start=REPLAY_START,
+                 spread=REPLAY_SPREAD, balance=REPLAY_BALANCE):
+        self.data_dir = data_dir
+        self.cache_namespace = os.path.join("replay", os.path.basename(os.path.abspath(data_dir)))
+        self.speed = float(speed)
+        self.spread = float(spread)
+        self.balance = float(balance)
+        self._start = start
+        self._bars = {}  # (symbol, timeframe) -> rates array
+        self._positions = {}
+        self._next_ticket = 1
+        self._lock = threading.RLock()
+        self._connected = False
+        self._sim_origin = None
+        self._wall_origin = None
+
+    # --- Lifecycle and clock ---
+    def initialize(self, *args, **kwargs):
+        self._connected = True
+        return True
+
+    def shutdown(self):
+        self._connected = False
+
+    def last_error(self):
+        return (1, "Success")
+
+    def terminal_info(self):
+        return TerminalInfo(True, "replay") if self._connected else None
+
+    def _ensure_clock(self, symbol=None):
+        if self._sim_origin is not None:
+            return
+        if self._start:
+            origin = pd.Timestamp(self._start)
+            origin = origin.tz_localize("UTC") if origin.tzinfo is None else origin.tz_convert("UTC")
+            origin = origin.timestamp()
+        else:
+            bars = self._load(symbol or self._default_symbol(), self.TIMEFRAME_M15)
+            first, last = int(bars["time"][0]), int(bars["time"][-1])
+            origin = min(first + REPLAY_WARMUP_DAYS * 86400, last)
+        self._sim_origin = float(origin)
+        self._wall_origin = _time.monotonic()
+
+    def time(self) -> float:
+        self._ensure_clock()
+        return self._sim_origin + (_time.monotonic() - self._wall_origin) * self.speed
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time(), timezone.utc)
+
+    def sleep(self, seconds: float):
+        _time.sleep(max(0.0, seconds) / self.speed)
+
+    def bar_time_cutoff(self):
+        # Replay bars are stamped on the virtual clock
+        return self.time()
+
+    # --- Data loading ---
+    def _default_symbol(self):
+        for name in sorted(os.listdir(self.data_dir)):
+            if "_M15." in name:
+                return name.split("_M15.")[0]
+        raise FileNotFoundError(f"No <SYMBOL>_M15.csv/.parquet replay file in {self.data_dir}")
+
+    def _load(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        with self._lock:
+            if key in self._bars:
+                return self._bars[key]
+            tf_name = self.TIMEFRAMES[timeframe][0]
+            base = os.path.join(self.data_dir, f"{symbol}_{tf_name}")
+            if os.path.exists(base + ".parquet"):
+                df = pd.read_parquet(base + ".parquet")
+            elif os.path.exists(base + ".csv"):
+                df = pd.read_csv(base + ".csv")
+            else:
+                raise FileNotFoundError(f"No replay data for {symbol} {tf_name} in {self.data_dir}")
+            self._bars[key] = _frame_to_rates(df)
+            return self._bars[key]
+
+    def _visible(self, symbol, timeframe):
+        """
+        Bars as MT5 would return them at the virtual clock: every closed bar, then the bar
+        still forming. The data has no ticks, so the forming bar is built from what had
+        traded by now: the closed M15 bars of its period plus the current M15 bar's
+        opening price (High = Low = Close = Open, one tick).
+        """
+        bars = self._load(symbol, timeframe)
+        period = self.TIMEFRAMES[timeframe][1]
+        now = self.time()
+        cutoff = np.searchsorted(bars["time"], now - period, side="right")
+        if cutoff == len(bars) or bars["time"][cutoff] > now:
+            return bars[:cutoff]
+        return np.concatenate([bars[:cutoff], self._forming_bar(symbol, int(bars["time"][cutoff]), now)])
+
+    def _forming_bar(self, symbol, open_time, now):
+        base = self._load(symbol, self.TIMEFRAME_M15)
+        lo = np.searchsorted(base["time"], open_time, side="left")
+        hi = max(lo, np.searchsorted(base["time"], now - 900, side="right"))  # M15 bars closed by now
+        parts = base[lo:hi]
+        if hi < len(base) and base["time"][hi] <= now:
+            tick = base[hi:hi + 1].copy()  # the current M15 bar at its opening price
+            tick["high"] = tick["low"] = tick["close"] = tick["open"]
+            tick["tick_volume"] = 1
+            parts = np.concatenate([parts, tick])
+        if len(parts) == 0:
+            return parts  # no M15 data inside the period (gap in the data)
+        forming = parts[:1].copy()
+        forming["time"] = open_time
+        forming["high"], forming["low"] = parts["high"].max(), parts["low"].min()
+        forming["close"] = parts["close"][-1]
+        forming["tick_volume"] = parts["tick_volume"].sum()
+        return forming
+
+    # --- MarketDataSource ---
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        bars = self._visible(symbol, timeframe)
+        end = np.searchsorted(bars["time"], _epoch(date_from), side="right")
+        return bars[max(0, end - count):end].copy()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        bars = self._visible(symbol, timeframe)
+        end = len(bars) - start_pos
+        return bars[max(0, end - count):max(0, end)].copy()
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        bars = self._visible(symbol, timeframe)
+        lo = np.searchsorted(bars["time"], _epoch(date_from), side="left")
+        hi = np.searchsorted(bars["time"], _epoch(date_to), side="right")
+        return bars[lo:hi].copy()
+
+    def symbol_info_tick(self, symbol):
+        bars = self._visible(symbol, self.TIMEFRAME_M15)
+        if len(bars) == 0:
+            return None
+        bid = float(bars["close"][-1])
+        return Tick(int(self.time()), bid, bid + self.spread, bid)
+
+    # --- Broker ---
+    def account_info(self):
+        with self._lock:
+            floating = sum(p.profit for p in self.positions_get() or [])
+            return AccountInfo(self.balance, self.balance + floating, 0.0)
+
+    def positions_get(self, symbol=None):
+        with self._lock:
+            result = []
+            for ticket, p in list(self._positions.items()):
+                if symbol is not None and p["symbol"] != symbol:
+                    continue
+                tick = self.symbol_info_tick(p["symbol"])
+                is_buy = p["type"] == self.ORDER_TYPE_BUY
+                price = tick.bid if is_buy else tick.ask
+                # Broker-side SL/TP: close the position once price trades through a level
+                hit = (p["sl"] and (price <= p["sl"] if is_buy else price >= p["sl"])) or \
+                      (p["tp"] and (price >= p["tp"] if is_buy else price <= p["tp"]))
+                profit = (price - p["price_open"]) * p["volume"] * (1 if is_buy else -1)
+                if hit:
+                    self.balance += profit
+                    del self._positions[ticket]
+                    continue
+                result.append(Position(ticket, p["symbol"], p["type"], p["volume"], p["price_open"],
+                                       p["sl"], p["tp"], profit, p["time"]))
+            return tuple(result)
+
+    def order_send(self, request: dict):
+        with self._lock:
+            action = request.get("action")
+            if action == self.TRADE_ACTION_SLTP:
+                p = self._positions.get(request.get("position"))
+                if p is None:
+                    return OrderSendResult(self.TRADE_RETCODE_INVALID, 0, "Position not found")
+                p["sl"], p["tp"] = request.get("sl", p["sl"]), request.get("tp", p["tp"])
+                return OrderSendResult(self.TRADE_RETCODE_DONE, request["position"], "Request executed")
+
+            if action != self.TRADE_ACTION_DEAL:
+                return OrderSendResult(self.TRADE_RETCODE_INVALID, 0, "Unsupported action")
+
+            tick = self.symbol_info_tick(request["symbol"])
+            if tick is None:
+                return OrderSendResult(self.TRADE_RETCODE_INVALID, 0, "No prices")
+            is_buy = request["type"] == self.ORDER_TYPE_BUY
+            price = tick.ask if is_buy else tick.bid
+
+            # A deal against an existing position closes it
+            closing = self._positions.get(request.get("position"))
+            if closing is not None:
+                self.balance += (price - closing["price_open"]) * closing["volume"] * \
+                    (1 if closing["type"] == self.ORDER_TYPE_BUY else -1)
+                del self._positions[request["position"]]
+                return OrderSendResult(self.TRADE_RETCODE_DONE, request["position"], "Request executed")
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._positions[ticket] = {
+                "symbol": request["symbol"], "type": request["type"], "volume": request["volume"],
+                "price_open": price, "sl": request.get("sl", 0.0), "tp": request.get("tp", 0.0),
+                "time": int(self.time()),
+            }
+            return OrderSendResult(self.TRADE_RETCODE_DONE, ticket, "Request executed")
+
+
+# === Internal Helpers ===
+def _epoch(value) -> float:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)  # MT5 treats naive datetimes as UTC
+        return value.timestamp()
+    return float(value)
+
+def _frame_to_rates(df: pd.DataFrame) -> np.ndarray:
+    """Accepts MT5-style (time, open, ..., tick_volume) or repo-style (Timestamp, Open, ..., Volume) columns."""
+    cols = {c.lower(): c for c in df.columns}
+    time_col = cols.get("time", cols.get("timestamp"))
+    times = df[time_col]
+    if pd.api.types.is_numeric_dtype(times):
+        epochs = times.to_numpy(dtype=np.int64)
+    else:
+        epochs = pd.to_datetime(times, utc=True).dt.tz_convert(None).to_numpy("datetime64[s]").astype(np.int64)
+
+    rates = np.zeros(len(df), dtype=RATES_DTYPE)
+    rates["time"] = epochs
+    for field in ("open", "high", "low", "close"):
+        rates[field] = df[cols[field]].to_numpy(dtype=np.float64)
+    volume_col = cols.get("tick_volume", cols.get("volume"))
+    if volume_col is not None:
+        rates["tick_volume"] = df[volume_col].to_numpy(dtype=np.float64).astype(np.uint64)
+    return rates[np.argsort(rates["time"], kind="stable")]
+
+
+def create_backend(name: str = MARKET_BACKEND):
+    if name == "replay":
+        return ReplayBackend()
+    if name == "mt5":
+        return MT5Backend()
+    raise ValueError(f"Unknown market backend: {name}")
+
+class LazyBackend:
+    """
+    Stands in for the backend until its first attribute access, which creates it with
+    `factory`; importing datafeed, newpredict & co. therefore never loads MetaTrader5.
+    Calls go through one lock, so concurrent threads reach the backend one at a time.
+    """
+
+    def __init__(self, factory=create_backend):
+        self._factory = factory
+        self._backend = None
+        self._lock = threading.Lock()
+        self._call_lock = threading.RLock()
+
+    def get(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._factory()
+        return self._backend
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        value = getattr(self.get(), name)
+        if not callable(value) or name in UNLOCKED_CALLS:
+            return value
+
+        def call(*args, **kwargs):
+            with self._call_lock:
+                return value(*args, **kwargs)
+        return call
+
+# Shared backend used by datafeed, trader, live_monitor and the loops (created on first use)
+mt5 = LazyBackend()
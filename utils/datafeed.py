@@ -4,40 +4,107 @@ Then merge them properly using backward timestamp alignment,
  to produce a final DataFrame suitable for feature engineering.
 This final df will merge exactly what we had when we merged
  the dataset earlier before training.
+With USE_BAR_CACHE enabled, bars are kept in a local on-disk store (utils/bar_store.py)
+ and each call only requests the bars MT5 has published since the last sync.
+The four timeframes are synced on a small worker pool after the MT5 session has been
+ opened once. The MetaTrader5 package is not thread-safe, so the terminal requests
+ themselves are serialized (utils/broker); cache reads/writes and frame conversion run in parallel.
+With RESAMPLE_HIGHER_TIMEFRAMES enabled, only M15 is requested and the H1/H4/D1 bars
+ are built from it locally (resample_ohlcv), aligned to the broker's session start.
+With closed_only (CLOSED_HTF_BARS_ONLY), each M15 row only gets H1/H4/Daily bars that had
+ closed by the end of that M15 bar, never the forming one; the training merge in the
+ capstone notebook has the matching CLOSED_BARS_ONLY switch.
 """
 # utils/datafeed.py
 
-import MetaTrader5 as mt5
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.broker import mt5
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-
-#  Mapping string to MT5 timeframes
-TIMEFRAME_MAP = {
-    "M15": mt5.TIMEFRAME_M15,
-    "H1": mt5.TIMEFRAME_H1,
-    "H4": mt5.TIMEFRAME_H4,
-    "D1": mt5.TIMEFRAME_D1,
+from datetime import datetime, timedelta, timezone
+from utils.alignment import align_timeframes
+from utils.bar_store import CACHE_DIR, BarStore
+
+TIMEFRAME_SECONDS = {
+    "M15": 15 * 60,
+    "H1": 60 * 60,
+    "H4": 4 * 60 * 60,
+    "D1": 24 * 60 * 60,
 }
 
+#  Mapping string to MT5 timeframes (looked up on use, so importing this module does not load the backend)
+def mt5_timeframe(timeframe: str):
+    if timeframe not in TIMEFRAME_SECONDS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return getattr(mt5, f"TIMEFRAME_{timeframe}")
+
+# === Local Bar Cache ===
+USE_BAR_CACHE = True
+CACHE_BACKFILL_BARS = 1000  # bars pulled on the first sync of a symbol/timeframe
+CACHE_OVERLAP_BARS = 2      # most recent stored bars re-requested to pick up revisions
+
+# === Concurrent Fetching ===
+FETCH_WORKERS = 4  # one per timeframe; terminal requests are serialized regardless
+fetch_latency = {}  # timeframe -> seconds taken by its most recent fetch
+
+# === Local Resampling ===
+RESAMPLE_HIGHER_TIMEFRAMES = False  # build H1/H4/D1 from M15 instead of requesting them
+SESSION_OFFSET_HOURS = 0  # server-time hour at which the broker's D1 (and H4) buckets open
+
+# === Higher-Timeframe Alignment ===
+CLOSED_HTF_BARS_ONLY = False  # lookahead-safe: join only closed H1/H4/D1 bars (retrain to match)
+
+_session_lock = threading.Lock()
+_session_open = False
+_fetch_pool = None
+
 #  Core MT5 Lifecycle
 def initialize_mt5():
-    if not mt5.initialize():
-        raise ConnectionError(f"MT5 initialization failed: {mt5.last_error()}")
+    # The calling thread owns the session: it connects once and later calls only
+    # check the terminal is still attached. Fetch workers never (re)initialize.
+    global _session_open
+    with _session_lock:
+        if _session_open and mt5.terminal_info() is not None:
+            return
+        if not mt5.initialize():
+            raise ConnectionError(f"MT5 initialization failed: {mt5.last_error()}")
+        _session_open = True
+
+def _get_fetch_pool():
+    global _fetch_pool
+    with _session_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="mt5-fetch")
+        return _fetch_pool
 
 #  Fetch OHLCV from MT5
 def get_mt5_data(symbol: str, timeframe: str, num_candles: int) -> pd.DataFrame:
-    tf = TIMEFRAME_MAP.get(timeframe)
-    if tf is None:
-        raise ValueError(f"Unsupported timeframe: {timeframe}")
-
-    utc_from = datetime.utcnow() - timedelta(days=30)  # safety window
     initialize_mt5()
-    rates = mt5.copy_rates_from(symbol, tf, utc_from, num_candles)
+    return _fetch_frame(symbol, timeframe, num_candles)
+
+def _fetch_frame(symbol: str, timeframe: str, num_candles: int) -> pd.DataFrame:
+    # Assumes the session is already open
+    tf = mt5_timeframe(timeframe)
 
+    start = time.perf_counter()
+    if USE_BAR_CACHE:
+        rates = sync_bar_cache(symbol, timeframe, num_candles)[-num_candles:]
+    else:
+        utc_from = datetime.utcnow() - timedelta(days=30)  # safety window
+        rates = mt5.copy_rates_from(symbol, tf, utc_from, num_candles)
+    fetch_latency[timeframe] = time.perf_counter() - start
 
     if rates is None or len(rates) == 0:
         raise RuntimeError(f"No data returned for {symbol} {timeframe}")
 
+    return rates_to_frame(rates)
+
+#  Convert MT5 rate records to the OHLCV layout used everywhere else
+def rates_to_frame(rates) -> pd.DataFrame:
     df = pd.DataFrame(rates)
     df['Timestamp'] = pd.to_datetime(df['time'], unit='s', utc=True)
     df = df.rename(columns={
@@ -50,39 +117,115 @@ def get_mt5_data(symbol: str, timeframe: str, num_candles: int) -> pd.DataFrame:
     df = df[['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']]
     return df
 
-#  Rename columns to reflect timeframe source
-def rename_ohlcv_columns(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
-    renamed = df.copy()
-    renamed.columns = ['Timestamp'] + [f"{prefix}_{col}" for col in ['Open', 'High', 'Low', 'Close', 'Volume']]
-    return renamed
+#  Bring the local store up to date and return every cached bar up to the backend's "now"
+def sync_bar_cache(symbol: str, timeframe: str, num_candles: int):
+    tf = mt5_timeframe(timeframe)
+    period = TIMEFRAME_SECONDS[timeframe]
+    # One cache per backend / data source (data_cache/mt5, data_cache/replay/<dataset>)
+    store = BarStore(symbol, timeframe, root=os.path.join(CACHE_DIR, mt5.cache_namespace))
+    with store.lock:
+        cached = store.read()
+        cached_count = len(cached)
+        last_time = int(cached["time"][-1]) if cached_count else None
+        overlap_time = int(cached["time"][-min(CACHE_OVERLAP_BARS, cached_count)]) if cached_count else None
+        del cached  # release the memory map before the store is rewritten
+        now = mt5.now()
+        # Only replay bars share the backend clock (MT5 stamps bars in server time); there,
+        # cached bars past the clock come from an earlier, further-advanced replay run
+        cutoff = mt5.bar_time_cutoff()
+        ahead = cutoff is not None and last_time is not None and last_time > cutoff
+
+        if ahead or cached_count < num_candles or now.timestamp() - last_time > CACHE_BACKFILL_BARS * period:
+            # First run, too little history, or a gap too long to bridge: backfill the latest bars
+            if ahead:
+                store.clear()
+            rates = mt5.copy_rates_from_pos(symbol, tf, 0, max(num_candles, CACHE_BACKFILL_BARS))
+            if rates is not None and len(rates) and last_time is not None and rates["time"][0] > last_time:
+                store.clear()  # no overlap with the cached bars, so they cannot be stitched together
+        else:
+            # Only bars from the last stored ones onwards; re-requesting the overlap picks up revisions.
+            # The day of slack covers server time running ahead of UTC
+            rates = mt5.copy_rates_range(
+                symbol, tf,
+                datetime.fromtimestamp(overlap_time, timezone.utc),
+                now + timedelta(days=1)
+            )
+
+        fetched = 0 if rates is None else len(rates)
+        if fetched:
+            store.write(rates)
+        print(f" {symbol} {timeframe}: fetched {fetched} bar(s) from MT5")
+        bars = store.read()
+        if cutoff is not None:
+            # Never hand out replay bars the backend would not have published yet
+            bars = bars[:int(np.searchsorted(bars["time"], cutoff, side="right"))]
+        return bars
+
+#  Aggregate base bars into a higher timeframe
+def resample_ohlcv(df: pd.DataFrame, timeframe: str, session_offset_hours: float = SESSION_OFFSET_HOURS) -> pd.DataFrame:
+    """
+    Builds `timeframe` bars from sorted lower-timeframe bars (Timestamp = bar open).
+    Buckets start at multiples of the period shifted by the session offset, matching how
+    the broker opens its H4 and daily bars. A leading bucket only partly covered by `df`
+    is dropped; the last bucket is the still-forming bar, as MT5 returns it.
+    """
+    period = TIMEFRAME_SECONDS[timeframe]
+    offset = int(session_offset_hours * 3600)
+    seconds = pd.DatetimeIndex(df["Timestamp"]).as_unit("s").asi8
+    buckets = (seconds - offset) // period * period + offset
+
+    first = 0
+    if len(seconds) and seconds[0] != buckets[0]:
+        first = int(np.searchsorted(buckets, buckets[0], side="right"))
+    seconds, buckets = seconds[first:], buckets[first:]
+    if len(buckets) == 0:
+        return df.iloc[:0][["Timestamp", "Open", "High", "Low", "Close", "Volume"]].reset_index(drop=True)
+
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    open_, high, low, close, volume = (df[col].to_numpy()[first:] for col in ["Open", "High", "Low", "Close", "Volume"])
+    return pd.DataFrame({
+        "Timestamp": pd.to_datetime(buckets[starts], unit="s", utc=True),
+        "Open": open_[starts],
+        "High": np.maximum.reduceat(high, starts),
+        "Low": np.minimum.reduceat(low, starts),
+        "Close": close[ends],
+        "Volume": np.add.reduceat(volume, starts),
+    })
 
 #  Merge logic (replicates your analysis step-by-step)
-def get_merged_ohlcv(symbol: str, num_candles: int = 200) -> pd.DataFrame:
+def get_merged_ohlcv(symbol: str, num_candles: int = 200, closed_only: bool = CLOSED_HTF_BARS_ONLY) -> pd.DataFrame:
     print(" Fetching data from MT5...")
 
-    # Step 1: Pull from MT5
-    m15_df = get_mt5_data(symbol, "M15", num_candles)
-    h1_df = get_mt5_data(symbol, "H1", num_candles)
-    h4_df = get_mt5_data(symbol, "H4", num_candles)
-    d1_df = get_mt5_data(symbol, "D1", num_candles)
-
-    # Step 2: Rename OHLCV columns for non-M15 timeframes
-    h1_df = rename_ohlcv_columns(h1_df, "H1")
-    h4_df = rename_ohlcv_columns(h4_df, "H4")
-    d1_df = rename_ohlcv_columns(d1_df, "Daily")
-
-    # Step 3: Sort before merge_asof
-    m15_df.sort_values("Timestamp", inplace=True)
-    h1_df.sort_values("Timestamp", inplace=True)
-    h4_df.sort_values("Timestamp", inplace=True)
-    d1_df.sort_values("Timestamp", inplace=True)
-
-    # Step 4: Merge in stages
-    merged = pd.merge_asof(m15_df, h1_df, on="Timestamp", direction="backward")
-    merged = pd.merge_asof(merged, h4_df, on="Timestamp", direction="backward")
-    merged = pd.merge_asof(merged, d1_df, on="Timestamp", direction="backward")
-
-    # Step 5: Validate
+    # Step 1: Pull from MT5, all timeframes at once (or only M15 when resampling locally)
+    initialize_mt5()
+    start = time.perf_counter()
+    if RESAMPLE_HIGHER_TIMEFRAMES:
+        # The M15 window plus one full day before it, so the H1/H4/D1 bucket the first
+        # M15 row falls in is complete (the merge only needs bars covering that window)
+        base_count = num_candles + TIMEFRAME_SECONDS["D1"] // TIMEFRAME_SECONDS["M15"]
+        base_df = _fetch_frame(symbol, "M15", base_count)
+        m15_df = base_df.iloc[-num_candles:].reset_index(drop=True)
+        h1_df, h4_df, d1_df = [resample_ohlcv(base_df, tf).iloc[-num_candles:] for tf in ("H1", "H4", "D1")]
+        timeframes = ("M15",)
+    else:
+        timeframes = ("M15", "H1", "H4", "D1")
+        futures = [_get_fetch_pool().submit(_fetch_frame, symbol, tf, num_candles) for tf in timeframes]
+        m15_df, h1_df, h4_df, d1_df = [f.result() for f in futures]
+    print(" Fetch latency: " + ", ".join(f"{tf} {fetch_latency[tf]:.3f}s" for tf in timeframes)
+          + f" (all {time.perf_counter() - start:.3f}s)")
+
+    # Step 2: Attach the latest H1/H4/Daily bar to every M15 row in one pass,
+    # prefixing their OHLCV columns (same result as sorting + chained backward merge_asof).
+    # closed_only matches on close times instead: a higher bar becomes visible to the
+    # M15 row whose bar closes at the same moment or later.
+    shifts = None
+    if closed_only:
+        shifts = [pd.Timedelta(seconds=TIMEFRAME_SECONDS[tf] - TIMEFRAME_SECONDS["M15"]) for tf in ("H1", "H4", "D1")]
+    merged = align_timeframes(m15_df, [h1_df, h4_df, d1_df], on="Timestamp",
+                              prefixes=["H1", "H4", "Daily"], shifts=shifts)
+
+    # Step 3: Validate
     if len(merged) != len(m15_df):
         raise ValueError(f" Row mismatch after merging: expected {len(m15_df)}, got {len(merged)}")
 
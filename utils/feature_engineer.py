@@ -9,6 +9,19 @@ including indicators (SMA, EMA, ATR, MACD, Bollinger Bands),
 
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Final 49 features consumed by the models
+FINAL_COLUMNS = [
+    "Open", "High", "Low", "Close", "H1_Open", "H1_Low", "H1_Close", "H1_Volume",
+    "H4_High", "H4_Low", "H4_Close", "H4_Volume", "Daily_Open", "Daily_High",
+    "Daily_Low", "Daily_Close", "Daily_Volume", "SMA_10", "SMA_200", "EMA_10",
+    "EMA_50", "EMA_200", "ATR_14", "BB_Upper", "BB_Lower", "MACD", "Swing_Low",
+    "Rolling_High", "Rolling_Low", "Prev_Swing_High", "Prev_Swing_Low", "Prev_Highs",
+    "Prev_Lows", "FVG_Low", "FVG_High", "Bullish_OB", "Bearish_OB", "OB_Low",
+    "OB_High", "OB_Mitigated", "Breaker_Block", "Fair_Value_Mid", "Is_Premium",
+    "Is_Discount", "Avg_Volume", "Log_Returns", "HV", "Doji", "HV_lag1"
+]
 
 # === Technical Indicators ===
 def add_moving_averages(df):
@@ -47,14 +60,29 @@ def add_market_structure_features(df):
     df['Rolling_Low'] = df['Low'].rolling(window=20).min()
     return df
 
+def _swing_points(high, low, window=5):
+    # A bar is a swing point when it strictly exceeds the `window` bars on each side.
+    # Rolling extremes over sliding windows replace the per-row slice comparisons.
+    n = len(high)
+    swing_high = np.full(n, np.nan)
+    swing_low = np.full(n, np.nan)
+    if n < 2 * window + 1:
+        return swing_high, swing_low
+    roll_max = sliding_window_view(high, window).max(axis=1)
+    roll_min = sliding_window_view(low, window).min(axis=1)
+    idx = np.arange(window, n - window)
+    is_high = (high[idx] > roll_max[idx - window]) & (high[idx] > roll_max[idx + 1])
+    is_low = (low[idx] < roll_min[idx - window]) & (low[idx] < roll_min[idx + 1])
+    swing_high[idx[is_high]] = high[idx[is_high]]
+    swing_low[idx[is_low]] = low[idx[is_low]]
+    return swing_high, swing_low
+
 def detect_bos(df):
-    df['Swing_High'] = np.nan
-    df['Swing_Low'] = np.nan
-    for i in range(5, len(df)-5):
-        if df.loc[i, 'High'] > max(df.loc[i-5:i-1, 'High']) and df.loc[i, 'High'] > max(df.loc[i+1:i+5, 'High']):
-            df.loc[i, 'Swing_High'] = df.loc[i, 'High']
-        if df.loc[i, 'Low'] < min(df.loc[i-5:i-1, 'Low']) and df.loc[i, 'Low'] < min(df.loc[i+1:i+5, 'Low']):
-            df.loc[i, 'Swing_Low'] = df.loc[i, 'Low']
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    swing_high, swing_low = _swing_points(high, low)
+    df['Swing_High'] = swing_high
+    df['Swing_Low'] = swing_low
     df['Prev_Swing_High'] = df['Swing_High'].ffill().shift(1)
     df['Prev_Swing_Low'] = df['Swing_Low'].ffill().shift(1)
     df['Prev_Highs'] = df['High'].rolling(window=20).max().shift(1)
@@ -62,51 +90,81 @@ def detect_bos(df):
     return df
 
 def detect_fvg(df):
-    df['FVG_Low'] = np.nan
-    df['FVG_High'] = np.nan
-    for i in range(2, len(df)):
-        c1, c3 = i - 2, i
-        if df.loc[c1, 'High'] < df.loc[c3, 'Low']:
-            df.loc[c3, 'FVG_Low'] = df.loc[c1, 'High']
-            df.loc[c3, 'FVG_High'] = df.loc[c3, 'Low']
-        elif df.loc[c1, 'Low'] > df.loc[c3, 'High']:
-            df.loc[c3, 'FVG_Low'] = df.loc[c3, 'High']
-            df.loc[c3, 'FVG_High'] = df.loc[c1, 'Low']
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    fvg_low = np.full(len(df), np.nan)
+    fvg_high = np.full(len(df), np.nan)
+    if len(df) > 2:
+        # Compare candle i-2 with candle i; a bullish gap takes precedence over a bearish one
+        c1_high, c1_low = high[:-2], low[:-2]
+        c3_high, c3_low = high[2:], low[2:]
+        bullish = c1_high < c3_low
+        bearish = ~bullish & (c1_low > c3_high)
+        fvg_low[2:] = np.where(bullish, c1_high, np.where(bearish, c3_high, np.nan))
+        fvg_high[2:] = np.where(bullish, c3_low, np.where(bearish, c1_low, np.nan))
+    df['FVG_Low'] = fvg_low
+    df['FVG_High'] = fvg_high
     return df
 
+def _order_blocks(open_, high, low, close, body_ratio=0.6, lookahead=5):
+    # Strong-bodied candles whose range is taken out within `lookahead` bars.
+    n = len(close)
+    bullish = np.zeros(n, dtype=np.int64)
+    bearish = np.zeros(n, dtype=np.int64)
+    ob_low = np.full(n, np.nan)
+    ob_high = np.full(n, np.nan)
+    if n <= lookahead:
+        return bullish, bearish, ob_low, ob_high
+    idx = np.arange(n - lookahead)
+    rng = high[idx] - low[idx]
+    body = np.abs(close[idx] - open_[idx])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strong = (rng != 0) & ~((body / rng) < body_ratio)
+    fwd_high = sliding_window_view(high, lookahead).max(axis=1)[idx + 1]
+    fwd_low = sliding_window_view(low, lookahead).min(axis=1)[idx + 1]
+    is_bull = strong & (close[idx] < open_[idx]) & (fwd_high > high[idx])
+    is_bear = strong & (close[idx] > open_[idx]) & (fwd_low < low[idx])
+    bullish[idx[is_bull]] = 1
+    bearish[idx[is_bear]] = 1
+    marked = idx[is_bull | is_bear]
+    ob_low[marked] = low[marked]
+    ob_high[marked] = high[marked]
+    return bullish, bearish, ob_low, ob_high
+
+def _prev(arr, fill):
+    out = np.empty_like(arr)
+    out[:1] = fill
+    out[1:] = arr[:-1]
+    return out
+
 def detect_order_blocks(df):
-    df['Bullish_OB'] = 0
-    df['Bearish_OB'] = 0
-    df['OB_Low'] = np.nan
-    df['OB_High'] = np.nan
-    for i in range(len(df) - 5):
-        body = abs(df.loc[i, 'Close'] - df.loc[i, 'Open'])
-        rng = df.loc[i, 'High'] - df.loc[i, 'Low']
-        if rng == 0 or (body / rng) < 0.6:
-            continue
-        if df.loc[i, 'Close'] < df.loc[i, 'Open'] and df.loc[i+1:i+5, 'High'].max() > df.loc[i, 'High']:
-            df.loc[i, 'Bullish_OB'] = 1
-            df.loc[i, 'OB_Low'] = df.loc[i, 'Low']
-            df.loc[i, 'OB_High'] = df.loc[i, 'High']
-        if df.loc[i, 'Close'] > df.loc[i, 'Open'] and df.loc[i+1:i+5, 'Low'].min() < df.loc[i, 'Low']:
-            df.loc[i, 'Bearish_OB'] = 1
-            df.loc[i, 'OB_Low'] = df.loc[i, 'Low']
-            df.loc[i, 'OB_High'] = df.loc[i, 'High']
-    df['OB_Mitigated'] = 0
-    for i in range(1, len(df)):
-        if df.loc[i, 'Bullish_OB'] == 0 and df.loc[i, 'Low'] <= df.loc[i - 1, 'OB_High'] and df.loc[i - 1, 'Bullish_OB'] == 1:
-            df.loc[i, 'OB_Mitigated'] = 1
-        elif df.loc[i, 'Bearish_OB'] == 0 and df.loc[i, 'High'] >= df.loc[i - 1, 'OB_Low'] and df.loc[i - 1, 'Bearish_OB'] == 1:
-            df.loc[i, 'OB_Mitigated'] = 1
+    open_ = df['Open'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    bullish, bearish, ob_low, ob_high = _order_blocks(open_, high, low, close)
+    df['Bullish_OB'] = bullish
+    df['Bearish_OB'] = bearish
+    df['OB_Low'] = ob_low
+    df['OB_High'] = ob_high
+
+    # Mitigation: price trades back into the order block on the very next bar
+    prev_bull, prev_bear = _prev(bullish, 0), _prev(bearish, 0)
+    mitigated = (
+        ((bullish == 0) & (prev_bull == 1) & (low <= _prev(ob_high, np.nan))) |
+        ((bearish == 0) & (prev_bear == 1) & (high >= _prev(ob_low, np.nan)))
+    )
+    df['OB_Mitigated'] = mitigated.astype(np.int64)
     return df
 
 def detect_breaker_blocks(df):
-    df['Breaker_Block'] = 0
-    for i in range(1, len(df)):
-        if df.loc[i-1, 'Bullish_OB'] == 1 and df.loc[i, 'Close'] < df.loc[i-1, 'OB_Low']:
-            df.loc[i, 'Breaker_Block'] = 1
-        elif df.loc[i-1, 'Bearish_OB'] == 1 and df.loc[i, 'Close'] > df.loc[i-1, 'OB_High']:
-            df.loc[i, 'Breaker_Block'] = 1
+    close = df['Close'].to_numpy(dtype=np.float64)
+    prev_bull = _prev(df['Bullish_OB'].to_numpy(), 0)
+    prev_bear = _prev(df['Bearish_OB'].to_numpy(), 0)
+    prev_low = _prev(df['OB_Low'].to_numpy(dtype=np.float64), np.nan)
+    prev_high = _prev(df['OB_High'].to_numpy(dtype=np.float64), np.nan)
+    breaker = ((prev_bull == 1) & (close < prev_low)) | ((prev_bear == 1) & (close > prev_high))
+    df['Breaker_Block'] = breaker.astype(np.int64)
     return df
 
 def add_premium_discount_zone(df):
@@ -150,16 +208,6 @@ def engineer_features(df):
     df.ffill(inplace=True)
 
     # Trim to final 49 features
-    final_columns = [
-        "Open", "High", "Low", "Close", "H1_Open", "H1_Low", "H1_Close", "H1_Volume",
-        "H4_High", "H4_Low", "H4_Close", "H4_Volume", "Daily_Open", "Daily_High",
-        "Daily_Low", "Daily_Close", "Daily_Volume", "SMA_10", "SMA_200", "EMA_10",
-        "EMA_50", "EMA_200", "ATR_14", "BB_Upper", "BB_Lower", "MACD", "Swing_Low",
-        "Rolling_High", "Rolling_Low", "Prev_Swing_High", "Prev_Swing_Low", "Prev_Highs",
-        "Prev_Lows", "FVG_Low", "FVG_High", "Bullish_OB", "Bearish_OB", "OB_Low",
-        "OB_High", "OB_Mitigated", "Breaker_Block", "Fair_Value_Mid", "Is_Premium",
-        "Is_Discount", "Avg_Volume", "Log_Returns", "HV", "Doji", "HV_lag1"
-    ]
-    df = df[final_columns]
+    df = df[FINAL_COLUMNS]
 
     return df
@@ -0,0 +1,84 @@
+# utils/fused_scaler.py
+
+"""
+Fused select + scale stage in front of the ensemble. Built once from a bundle's scaler
+(scaler.json or a fitted StandardScaler from scaler.pkl) and its RFE feature list, it
+turns engineered feature values straight into the float32 model input: the RFE columns
+are gathered by precomputed position, then mean/scale are applied in place on that one
+buffer. It replaces `features[rfe_features]` + `scaler.transform` (two intermediate
+frames per call) in utils/predictor and can be attached to IncrementalFeatureEngine,
+which then emits the model input vector for every bar.
+The arithmetic matches StandardScaler.transform ((x - mean) / scale in float64) before
+the float32 cast the models apply anyway, so the results are bit-identical.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.feature_engineer import FINAL_COLUMNS
+
+
+class FusedScaler:
+    def __init__(self, mean, scale, features, columns=FINAL_COLUMNS):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        if not (len(self.mean) == len(self.scale) == len(self.features)):
+            raise ValueError(f"Scaler has {len(self.mean)} features, the feature list has {len(self.features)}")
+        self.columns = list(columns)
+        self.index = self.index_for(self.columns)
+        self._index_cache = {tuple(self.columns): self.index}
+
+    @classmethod
+    def from_json(cls, path: str, features, columns=FINAL_COLUMNS):
+        with open(path, "r") as f:
+            scaler_dict = json.load(f)
+        return cls(scaler_dict["mean_"], scaler_dict["scale_"], features, columns)
+
+    @classmethod
+    def from_estimator(cls, scaler, features, columns=FINAL_COLUMNS):
+        """From a fitted sklearn StandardScaler; its own feature order wins if it recorded one."""
+        n = scaler.n_features_in_
+        # transform() skips centring / scaling when the flag is off, even though mean_ is still fitted
+        mean = scaler.mean_ if getattr(scaler, "with_mean", True) and scaler.mean_ is not None else np.zeros(n)
+        scale = scaler.scale_ if getattr(scaler, "with_std", True) and scaler.scale_ is not None else np.ones(n)
+        names = getattr(scaler, "feature_names_in_", None)
+        if names is not None and list(names) != list(features):
+            raise ValueError("Scaler feature names differ from the feature list")
+        return cls(mean, scale, features, columns)
+
+    def index_for(self, columns) -> np.ndarray:
+        """Positions of the RFE features within `columns`."""
+        positions = pd.Index(columns).get_indexer(self.features)
+        if (positions < 0).any():
+            missing = [name for name, pos in zip(self.features, positions) if pos < 0]
+            raise KeyError(f"Features missing from the input: {missing}")
+        return positions
+
+    def _cached_index(self, columns) -> np.ndarray:
+        key = tuple(columns)
+        index = self._index_cache.get(key)
+        if index is None:
+            index = self._index_cache[key] = self.index_for(columns)
+        return index
+
+    def transform(self, values, columns=None, out=None) -> np.ndarray:
+        """
+        Scaled RFE-ordered float32 input. `values` is a DataFrame or Series (columns by name),
+        or a 1-D / 2-D array laid out like `columns` (default: the columns given at construction,
+        FINAL_COLUMNS for engineer_features / IncrementalFeatureEngine output).
+        """
+        if isinstance(values, (pd.DataFrame, pd.Series)):
+            columns = values.columns if isinstance(values, pd.DataFrame) else values.index
+            values = values.to_numpy(dtype=np.float64)
+        index = self.index if columns is None else self._cached_index(columns)
+
+        selected = np.take(np.asarray(values, dtype=np.float64), index, axis=-1)
+        selected -= self.mean
+        selected /= self.scale
+        if out is None:
+            return selected.astype(np.float32)
+        out[...] = selected
+        return out
@@ -0,0 +1,371 @@
+# utils/incremental_features.py
+
+"""
+Streaming counterpart of utils/feature_engineer.engineer_features.
+Instead of recomputing all 49 features over the full bar window every cycle,
+IncrementalFeatureEngine keeps rolling state (SMA/EMA accumulators, ATR and
+Bollinger sums, rolling max/min deques, pending swing and order-block candidates)
+and updates the feature vector for each newly closed M15 bar in O(1) amortized time.
+
+Window semantics: the vector returned for a bar matches the last row of
+engineer_features run over every bar the engine has seen since warm_start (the seed
+history plus all updates), including the final bfill/ffill pass. It is NOT the last
+row of engineer_features over a fixed trailing window such as main.BAR_COUNT: EMA_200,
+SMA_200 and the fill edges depend on how far back the history reaches. Seeding with
+a long history (LiveFeatureStream, WARMUP_BARS) brings the long averages close to the
+values training computed over the full dataset.
+With an input_stage (utils/fused_scaler.FusedScaler, e.g. Predictor.input_stage) the
+engine also fills `model_input`, the scaled RFE-ordered float32 vector the ensemble
+consumes, straight from the raw feature values.
+"""
+
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils.feature_engineer import FINAL_COLUMNS
+
+PASSTHROUGH_COLUMNS = [
+    "Open", "High", "Low", "Close", "H1_Open", "H1_Low", "H1_Close", "H1_Volume",
+    "H4_High", "H4_Low", "H4_Close", "H4_Volume", "Daily_Open", "Daily_High",
+    "Daily_Low", "Daily_Close", "Daily_Volume"
+]
+
+SWING_WINDOW = 5
+OB_BODY_RATIO = 0.6
+OB_LOOKAHEAD = 5
+WARMUP_BARS = 1000  # seed history; EMA_200's weight on bars older than this is below 1e-4
+
+_FEATURE_INDEX = pd.Index(FINAL_COLUMNS)
+
+
+# === Rolling State Helpers ===
+class _RollingWindow:
+    """Fixed-size rolling sum / std with pandas min_periods semantics.
+
+    Sums are kept relative to an anchor value to limit cancellation and are
+    re-summed from the buffer once per `size` pushes to stop float drift.
+    """
+
+    def __init__(self, size, min_periods=None):
+        self.size = size
+        self.min_periods = size if min_periods is None else min_periods
+        self.values = deque(maxlen=size)
+        self._anchor = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._count = 0
+        self._pushes = 0
+
+    def push(self, x):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            if old == old:
+                d = old - self._anchor
+                self._sum -= d
+                self._sumsq -= d * d
+                self._count -= 1
+        self.values.append(x)
+        if x == x:
+            d = x - self._anchor
+            self._sum += d
+            self._sumsq += d * d
+            self._count += 1
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._resync()
+
+    def _resync(self):
+        valid = [v for v in self.values if v == v]
+        self._anchor = math.fsum(valid) / len(valid) if valid else 0.0
+        self._sum = math.fsum(v - self._anchor for v in valid)
+        self._sumsq = math.fsum((v - self._anchor) ** 2 for v in valid)
+        self._count = len(valid)
+        self._pushes = 0
+
+    def mean(self):
+        if self._count < self.min_periods or self._count == 0:
+            return np.nan
+        return self._anchor + self._sum / self._count
+
+    def std(self):
+        if self._count < max(self.min_periods, 2):
+            return np.nan
+        var = (self._sumsq - self._sum * self._sum / self._count) / (self._count - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class _RollingExtreme:
+    """Rolling max (or min) over `size` bars using a monotonic deque."""
+
+    def __init__(self, size, mode="max"):
+        self.size = size
+        self.is_max = mode == "max"
+        self._window = deque()
+        self._n = 0
+
+    def push(self, x):
+        if self.is_max:
+            while self._window and self._window[-1][1] <= x:
+                self._window.pop()
+        else:
+            while self._window and self._window[-1][1] >= x:
+                self._window.pop()
+        self._window.append((self._n, x))
+        if self._window[0][0] <= self._n - self.size:
+            self._window.popleft()
+        self._n += 1
+
+    def value(self):
+        if self._n < self.size:
+            return np.nan
+        return self._window[0][1]
+
+
+class _Ema:
+    """Mirrors pandas ewm(span=..., adjust=False).mean() update arithmetic."""
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.value = np.nan
+
+    def push(self, x):
+        if self.value != self.value:
+            self.value = x
+        elif x == x and self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.value
+
+
+# === Streaming Engine ===
+class IncrementalFeatureEngine:
+    def __init__(self, input_stage=None):
+        self.input_stage = input_stage
+        self.reset()
+
+    def reset(self):
+        self.bars_seen = 0
+        self.last_timestamp = None
+        self.features = None
+        self.model_input = None
+        self._raw = None
+
+        self._sma_10 = _RollingWindow(10)
+        self._sma_200 = _RollingWindow(200)
+        self._ema = {span: _Ema(span) for span in (10, 12, 26, 50, 200)}
+        self._atr = _RollingWindow(14, min_periods=1)
+        self._bb = _RollingWindow(20)
+        self._avg_volume = _RollingWindow(20)
+        self._hv = _RollingWindow(20)
+        self._rolling_high = _RollingExtreme(20, "max")
+        self._rolling_low = _RollingExtreme(20, "min")
+
+        # Bars awaiting enough right-hand context to be confirmed
+        self._swing_bars = deque(maxlen=2 * SWING_WINDOW + 1)
+        self._ob_bars = deque(maxlen=OB_LOOKAHEAD + 1)
+
+        self._prev_close = np.nan
+        self._prev_rolling_high = np.nan
+        self._prev_rolling_low = np.nan
+        self._prev_hv = np.nan
+        self._last_swing_high = np.nan
+        self._last_swing_low = np.nan
+        self._last_ob_low = np.nan
+        self._last_ob_high = np.nan
+        self._last_valid = {}
+
+    def warm_start(self, df: pd.DataFrame) -> pd.Series:
+        """Seed rolling state from a merged OHLCV history, oldest bar first."""
+        self.reset()
+        if "Timestamp" in df.columns:
+            df = df.sort_values("Timestamp")
+        for bar in df.to_dict("records"):
+            self._step(bar)
+        return self._emit() if self.bars_seen else None
+
+    def update(self, bar) -> pd.Series:
+        """Consume one closed bar (dict or Series of merged OHLCV) and return its feature vector."""
+        self._step(bar)
+        return self._emit()
+
+    def preview(self, bar) -> pd.Series:
+        """
+        Feature vector for a bar that may still change (MT5's forming bar), as update() would
+        return it, without advancing the engine: the bar is stepped on a copy of the state.
+        """
+        provisional = copy.deepcopy(self, {id(self.input_stage): self.input_stage})
+        return provisional.update(bar)
+
+    def _step(self, bar):
+        o, h, l, c = (float(bar[k]) for k in ("Open", "High", "Low", "Close"))
+        volume = float(bar["Volume"])
+        raw = {col: float(bar.get(col, np.nan)) for col in PASSTHROUGH_COLUMNS}
+
+        # Moving averages and MACD
+        self._sma_10.push(c)
+        self._sma_200.push(c)
+        ema = {span: e.push(c) for span, e in self._ema.items()}
+        raw["SMA_10"] = self._sma_10.mean()
+        raw["SMA_200"] = self._sma_200.mean()
+        raw["EMA_10"] = ema[10]
+        raw["EMA_50"] = ema[50]
+        raw["EMA_200"] = ema[200]
+        raw["MACD"] = ema[12] - ema[26]
+
+        # ATR (true range falls back to High-Low on the first bar)
+        if self._prev_close == self._prev_close:
+            tr = max(h - l, abs(h - self._prev_close), abs(l - self._prev_close))
+        else:
+            tr = h - l
+        self._atr.push(tr)
+        raw["ATR_14"] = self._atr.mean()
+
+        # Bollinger Bands
+        self._bb.push(c)
+        bb_mid, bb_std = self._bb.mean(), self._bb.std()
+        raw["BB_Upper"] = bb_mid + 2 * bb_std
+        raw["BB_Lower"] = bb_mid - 2 * bb_std
+
+        # Rolling range and premium/discount zone
+        self._rolling_high.push(h)
+        self._rolling_low.push(l)
+        rolling_high, rolling_low = self._rolling_high.value(), self._rolling_low.value()
+        raw["Rolling_High"] = rolling_high
+        raw["Rolling_Low"] = rolling_low
+        raw["Prev_Highs"] = self._prev_rolling_high
+        raw["Prev_Lows"] = self._prev_rolling_low
+        fair_value_mid = (rolling_high + rolling_low) / 2
+        raw["Fair_Value_Mid"] = fair_value_mid
+        raw["Is_Premium"] = int(c > fair_value_mid)
+        raw["Is_Discount"] = int(c < fair_value_mid)
+
+        # Swing points: the centre bar of the last 2*w+1 bars is now confirmable
+        self._swing_bars.append((h, l))
+        if len(self._swing_bars) == self._swing_bars.maxlen:
+            highs = [b[0] for b in self._swing_bars]
+            lows = [b[1] for b in self._swing_bars]
+            ch, cl = highs[SWING_WINDOW], lows[SWING_WINDOW]
+            if ch > max(highs[:SWING_WINDOW]) and ch > max(highs[SWING_WINDOW + 1:]):
+                self._last_swing_high = ch
+            if cl < min(lows[:SWING_WINDOW]) and cl < min(lows[SWING_WINDOW + 1:]):
+                self._last_swing_low = cl
+        # The newest bar is never a swing yet, so the filled value is the last confirmed one
+        raw["Swing_Low"] = self._last_swing_low
+        raw["Prev_Swing_High"] = self._last_swing_high
+        raw["Prev_Swing_Low"] = self._last_swing_low
+
+        # Fair Value Gap between candle i-2 and candle i
+        raw["FVG_Low"] = raw["FVG_High"] = np.nan
+        if len(self._swing_bars) >= 3:
+            c1_high, c1_low = self._swing_bars[-3]
+            if c1_high < l:
+                raw["FVG_Low"], raw["FVG_High"] = c1_high, l
+            elif c1_low > h:
+                raw["FVG_Low"], raw["FVG_High"] = h, c1_low
+
+        # Order blocks: the bar OB_LOOKAHEAD bars back now has its full forward window
+        self._ob_bars.append((o, h, l, c))
+        if len(self._ob_bars) == self._ob_bars.maxlen:
+            po, ph, pl, pc = self._ob_bars[0]
+            rng = ph - pl
+            if rng != 0 and not (abs(pc - po) / rng) < OB_BODY_RATIO:
+                forward = list(self._ob_bars)[1:]
+                is_bull = pc < po and max(b[1] for b in forward) > ph
+                is_bear = pc > po and min(b[2] for b in forward) < pl
+                if is_bull or is_bear:
+                    self._last_ob_low, self._last_ob_high = pl, ph
+        # engineer_features cannot classify the last OB_LOOKAHEAD bars, so the newest bar
+        # and its predecessor are never order blocks and nothing can be mitigated or broken
+        raw["Bullish_OB"] = 0
+        raw["Bearish_OB"] = 0
+        raw["OB_Low"] = self._last_ob_low
+        raw["OB_High"] = self._last_ob_high
+        raw["OB_Mitigated"] = 0
+        raw["Breaker_Block"] = 0
+
+        # Volume and volatility
+        self._avg_volume.push(volume)
+        raw["Avg_Volume"] = self._avg_volume.mean()
+        if self._prev_close == self._prev_close:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_return = float(np.log(c / self._prev_close))
+        else:
+            log_return = np.nan
+        raw["Log_Returns"] = log_return
+        self._hv.push(log_return)
+        hv = self._hv.std() * 100
+        raw["HV"] = hv
+        raw["HV_lag1"] = self._prev_hv
+
+        # Candle patterns
+        body, rng = abs(c - o), h - l
+        raw["Doji"] = int(rng != 0 and body / rng < 0.1)
+
+        # Roll per-bar state forward
+        self._prev_close = c
+        self._prev_rolling_high = rolling_high
+        self._prev_rolling_low = rolling_low
+        self._prev_hv = hv
+        self.bars_seen += 1
+        self.last_timestamp = bar.get("Timestamp")
+
+        # Reproduce engineer_features' bfill/ffill: a missing value on the newest
+        # row takes the last valid value seen in that column
+        for col, value in raw.items():
+            if value == value:
+                self._last_valid[col] = value
+            else:
+                raw[col] = self._last_valid.get(col, np.nan)
+        self._raw = raw
+
+    def _emit(self):
+        values = np.array([self._raw[col] for col in FINAL_COLUMNS], dtype=np.float64)
+        self.features = pd.Series(values, index=_FEATURE_INDEX, name=self.last_timestamp)
+        if self.input_stage is not None:
+            self.model_input = self.input_stage.transform(values)
+        return self.features
+
+    def as_frame(self) -> pd.DataFrame:
+        """Latest feature vector as a one-row DataFrame, like engineer_features(df).tail(1)."""
+        if self.features is None:
+            raise RuntimeError("IncrementalFeatureEngine has not seen any bars yet.")
+        return self.features.to_frame().T.reset_index(drop=True)
+
+
+# === Live Feed ===
+class LiveFeatureStream:
+    """
+    Keeps one IncrementalFeatureEngine in step with the live bar feed across cycles.
+    `fetch(num_candles)` returns the merged OHLCV frame (e.g. datafeed.get_merged_ohlcv).
+    The newest row of a frame may be the bar MT5 is still forming, so it is only previewed;
+    the engine consumes bars once a newer one follows them, i.e. in their final form.
+    The engine is seeded with `warmup_bars` bars and each cycle feeds the settled bars
+    newer than the last one consumed; when the frame no longer contains that bar (missed
+    cycles, restarts) the engine is seeded again.
+    """
+
+    def __init__(self, fetch, warmup_bars=WARMUP_BARS, input_stage=None):
+        self.fetch = fetch
+        self.warmup_bars = warmup_bars
+        self.engine = IncrementalFeatureEngine(input_stage)
+        self.seeds = 0
+
+    def features_for(self, raw_df: pd.DataFrame) -> pd.Series:
+        """Feature vector of the newest bar in `raw_df`, as engineer_features(history + raw_df) scores it."""
+        timestamps = raw_df["Timestamp"]
+        newest = timestamps.iloc[-1]
+        if self.engine.last_timestamp is None or not (timestamps == self.engine.last_timestamp).any():
+            history = self.fetch(self.warmup_bars)
+            self.engine.warm_start(history[history["Timestamp"] < newest])
+            self.seeds += 1
+        settled = raw_df.iloc[:-1]
+        if self.engine.last_timestamp is not None:
+            settled = settled[settled["Timestamp"] > self.engine.last_timestamp]
+        for bar in settled.to_dict("records"):
+            self.engine.update(bar)
+        return self.engine.preview(raw_df.iloc[-1].to_dict())
@@ -1,22 +1,66 @@
 # utils/logger.py
 """
 This module handles structured logging of all trading activity.
-It appends trade events (executions, failures, exits) to a centralized JSON file (trade_log.json)
-located in the logs/ directory. Each log entry is a dictionary that includes:
+It appends trade events (executions, failures, exits) to an append-only
+JSON Lines journal (trade_log.jsonl) located in the logs/ directory.
+Each line is one event dictionary that includes:
 Trade status (e.g., executed, failed, skipped)
 Timestamps for entries and exits
 Trade details (e.g., symbol, direction, confidence, SL/TP, PnL)
 Optional reason for failures or exits (e.g., "Invalid stops", "sl hit")
+
+Exits are written as separate "closed" events rather than rewriting the entry,
+so every write is O(1) and a crash can at worst leave one truncated last line;
+that partial line is cut off before the next append, so it never swallows a
+later event.
+A ticket -> byte offset index (trade_log.idx, also append-only) makes exit
+lookups O(1); it is rebuilt from the journal if missing or behind.
+read_trade_log() folds exit events back into their entries, giving the same
+records the old trade_log.json array held.
+
+Setting TRADE_LOG_BACKEND=sqlite stores trades in logs/trade_log.db instead
+(see utils/trade_store.py); the public functions behave the same.
+
+Writes are handed to a background writer thread by default (TRADE_LOG_ASYNC=0
+disables it), so logging never blocks the order path. The writer drains a
+bounded queue in batches with one fsync per batch and flushes on shutdown;
+logging_metrics() reports the backlog and any dropped events.
 """
 import os
 import json
+import atexit
+import queue
+import threading
 from datetime import datetime
 
 # === Path Configuration ===
 LOG_FOLDER = "logs"
-LOG_FILE = os.path.join(LOG_FOLDER, "trade_log.json")
+LOG_FILE = os.path.join(LOG_FOLDER, "trade_log.jsonl")
+INDEX_FILE = os.path.join(LOG_FOLDER, "trade_log.idx")
+LEGACY_LOG_FILE = os.path.join(LOG_FOLDER, "trade_log.json")
+DB_FILE = os.path.join(LOG_FOLDER, "trade_log.db")
 os.makedirs(LOG_FOLDER, exist_ok=True)
 
+# === Backend Selection ===
+LOG_BACKEND = os.getenv("TRADE_LOG_BACKEND", "jsonl")  # "jsonl" or "sqlite"
+
+# === Background Writer Configuration ===
+ASYNC_LOGGING = os.getenv("TRADE_LOG_ASYNC", "1") != "0"
+QUEUE_MAXSIZE = 10000
+BATCH_SIZE = 256
+
+# ticket -> {"entry": offset, "exit": offset}; loaded lazily
+_index = None
+_store = None
+
+def get_trade_store():
+    """Shared SQLiteTradeStore for logs/trade_log.db, opened on first use."""
+    global _store
+    if _store is None:
+        from utils.trade_store import SQLiteTradeStore
+        _store = SQLiteTradeStore(DB_FILE)
+    return _store
+
 
 # === Create a new log entry (called by trader.py) ===
 def create_trade_entry(entry: dict):
@@ -24,49 +68,347 @@ def create_trade_entry(entry: dict):
     Appends a new trade entry to the trade log.
     """
     entry["log_type"] = "entry"
-    _append_to_log(entry)
+    _submit(("entry", dict(entry)))
 
 
-# === Update an existing trade entry with exit info (called by live_monitor.py) ===
+# === Record exit info for an existing trade entry (called by live_monitor.py) ===
 def update_trade_exit(ticket: int, exit_data: dict):
     """
-    Updates an existing trade entry with exit info based on ticket number.
+    Appends an exit event for the trade with this ticket number,
+    provided its entry is in the log and it has not been closed yet.
     """
-    log = _load_log()
-    updated = False
-
-    for entry in log:
-        if entry.get("ticket") == ticket and "exit_time" not in entry:
-            entry.update({
-                "exit_time": exit_data.get("exit_time", str(datetime.utcnow())),
-                "exit_price": exit_data["exit_price"],
-                "exit_reason": exit_data["exit_reason"],
-                "pnl_usd": exit_data["pnl_usd"],
-                "tp1_hit": exit_data.get("tp1_hit", False),
-                "tp2_hit": exit_data.get("tp2_hit", False),
-                "sl_hit": exit_data.get("sl_hit", False),
-                "log_type": "closed"
-            })
-            updated = True
-            break
+    _submit(("exit", {
+        "ticket": ticket,
+        "exit_time": exit_data.get("exit_time", str(datetime.utcnow())),
+        "exit_price": exit_data["exit_price"],
+        "exit_reason": exit_data["exit_reason"],
+        "pnl_usd": exit_data["pnl_usd"],
+        "tp1_hit": exit_data.get("tp1_hit", False),
+        "tp2_hit": exit_data.get("tp2_hit", False),
+        "sl_hit": exit_data.get("sl_hit", False),
+        "log_type": "closed"
+    }))
+
+
+# === Background Writer ===
+class BackgroundLogWriter:
+    """
+    Single worker thread draining a bounded queue of log operations in batches.
+    One worker keeps events in submission order, so an exit queued right after
+    its entry still finds it.
+    """
+
+    def __init__(self, write_batch, maxsize=QUEUE_MAXSIZE, batch_size=BATCH_SIZE):
+        self._write_batch = write_batch
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._stopped = False
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.max_backlog = 0
+        self._thread = threading.Thread(target=self._run, name="trade-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op) -> bool:
+        if self._stopped:
+            self._write_batch([op])
+            return True
+        try:
+            self._queue.put_nowait(op)
+        except queue.Full:
+            self.dropped += 1
+            print(f" Trade log queue full; dropped {op[0]} event ({self.dropped} dropped so far).")
+            return False
+        self.max_backlog = max(self.max_backlog, self._queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            ops = [op for op in batch if op is not None]
+            try:
+                if ops:
+                    self._write_batch(ops)
+                    self.written += len(ops)
+                    self.batches += 1
+            except Exception as e:
+                print(f" Trade log writer failed on a batch of {len(ops)} events: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(ops) < len(batch):
+                return  # shutdown sentinel
+
+    def flush(self):
+        """Blocks until every queued event has been written."""
+        self._queue.join()
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def metrics(self) -> dict:
+        return {
+            "backlog": self._queue.qsize(),
+            "max_backlog": self.max_backlog,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+        }
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def _submit(op):
+    global _writer
+    if not ASYNC_LOGGING:
+        _write_batch([op])
+        return
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = BackgroundLogWriter(_write_batch)
+    _writer.submit(op)
+
+def flush_logs():
+    """Waits for queued log events to reach disk."""
+    if _writer is not None:
+        _writer.flush()
+
+def shutdown_logging():
+    """Flushes queued events and stops the writer thread (also runs at exit)."""
+    if _writer is not None:
+        _writer.stop()
+
+def logging_metrics() -> dict:
+    if _writer is None:
+        return {"backlog": 0, "max_backlog": 0, "dropped": 0, "written": 0, "batches": 0}
+    return _writer.metrics()
+
+atexit.register(shutdown_logging)
+
+
+def _write_batch(ops):
+    """Applies queued ("entry" | "exit", event) operations in order."""
+    if LOG_BACKEND == "sqlite":
+        store = get_trade_store()
+        pending = []  # consecutive entries go in as one transaction
+        for kind, event in ops:
+            if kind == "entry":
+                pending.append(event)
+                continue
+            if pending:
+                store.insert_many(pending)
+                pending = []
+            _report_exit(event["ticket"], store.close_trade(event["ticket"], event))
+        if pending:
+            store.insert_many(pending)
+        return
 
+    global _index
+    # A torn tail (write cut short by a crash) must go before anything is appended after it
+    if _repair_tail(LOG_FILE) | _repair_tail(INDEX_FILE):
+        _index = None  # reload: cached offsets may point into the dropped bytes
+    index = _get_index()  # also migrates a legacy log before the first append
+    index_lines = []
+    with open(LOG_FILE, "ab") as f:
+        for kind, event in ops:
+            if kind == "exit":
+                slot = index.get(event["ticket"], {})
+                updated = "entry" in slot and "exit" not in slot
+                _report_exit(event["ticket"], updated)
+                if not updated:
+                    continue
+            data = json.dumps(event).encode("utf-8") + b"\n"
+            offset = f.tell()
+            f.write(data)
+            if _event_kind(event):
+                index_kind = "entry" if kind == "entry" else "exit"
+                _apply_index(index, event["ticket"], index_kind, offset)
+                index_lines.append(_index_line(event["ticket"], index_kind, offset, offset + len(data)))
+        f.flush()
+        os.fsync(f.fileno())
+    # Index lines only after the journal is durable; a lagging index is caught up on load
+    if index_lines:
+        with open(INDEX_FILE, "a") as f:
+            f.writelines(index_lines)
+
+def _report_exit(ticket, updated: bool):
     if updated:
-        with open(LOG_FILE, "w") as f:
-            json.dump(log, f, indent=4)
         print(f" Trade ticket {ticket} updated in log.")
     else:
         print(f" Trade ticket {ticket} not found or already closed.")
 
 
-# === Internal: Load and Append Helpers ===
-def _load_log():
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r") as f:
-            return json.load(f)
-    return []
+# === Read the log back (dashboard, analytics) ===
+def read_trade_log(path: str = LOG_FILE) -> list:
+    """
+    Returns one record per logged event, with each exit merged into its entry
+    (log_type "closed"), matching the layout of the legacy trade_log.json.
+    """
+    records = []
+    open_entries = {}
+    for _, _, event in _iter_events(path):
+        ticket = event.get("ticket")
+        if event.get("log_type") == "closed" and ticket in open_entries:
+            records[open_entries.pop(ticket)].update(event)
+            continue
+        records.append(event)
+        if ticket is not None and event.get("log_type") == "entry":
+            open_entries[ticket] = len(records) - 1
+    return records
+
+
+# === Maintenance: migration and compaction ===
+def migrate_json_log(json_path: str = LEGACY_LOG_FILE, journal_path: str = LOG_FILE) -> int:
+    """
+    Converts a legacy trade_log.json array into the JSONL journal.
+    Records already carrying exit info are kept whole as "closed" records.
+    """
+    with open(json_path, "r") as f:
+        records = json.load(f)
+    _write_journal(records, journal_path)
+    return len(records)
+
+def compact_log(journal_path: str = LOG_FILE) -> int:
+    """
+    Rewrites the journal with every exit folded into its entry (one line per
+    record), dropping truncated lines, then rebuilds the index.
+    """
+    records = read_trade_log(journal_path)
+    _write_journal(records, journal_path)
+    return len(records)
+
+
+# === Internal: Journal and Index Helpers ===
+def _iter_events(path: str, start: int = 0):
+    """Yields (offset, end offset, event) for every complete, parseable line."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            line_offset, offset = offset, offset + len(line)
+            if not line.endswith(b"\n"):
+                break  # partial write from a crash
+            try:
+                yield line_offset, offset, json.loads(line)
+            except ValueError:
+                continue
+
+def _repair_tail(path: str, block: int = 4096) -> bool:
+    """
+    Truncates a partial last line back to the last newline, so the next append
+    starts on a line of its own. Returns True if anything was dropped.
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return False
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return False
+        keep = pos = size
+        while pos > 0:
+            pos = max(0, pos - block)
+            f.seek(pos)
+            newline = f.read(keep - pos).rfind(b"\n")
+            if newline >= 0:
+                keep = pos + newline + 1
+                break
+            keep = pos
+        f.truncate(keep)
+        f.flush()
+        os.fsync(f.fileno())
+    print(f" Dropped a partial last line ({size - keep} bytes) from {path}.")
+    return True
+
+def _write_journal(records: list, journal_path: str):
+    tmp_path = journal_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for record in records:
+            f.write(json.dumps(record).encode("utf-8") + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+    if journal_path == LOG_FILE:
+        _rebuild_index()
+
+def _event_kind(event: dict):
+    if event.get("ticket") is None:
+        return None
+    return {"entry": "entry", "closed": "exit"}.get(event.get("log_type"))
+
+def _apply_index(index: dict, ticket, kind: str, offset: int):
+    slot = index.setdefault(ticket, {})
+    slot[kind] = offset
+    if kind == "exit":
+        slot.setdefault("entry", offset)  # compacted/migrated records hold both
+
+def _index_line(ticket, kind: str, offset: int, end: int) -> str:
+    return json.dumps({"ticket": ticket, "kind": kind, "offset": offset, "end": end}) + "\n"
+
+def _rebuild_index():
+    global _index
+    _index = {}
+    lines = []
+    for offset, end, event in _iter_events(LOG_FILE):
+        kind = _event_kind(event)
+        if kind:
+            _apply_index(_index, event["ticket"], kind, offset)
+            lines.append(_index_line(event["ticket"], kind, offset, end))
+    with open(INDEX_FILE, "w") as f:
+        f.writelines(lines)
+
+def _get_index() -> dict:
+    global _index
+    if _index is not None:
+        return _index
+
+    if not os.path.exists(LOG_FILE) and os.path.exists(LEGACY_LOG_FILE):
+        count = migrate_json_log()
+        print(f" Migrated {count} records from {LEGACY_LOG_FILE} to {LOG_FILE}.")
+        return _index
+    if not os.path.exists(INDEX_FILE):
+        _rebuild_index()
+        return _index
+
+    index, indexed_to = {}, 0
+    with open(INDEX_FILE, "r") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # truncated last line
+            _apply_index(index, item["ticket"], item["kind"], item["offset"])
+            indexed_to = max(indexed_to, item["end"])
+
+    journal_size = os.path.getsize(LOG_FILE) if os.path.exists(LOG_FILE) else 0
+    if indexed_to > journal_size:
+        _rebuild_index()  # journal was replaced underneath the index
+        return _index
+    _index = index
+
+    # Catch up on events appended after the last indexed one (e.g. crash between writes)
+    for offset, end, event in _iter_events(LOG_FILE, indexed_to):
+        kind = _event_kind(event)
+        if kind:
+            _record_index(event["ticket"], kind, offset, end)
+    return _index
 
-def _append_to_log(entry: dict):
-    log = _load_log()
-    log.append(entry)
-    with open(LOG_FILE, "w") as f:
-        json.dump(log, f, indent=4)
+def _record_index(ticket, kind: str, offset: int, end: int):
+    _apply_index(_get_index(), ticket, kind, offset)
+    with open(INDEX_FILE, "a") as f:
+        f.write(_index_line(ticket, kind, offset, end))
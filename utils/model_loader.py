@@ -0,0 +1,112 @@
+# utils/model_loader.py
+
+"""
+Lazy, thread-safe loading of the predictor components (TensorFlow, models, scaler, features).
+utils/predict and utils/newpredict wrap their loading code in a LazyLoader, so importing
+them is cheap and the multi-second TensorFlow import + weight loading happens once, on the
+first prediction or in a background preload() started at daemon startup.
+Each step runs under timed(), which feeds the startup-time report.
+
+Usage (loads a predictor and prints where the startup time went):
+    python -m utils.model_loader [newpredict|predict]
+"""
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# === Startup timings ===
+_timings = []  # (label, seconds) in completion order
+_timings_lock = threading.Lock()
+
+@contextmanager
+def timed(label: str):
+    """Records how long the enclosed import or load took under `label`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _timings_lock:
+            _timings.append((label, time.perf_counter() - start))
+
+def startup_timings() -> list:
+    with _timings_lock:
+        return list(_timings)
+
+def startup_report() -> str:
+    timings = startup_timings()
+    if not timings:
+        return " Startup: nothing loaded yet"
+    width = max(len(label) for label, _ in timings)
+    lines = [" Startup time by step:"]
+    lines += [f"   {label:<{width}}  {secs:7.3f}s" for label, secs in timings]
+    lines.append(f"   {'total':<{width}}  {sum(secs for _, secs in timings):7.3f}s")
+    return "\n".join(lines)
+
+
+# === Lazy loader ===
+class LazyLoader:
+    """
+    Runs `load()` at most once, on the first get() from any thread; concurrent callers
+    wait for that load instead of starting their own. A failed load is not cached,
+    so the next get() tries again.
+    """
+
+    def __init__(self, name: str, load):
+        self.name = name
+        self._load = load
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+        self._preload_thread = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                self._value = self._load()
+                self._loaded = True
+        return self._value
+
+    def preload(self, on_loaded=None) -> threading.Thread:
+        """Starts loading on a daemon thread; `on_loaded()` runs there once loading succeeds."""
+        with self._lock:
+            if self._preload_thread is None:
+                self._preload_thread = threading.Thread(target=self._preload, args=(on_loaded,),
+                                                        name=f"{self.name}-preload", daemon=True)
+                self._preload_thread.start()
+            return self._preload_thread
+
+    def _preload(self, on_loaded):
+        try:
+            self.get()
+        except Exception as e:
+            # The first get() on the main path will retry and raise
+            print(f" Background load of {self.name} failed: {e}")
+            return
+        if on_loaded is not None:
+            on_loaded()
+
+
+def main(argv):
+    module_name = argv[1] if len(argv) > 1 else "newpredict"
+    if module_name not in ("newpredict", "predict"):
+        print(__doc__)
+        return 1
+    # Under `python -m` this file is __main__; the predictors record into utils.model_loader
+    loader = importlib.import_module("utils.model_loader")
+    with loader.timed(f"import utils.{module_name}"):
+        module = importlib.import_module(f"utils.{module_name}")
+    module.get_models()
+    print(loader.startup_report())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,183 @@
+# utils/model_server.py
+
+"""
+Long-lived in-process model server for the ensemble in utils/newpredict.
+The models are loaded and warmed once when the server starts; callers on any thread
+submit feature rows and get back (final_class, probabilities) as from predict_from_features.
+Requests that arrive within BATCH_WINDOW_SECONDS of each other (e.g. several symbols or
+timeframes scored in the same cycle) are stacked and run through every model as one
+batch, so the per-call overhead of Keras predict() is paid once per batch, not per row.
+It reports queue depth, batch sizes and p50/p99 request latency.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+# === Configuration ===
+BATCH_WINDOW_SECONDS = 0.005  # how long the first request in a batch waits for company
+MAX_BATCH_SIZE = 64
+LATENCY_SAMPLES = 1000        # recent requests kept for the latency percentiles
+
+
+class ModelServer:
+    def __init__(self, batch_window=BATCH_WINDOW_SECONDS, max_batch=MAX_BATCH_SIZE):
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._ready = threading.Event()
+        self._start_error = None
+
+        # === Metrics ===
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+
+    # === Lifecycle ===
+    def start(self):
+        """Starts the worker thread and blocks until the models are loaded and warm."""
+        if self._thread is not None:
+            return self
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="model-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._start_error is not None:
+            raise RuntimeError("Model server failed to start") from self._start_error
+        return self
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._queue.put(None)  # wake the worker
+        self._thread.join(timeout)
+        self._thread = None
+        self._ready.clear()
+
+    # === Requests ===
+    def submit(self, features) -> Future:
+        """
+        Queues one prediction. `features` is an engineer_features DataFrame (its last
+        row is scored) or a single feature Series. Returns a Future resolving to
+        (final_class, {"transformer": [...], "nbeats": [...], "xgboost": [...], "ensemble": [...]}).
+        """
+        if self._thread is None:
+            raise RuntimeError("Model server is not running; call start() first")
+        if isinstance(features, pd.Series):
+            features = features.to_frame().T
+        future = Future()
+        self._queue.put((features.tail(1), future, time.perf_counter()))
+        return future
+
+    def predict(self, features, timeout=None):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(features).result(timeout)
+
+    # === Metrics ===
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = np.array(self._latencies) if self._latencies else None
+            return {
+                "queue_depth": self.queue_depth(),
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": self.requests / self.batches if self.batches else None,
+                "max_batch_size": self.max_batch_seen,
+                "p50_latency": float(np.percentile(latencies, 50)) if latencies is not None else None,
+                "p99_latency": float(np.percentile(latencies, 99)) if latencies is not None else None,
+            }
+
+    # === Worker ===
+    def _run(self):
+        try:
+            # Loading in the worker keeps every model call on this one thread
+            from utils import newpredict
+            warmup = pd.DataFrame(np.zeros((1, len(newpredict.rfe_features))), columns=newpredict.rfe_features)
+            newpredict.score_scaled(newpredict.scale_features(warmup))
+        except Exception as e:
+            self._start_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._score(newpredict, batch)
+
+        # Fail whatever was still queued so no caller waits forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Model server stopped"))
+
+    def _collect(self) -> list:
+        """Blocks for the first request, then gathers more until the window closes."""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def _score(self, newpredict, batch):
+        try:
+            rows = pd.concat([features for features, _, _ in batch], ignore_index=True)
+            probs = newpredict.score_scaled(newpredict.scale_features(rows))
+            results = [newpredict.result_for_row(probs, i) for i in range(len(batch))]
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            with self._lock:
+                self.errors += len(batch)
+            return
+
+        done = time.perf_counter()
+        with self._lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self._latencies.extend(done - submitted for _, _, submitted in batch)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_model_server() -> ModelServer:
+    """Process-wide server, started on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ModelServer().start()
+        return _server
@@ -5,18 +5,16 @@ Performs live inference using the latest trained models (Transformer, N-BEATS, X
 on real-time data from MT5. It loads the saved scaler and RFE-selected features,
  applies ensemble logic with custom weights,
  and returns both the final prediction and class probabilities
+Loading and scoring live in utils/predictor.Predictor; this module binds it to newmodels/.
 """
 
-import numpy as np
-import pandas as pd
-import joblib
-import json
 import os
-import xgboost as xgb
-from tensorflow import keras
-from keras import layers, models
+import pandas as pd
 from utils.datafeed import get_merged_ohlcv
 from utils.feature_engineer import engineer_features
+from utils.model_loader import LazyLoader
+from utils.predictor import BATCH_CHUNK_ROWS, DEFAULT_ENSEMBLE_WEIGHTS, XGBWrapper, compile_model, load_predictor, result_for_row
+from utils.predictor import run_model as _run_model
 
 # === Paths ===
 BASE_DIR = "newmodels"
@@ -24,64 +22,86 @@ SCALER_PATH = os.path.join(BASE_DIR, "scaler.pkl")
 FEATURES_PATH = os.path.join(BASE_DIR, "rfe_features.json")
 TRANSFORMER_PATH = os.path.join(BASE_DIR, "transformer_model.keras")
 NBEATS_PATH = os.path.join(BASE_DIR, "nbeats_model.keras")
+TRANSFORMER_NPZ_PATH = os.path.join(BASE_DIR, "transformer_model.npz")
+NBEATS_NPZ_PATH = os.path.join(BASE_DIR, "nbeats_model.npz")
 XGB_PATH = os.path.join(BASE_DIR, "xgboost_model.json")
 
-# === Load Components ===
-scaler = joblib.load(SCALER_PATH)
-with open(FEATURES_PATH, "r") as f:
-    rfe_features = json.load(f)
-
-transformer_model = keras.models.load_model(TRANSFORMER_PATH)
-nbeats_model = keras.models.load_model(NBEATS_PATH)
-
-xgb_booster = xgb.Booster()
-xgb_booster.load_model(XGB_PATH)
-
-class XGBWrapper:
-    def __init__(self, booster):
-        self.booster = booster
-
-    def predict_proba(self, X):
-        dmatrix = xgb.DMatrix(X)
-        raw_preds = self.booster.predict(dmatrix)
-        return raw_preds
-
-xgb_wrapper = XGBWrapper(xgb_booster)
+# === Inference Mode ===
+# "compiled": call the Keras models through a traced tf.function with a fixed input
+# signature (no per-call data adapter / step setup); "predict": plain model.predict();
+# "numpy": exported weights (python -m utils.numpy_runtime export newmodels), TensorFlow is never imported
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "compiled")
+# The XGBoost member follows XGB_BACKEND ("booster", "numpy" or "auto"), see utils/predictor
 
 # === Ensemble Logic ===
-ENSEMBLE_WEIGHTS = {
-    "transformer": 0.5,
-    "nbeats": 0.3,
-    "xgboost": 0.2
+# Used when the bundle has no ensemble_weights.json
+ENSEMBLE_WEIGHTS = DEFAULT_ENSEMBLE_WEIGHTS
+
+# === Load Components (on first use) ===
+_predictor = LazyLoader("newpredict", lambda: load_predictor(BASE_DIR, INFERENCE_MODE))
+
+def get_models():
+    """The loaded newmodels/ Predictor; the first call loads it (thread-safe)."""
+    return _predictor.get()
+
+def preload_models(on_loaded=None):
+    """Loads the models on a background thread so the first prediction does not wait."""
+    return _predictor.preload(on_loaded)
+
+_PREDICTOR_ATTRIBUTES = {
+    "scaler": lambda p: p.scaler,
+    "rfe_features": lambda p: p.rfe_features,
+    "transformer_model": lambda p: p.models["transformer"],
+    "nbeats_model": lambda p: p.models["nbeats"],
+    "transformer_infer": lambda p: p.infer["transformer"],
+    "nbeats_infer": lambda p: p.infer["nbeats"],
+    "xgb_booster": lambda p: p.xgb_booster,
+    "xgb_wrapper": lambda p: p.xgb_wrapper,
 }
 
+def __getattr__(name):
+    # Keeps `newpredict.scaler`, `newpredict.transformer_model`, ... working, loading on first access
+    if name in _PREDICTOR_ATTRIBUTES:
+        return _PREDICTOR_ATTRIBUTES[name](get_models())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def run_model(model, infer, X, mode=None):
+    """Class probabilities from one model using the selected inference path."""
+    return _run_model(model, infer, X, mode or INFERENCE_MODE)
+
+def scale_features(features: pd.DataFrame):
+    """RFE-ordered, scaled float32 model input for every row (fused select+scale stage)."""
+    return get_models().scale(features)
+
+def score_scaled(scaled, mode=None) -> dict:
+    """Class probabilities of every row, per model and for the weighted ensemble."""
+    return get_models().score_scaled(scaled, mode)
+
+def predict_from_features(features):
+    """
+    Runs the ensemble on already-engineered features, so callers that have
+    just built the feature frame do not fetch and engineer it a second time.
+    Accepts the engineer_features DataFrame (the last row is scored) or a single
+    feature vector as a Series, e.g. from IncrementalFeatureEngine.
+    """
+    return get_models().predict(features)
+
+def predict_from_model_input(model_input):
+    """
+    Runs the ensemble on an already scaled, RFE-ordered vector, e.g. the model_input of an
+    IncrementalFeatureEngine(input_stage=get_models().input_stage); nothing is reselected or rescaled.
+    """
+    return get_models().predict_model_input(model_input)
+
+def predict_batch(features: pd.DataFrame, chunk_size: int = BATCH_CHUNK_ROWS) -> dict:
+    """
+    Final class and probabilities for every row of an engineered feature frame
+    (backtests, drift analysis); see Predictor.predict_batch.
+    """
+    return get_models().predict_batch(features, chunk_size)
+
 def predict_with_ensemble(symbol: str):
     # Pull and process latest market data
     raw_df = get_merged_ohlcv(symbol)
     features_df = engineer_features(raw_df)
-
-    latest = features_df[rfe_features].tail(1)
-
-    # Scale features and preserve names
-    scaled_array = scaler.transform(latest)
-    scaled = pd.DataFrame(scaled_array, columns=latest.columns)
-
-    # Predict from each model
-    transformer_probs = transformer_model.predict(scaled)[0]
-    nbeats_probs = nbeats_model.predict(scaled)[0]
-    xgb_probs = xgb_wrapper.predict_proba(scaled)[0]
-
-    # Ensemble
-    ensemble_probs = (
-        ENSEMBLE_WEIGHTS['transformer'] * transformer_probs +
-        ENSEMBLE_WEIGHTS['nbeats'] * nbeats_probs +
-        ENSEMBLE_WEIGHTS['xgboost'] * xgb_probs
-    )
-
-    final_class = int(np.argmax(ensemble_probs))
-    return final_class, {
-        "transformer": transformer_probs.tolist(),
-        "nbeats": nbeats_probs.tolist(),
-        "xgboost": xgb_probs.tolist(),
-        "ensemble": ensemble_probs.tolist()
-    }
+    return predict_from_features(features_df)
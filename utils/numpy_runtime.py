@@ -0,0 +1,173 @@
+# utils/numpy_runtime.py
+
+"""
+TensorFlow-free runtime for the Transformer and N-BEATS ensemble members.
+Both architectures (utils/predictor.build_advanced_transformer / build_improved_nbeats)
+are small dense stacks, so after export they run as a handful of NumPy matmuls:
+- BatchNormalization (inference statistics) is folded into the following Dense layer
+- Dropout is dropped, and a linear Dense feeding another Dense is merged into it
+- the encoder's multi-head attention sees a single token, so its softmax weights are
+  exactly 1 and the whole block reduces to value projection @ output projection,
+  stored as one matrix
+export_model() writes the folded weights to .npz; NumpyModel loads and evaluates them.
+
+Usage (needs TensorFlow only for the export itself):
+    python -m utils.numpy_runtime export [BUNDLE_DIR]   (models/, newmodels/, ...)
+"""
+
+import os
+import sys
+
+import numpy as np
+
+PARITY_TOLERANCE = 1e-5
+
+
+# === Runtime ===
+class NumpyModel:
+    """Forward pass of an exported ensemble member; predict() returns class probabilities."""
+
+    def __init__(self, arrays: dict):
+        self.kind = str(arrays["kind"])
+        self.chain = [(arrays[f"dense_{i}_W"], arrays[f"dense_{i}_b"], str(act))
+                      for i, act in enumerate(arrays["activations"])]
+        if self.kind == "transformer":
+            self.encoder = {name[len("encoder_"):]: arrays[name] for name in arrays if name.startswith("encoder_")}
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def predict(self, X) -> np.ndarray:
+        x = np.asarray(X, dtype=np.float32)
+        if self.kind == "transformer":
+            x = self._encode(x)
+        for W, b, activation in self.chain:
+            x = _ACTIVATIONS[activation](x @ W + b)
+        return x
+
+    def _encode(self, x):
+        e = self.encoder
+        x = _layer_norm(x + (x @ e["attn_W"] + e["attn_b"]), e["ln1_gamma"], e["ln1_beta"], e["ln_eps"])
+        ffn = np.maximum(x @ e["ff1_W"] + e["ff1_b"], 0) @ e["ff2_W"] + e["ff2_b"]
+        return _layer_norm(x + ffn, e["ln2_gamma"], e["ln2_beta"], e["ln_eps"])
+
+
+def _softmax(x):
+    z = np.exp(x - x.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+def _layer_norm(x, gamma, beta, eps):
+    mean = x.mean(axis=1, keepdims=True)
+    var = x.var(axis=1, keepdims=True)
+    return (x - mean) / np.sqrt(var + eps) * gamma + beta
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "softmax": _softmax,
+}
+
+
+# === Export ===
+def _leaf_layers(model):
+    # Nested functional blocks are flattened in graph order
+    for layer in model.layers:
+        if getattr(layer, "layers", None):
+            yield from _leaf_layers(layer)
+        else:
+            yield layer
+
+def _weights(layer) -> list:
+    return [np.asarray(w, dtype=np.float64) for w in layer.get_weights()]
+
+def _fold_dense_chain(layers) -> list:
+    """Dense/BatchNorm sequence -> [(W, b, activation)] with BatchNorm and linear layers folded away."""
+    chain = []
+    pending = None  # affine (scale, shift) still to be applied to the next Dense input
+    for layer in layers:
+        kind = type(layer).__name__
+        if kind == "BatchNormalization":
+            gamma, beta, mean, var = _weights(layer)
+            scale = gamma / np.sqrt(var + layer.epsilon)
+            shift = beta - mean * scale
+            pending = (scale, shift) if pending is None else (pending[0] * scale, pending[1] * scale + shift)
+        elif kind == "Dense":
+            W, b = _weights(layer)
+            if pending is not None:
+                W, b = pending[0][:, None] * W, pending[1] @ W + b
+                pending = None
+            if chain and chain[-1][2] == "linear":
+                W_prev, b_prev, _ = chain.pop()
+                W, b = W_prev @ W, b_prev @ W + b
+            chain.append((W, b, layer.activation.__name__))
+    if pending is not None:
+        raise ValueError("BatchNormalization after the last Dense layer cannot be folded")
+    return chain
+
+def export_arrays(model, kind: str) -> dict:
+    layers = [layer for layer in _leaf_layers(model)
+              if type(layer).__name__ in ("Dense", "BatchNormalization", "MultiHeadAttention", "LayerNormalization")]
+    arrays = {"kind": np.array(kind)}
+
+    if kind == "transformer":
+        attention, ln1, ff1, ff2, ln2 = layers[:5]
+        layers = layers[5:]
+        _, _, _, _, Wv, bv, Wo, bo = _weights(attention)
+        d = Wv.shape[0]
+        Wo = Wo.reshape(-1, d)
+        arrays.update({
+            "encoder_attn_W": Wv.reshape(d, -1) @ Wo,
+            "encoder_attn_b": bv.reshape(-1) @ Wo + bo,
+            "encoder_ln1_gamma": _weights(ln1)[0], "encoder_ln1_beta": _weights(ln1)[1],
+            "encoder_ff1_W": _weights(ff1)[0], "encoder_ff1_b": _weights(ff1)[1],
+            "encoder_ff2_W": _weights(ff2)[0], "encoder_ff2_b": _weights(ff2)[1],
+            "encoder_ln2_gamma": _weights(ln2)[0], "encoder_ln2_beta": _weights(ln2)[1],
+            "encoder_ln_eps": np.array(ln1.epsilon, dtype=np.float64),
+        })
+    elif kind != "nbeats":
+        raise ValueError(f"Unknown model kind: {kind}")
+
+    chain = _fold_dense_chain(layers)
+    for i, (W, b, _) in enumerate(chain):
+        arrays[f"dense_{i}_W"], arrays[f"dense_{i}_b"] = W, b
+    arrays["activations"] = np.array([activation for _, _, activation in chain])
+
+    # Folding is done in float64; the runtime computes in float32 like Keras
+    return {name: value.astype(np.float32) if value.dtype.kind == "f" else value for name, value in arrays.items()}
+
+def export_model(model, kind: str, path: str) -> NumpyModel:
+    arrays = export_arrays(model, kind)
+    np.savez(path, **arrays)
+    return NumpyModel(arrays)
+
+def check_parity(keras_model, numpy_model: NumpyModel, rows: int = 256, seed: int = 0) -> float:
+    """Largest absolute probability difference on random scaled inputs."""
+    X = np.random.default_rng(seed).standard_normal((rows, keras_model.input_shape[-1])).astype(np.float32)
+    expected = np.asarray(keras_model(X, training=False))
+    return float(np.abs(expected - numpy_model.predict(X)).max())
+
+def main(argv):
+    if len(argv) < 2 or argv[1] != "export":
+        print(__doc__)
+        return 1
+    base_dir = argv[2] if len(argv) > 2 else "newmodels"
+    if not os.path.isdir(base_dir):
+        print(f" Unknown model directory: {base_dir}")
+        return 1
+
+    from utils.predictor import load_predictor  # Keras models as listed in the bundle manifest
+    predictor = load_predictor(base_dir, mode="predict")
+    ok = True
+    for kind, keras_model in predictor.models.items():
+        path = os.path.join(base_dir, predictor.manifest["models"][kind]["numpy"])
+        numpy_model = export_model(keras_model, kind, path)
+        diff = check_parity(keras_model, numpy_model)
+        ok = ok and diff <= PARITY_TOLERANCE
+        print(f" {kind}: wrote {path} ({len(numpy_model.chain)} dense layers), max |diff| vs Keras {diff:.2e}")
+    print(" Parity OK." if ok else f" Parity check failed (tolerance {PARITY_TOLERANCE}).")
+    return 0 if ok else 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
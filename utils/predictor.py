@@ -0,0 +1,427 @@
+# utils/predictor.py
+
+"""
+One ensemble predictor (Transformer + N-BEATS + XGBoost) for every model bundle.
+A bundle is a directory described by manifest.json:
+    {
+      "version": "2025-05-01",
+      "features": "rfe_features.json",
+      "scaler": "scaler.json" | "scaler.pkl",
+      "ensemble_weights": "ensemble_weights.json" | {"transformer": 0.5, ...},
+      "models": {
+        "transformer": {"path": "transformer_model.h5", "format": "h5_weights", "numpy": "transformer_model.npz"},
+        "nbeats": {"path": "nbeats_model.keras", "format": "keras", "numpy": "nbeats_model.npz"},
+        "xgboost": {"path": "xgboost_model.json"}
+      }
+    }
+Directories without a manifest (models/, newmodels/) get one inferred from the files present.
+Loaded bundles are cached by a hash of their manifest and file contents (plus inference mode),
+so switching between models/ and newmodels/ only loads each of them once per process.
+utils/predict and utils/newpredict are thin wrappers around load_predictor().
+
+Usage (writes manifest.json for a bundle and prints its content hash):
+    python -m utils.predictor manifest [DIR] [VERSION]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.fused_scaler import FusedScaler
+from utils.model_loader import timed
+from utils.numpy_runtime import NumpyModel
+from utils.tree_runtime import NumpyTreeEnsemble
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_ENSEMBLE_WEIGHTS = {
+    "transformer": 0.5,
+    "nbeats": 0.3,
+    "xgboost": 0.2
+}
+# "compiled": traced tf.function per Keras model; "predict": plain model.predict();
+# "numpy": exported .npz weights (python -m utils.numpy_runtime export DIR), no TensorFlow
+INFERENCE_MODES = ("compiled", "predict", "numpy")
+# XGBoost member: "booster": xgboost's inplace_predict; "numpy": utils/tree_runtime evaluator,
+# xgboost is never imported; "auto": NumPy for batches up to NUMPY_TREE_MAX_ROWS rows (the live
+# single-row path, where it is faster), the multithreaded booster for larger ones
+XGB_BACKENDS = ("booster", "numpy", "auto")
+XGB_BACKEND = os.getenv("XGB_BACKEND", "booster")
+NUMPY_TREE_MAX_ROWS = 4
+BATCH_CHUNK_ROWS = 4096  # rows scaled and scored at once by predict_batch()
+
+
+# === Model architectures (for bundles that store weights only) ===
+def build_advanced_transformer(input_dim):
+    from keras import layers, models
+
+    def TransformerEncoderBlock(embed_dim, num_heads=8, ff_dim=512, rate=0.1):
+        inputs = layers.Input(shape=(embed_dim,))
+        x = layers.Reshape((1, embed_dim))(inputs)
+        attn_output = layers.MultiHeadAttention(num_heads=num_heads, key_dim=embed_dim)(x, x)
+        attn_output = layers.Dropout(rate)(attn_output)
+        out1 = layers.LayerNormalization(epsilon=1e-6)(x + attn_output)
+        ffn = layers.Dense(ff_dim, activation='relu')(out1)
+        ffn = layers.Dense(embed_dim)(ffn)
+        ffn = layers.Dropout(rate)(ffn)
+        out2 = layers.LayerNormalization(epsilon=1e-6)(out1 + ffn)
+        out2 = layers.Flatten()(out2)
+        return models.Model(inputs, out2)
+
+    inputs = layers.Input(shape=(input_dim,))
+    x = TransformerEncoderBlock(input_dim)(inputs)
+    x = layers.Dense(512, activation='relu')(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.4)(x)
+    x = layers.Dense(256, activation='relu')(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.3)(x)
+    outputs = layers.Dense(5, activation='softmax')(x)
+    return models.Model(inputs, outputs)
+
+def build_improved_nbeats(input_dim):
+    from keras import layers, models
+
+    def ImprovedNBeatsBlock(input_dim, hidden_dim=256):
+        x = layers.Input(shape=(input_dim,))
+        y = layers.Dense(hidden_dim, activation='relu')(x)
+        y = layers.BatchNormalization()(y)
+        y = layers.Dropout(0.3)(y)
+        y = layers.Dense(hidden_dim, activation='relu')(y)
+        y = layers.BatchNormalization()(y)
+        y = layers.Dense(input_dim, activation='linear')(y)
+        return models.Model(inputs=x, outputs=y)
+
+    input_layer = layers.Input(shape=(input_dim,))
+    x = ImprovedNBeatsBlock(input_dim)(input_layer)
+    x = ImprovedNBeatsBlock(input_dim)(x)
+    x = ImprovedNBeatsBlock(input_dim)(x)
+    x = layers.Dense(256, activation='relu')(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.4)(x)
+    x = layers.Dense(128, activation='relu')(x)
+    output_layer = layers.Dense(5, activation='softmax')(x)
+    return models.Model(inputs=input_layer, outputs=output_layer)
+
+ARCHITECTURES = {
+    "transformer": build_advanced_transformer,
+    "nbeats": build_improved_nbeats,
+}
+
+
+# === Manifest ===
+def infer_manifest(base_dir: str) -> dict:
+    """Manifest for a bundle directory that predates manifest.json."""
+    def first_existing(*names):
+        return next((name for name in names if os.path.exists(os.path.join(base_dir, name))), names[-1])
+
+    models = {}
+    for kind in ("transformer", "nbeats"):
+        path = first_existing(f"{kind}_model.keras", f"{kind}_model.h5")
+        models[kind] = {"path": path, "format": "keras" if path.endswith(".keras") else "h5_weights",
+                        "numpy": f"{kind}_model.npz"}
+    models["xgboost"] = {"path": "xgboost_model.json"}
+
+    has_weights = os.path.exists(os.path.join(base_dir, "ensemble_weights.json"))
+    return {
+        "version": "unversioned",
+        "features": "rfe_features.json",
+        "scaler": first_existing("scaler.json", "scaler.pkl"),
+        "ensemble_weights": "ensemble_weights.json" if has_weights else DEFAULT_ENSEMBLE_WEIGHTS,
+        "models": models,
+    }
+
+def read_manifest(base_dir: str) -> dict:
+    path = os.path.join(base_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return infer_manifest(base_dir)
+    with open(path, "r") as f:
+        return json.load(f)
+
+def bundle_files(manifest: dict, mode: str) -> list:
+    """Files (relative to the bundle directory) that loading in `mode` reads."""
+    files = [manifest["features"], manifest["scaler"]]
+    if isinstance(manifest["ensemble_weights"], str):
+        files.append(manifest["ensemble_weights"])
+    for kind, entry in manifest["models"].items():
+        files.append(entry["numpy"] if mode == "numpy" and kind != "xgboost" else entry["path"])
+    return files
+
+
+# === Content hashing ===
+_digest_cache = {}  # (path, size, mtime_ns) -> sha256 hex, so unchanged files are hashed once
+
+def file_digest(path: str) -> str:
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = _digest_cache[key] = sha.hexdigest()
+    return digest
+
+def bundle_hash(base_dir: str, manifest: dict, mode: str) -> str:
+    sha = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode())
+    for name in bundle_files(manifest, mode):
+        sha.update(name.encode())
+        sha.update(file_digest(os.path.join(base_dir, name)).encode())
+    return sha.hexdigest()
+
+
+# === Inference helpers ===
+def compile_model(model, input_dim):
+    """Traced inference function for float32 [batch, input_dim] input, warmed up once."""
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec(shape=[None, input_dim], dtype=tf.float32)])
+    def infer(x):
+        return model(x, training=False)
+
+    infer(tf.zeros([1, input_dim], dtype=tf.float32))  # trace now, not on the first live bar
+    return infer
+
+def run_model(model, infer, X, mode) -> np.ndarray:
+    """Class probabilities from one model using the selected inference path."""
+    if isinstance(model, NumpyModel):
+        return model.predict(X)
+    if mode == "compiled":
+        return infer(np.ascontiguousarray(X, dtype=np.float32)).numpy()
+    return model.predict(X, verbose=0)
+
+def check_xgb_features(num_features: int, model_names, feature_names):
+    """Raises ValueError unless the XGBoost model takes exactly `feature_names`, in order."""
+    if num_features != len(feature_names):
+        raise ValueError(f"XGBoost model expects {num_features} features, "
+                         f"the feature list has {len(feature_names)}")
+    if model_names is not None and list(model_names) != list(feature_names):
+        mismatched = [f"{a} != {b}" for a, b in zip(model_names, feature_names) if a != b]
+        raise ValueError(f"XGBoost feature names differ from the feature list: {mismatched[:5]}")
+
+class XGBWrapper:
+    """
+    Booster.inplace_predict on a contiguous float32 array: no DMatrix is built per call.
+    Column order is checked once here against the booster's feature names, so the
+    per-call feature validation is skipped. With `small_batch` (a NumpyTreeEnsemble of
+    the same model), batches of up to NUMPY_TREE_MAX_ROWS rows are evaluated by it instead.
+    """
+
+    def __init__(self, booster, feature_names=None, small_batch=None):
+        self.booster = booster
+        self.small_batch = small_batch
+        if feature_names is not None:
+            check_xgb_features(booster.num_features(), booster.feature_names, feature_names)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)  # DMatrix stores float32 too, so results are identical
+        if self.small_batch is not None and len(X) <= NUMPY_TREE_MAX_ROWS:
+            return self.small_batch.predict_proba(X)
+        return self.booster.inplace_predict(X, validate_features=False)
+
+
+# === Predictor ===
+class Predictor:
+    """A loaded model bundle; use load_predictor() to get the cached instance."""
+
+    def __init__(self, base_dir: str, mode: str = "compiled", manifest: dict = None, content_hash: str = None,
+                 xgb_backend: str = "booster"):
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode: {mode} (expected one of {INFERENCE_MODES})")
+        if xgb_backend not in XGB_BACKENDS:
+            raise ValueError(f"Unknown XGBoost backend: {xgb_backend} (expected one of {XGB_BACKENDS})")
+        self.base_dir = base_dir
+        self.mode = mode
+        self.xgb_backend = xgb_backend
+        self.manifest = manifest if manifest is not None else read_manifest(base_dir)
+        self.version = self.manifest.get("version", "unversioned")
+        self.content_hash = content_hash or bundle_hash(base_dir, self.manifest, mode)
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.base_dir, name)
+
+    def _load(self):
+        label = self.base_dir
+        manifest = self.manifest
+
+        with timed(f"{label}: load features, scaler, weights"):
+            with open(self._path(manifest["features"]), "r") as f:
+                self.rfe_features = json.load(f)
+            self.scaler, self.input_stage = self._load_scaler(manifest["scaler"])
+            weights = manifest["ensemble_weights"]
+            if isinstance(weights, str):
+                with open(self._path(weights), "r") as f:
+                    weights = json.load(f)
+            self.ensemble_weights = weights
+
+        self.models, self.infer = {}, {}
+        if self.mode != "numpy":
+            with timed(f"{label}: import tensorflow"):
+                from tensorflow import keras
+        for kind in ("transformer", "nbeats"):
+            entry = manifest["models"][kind]
+            with timed(f"{label}: load {kind}"):
+                if self.mode == "numpy":
+                    model = NumpyModel.load(self._path(entry["numpy"]))
+                elif entry["format"] == "h5_weights":
+                    model = ARCHITECTURES[kind](input_dim=len(self.rfe_features))
+                    model.load_weights(self._path(entry["path"]))
+                else:
+                    model = keras.models.load_model(self._path(entry["path"]))
+            self.models[kind] = model
+            if self.mode != "numpy":  # traced in "predict" mode too, so callers can pick per call
+                with timed(f"{label}: trace {kind}"):
+                    self.infer[kind] = compile_model(model, len(self.rfe_features))
+            else:
+                self.infer[kind] = None
+
+        xgb_path = self._path(manifest["models"]["xgboost"]["path"])
+        trees = None
+        if self.xgb_backend in ("numpy", "auto"):
+            with timed(f"{label}: load xgboost (NumPy trees)"):
+                trees = NumpyTreeEnsemble.load(xgb_path)
+            check_xgb_features(trees.num_features, trees.feature_names, self.rfe_features)
+        if self.xgb_backend == "numpy":
+            self.xgb_booster, self.xgb_wrapper = None, trees
+            return
+
+        with timed(f"{label}: import xgboost"):
+            import xgboost as xgb
+        with timed(f"{label}: load xgboost"):
+            self.xgb_booster = xgb.Booster()
+            self.xgb_booster.load_model(xgb_path)
+        self.xgb_wrapper = XGBWrapper(self.xgb_booster, self.rfe_features, small_batch=trees)
+
+    def _load_scaler(self, name: str):
+        """(scaler, fused select+scale stage); a JSON scaler needs no sklearn object at all."""
+        path = self._path(name)
+        if name.endswith(".pkl"):
+            import joblib
+            import sklearn.preprocessing  # unpickling the scaler needs it
+            scaler = joblib.load(path)
+            return scaler, FusedScaler.from_estimator(scaler, self.rfe_features)
+
+        # JSON export of a fitted StandardScaler
+        stage = FusedScaler.from_json(path, self.rfe_features)
+        return stage, stage
+
+    # === Scoring ===
+    def scale(self, features) -> np.ndarray:
+        """RFE-ordered, scaled float32 model input for every row (fused select+scale stage)."""
+        scaled = self.input_stage.transform(features)
+        return scaled.reshape(1, -1) if scaled.ndim == 1 else scaled
+
+    def score_scaled(self, scaled: np.ndarray, mode: str = None) -> dict:
+        """Class probabilities of every row, per model and for the weighted ensemble."""
+        mode = mode or self.mode
+        probs = {
+            "transformer": run_model(self.models["transformer"], self.infer["transformer"], scaled, mode),
+            "nbeats": run_model(self.models["nbeats"], self.infer["nbeats"], scaled, mode),
+            "xgboost": self.xgb_wrapper.predict_proba(scaled),
+        }
+        probs["ensemble"] = sum(self.ensemble_weights[name] * probs[name] for name in ("transformer", "nbeats", "xgboost"))
+        return probs
+
+    def score(self, features: pd.DataFrame) -> dict:
+        """Class probabilities of every row of an engineered feature frame."""
+        return self.score_scaled(self.scale(features))
+
+    def predict_batch(self, features: pd.DataFrame, chunk_size: int = BATCH_CHUNK_ROWS) -> dict:
+        """
+        Final class and class probabilities for every row, e.g. a year of M15 bars for a
+        backtest or drift analysis. Rows are scaled and scored chunk_size at a time, so
+        memory stays bounded by the chunk rather than the history; only the result
+        arrays are full length. Returns {"final_class": (n,), "transformer" / "nbeats" /
+        "xgboost" / "ensemble": (n, classes)}, row i matching features.iloc[i].
+        """
+        n = len(features)
+        if n == 0:
+            raise ValueError("No rows to score")
+        result = {}
+        for start in range(0, n, chunk_size):
+            probs = self.score(features.iloc[start:start + chunk_size])
+            for name, values in probs.items():
+                if name not in result:
+                    result[name] = np.empty((n, values.shape[1]), dtype=np.float32)
+                result[name][start:start + len(values)] = values
+        result["final_class"] = np.argmax(result["ensemble"], axis=1)
+        return result
+
+    def predict(self, features, row: int = -1):
+        """
+        (final_class, per-model probability lists) for one row: by default the latest
+        row of an engineer_features DataFrame, or a single feature vector as a Series.
+        Only that row is scaled and scored.
+        """
+        if isinstance(features, pd.Series):
+            return result_for_row(self.score(features))
+        row = row % len(features)
+        return result_for_row(self.score(features.iloc[row:row + 1]))
+
+    def predict_model_input(self, model_input: np.ndarray):
+        """
+        (final_class, per-model probability lists) for a vector that is already the scaled
+        model input, e.g. IncrementalFeatureEngine.model_input with this predictor's input_stage.
+        """
+        return result_for_row(self.score_scaled(np.asarray(model_input, dtype=np.float32).reshape(1, -1)))
+
+
+def result_for_row(probs: dict, row: int = 0):
+    """(final_class, per-model probability lists) for one row of score_scaled output."""
+    final_class = int(np.argmax(probs["ensemble"][row]))
+    return final_class, {name: np.asarray(values[row]).tolist() for name, values in probs.items()}
+
+
+# === Bundle cache ===
+_bundles = {}  # (content hash, mode, xgb backend) -> Predictor
+_bundles_lock = threading.Lock()
+
+def load_predictor(base_dir: str, mode: str = None, xgb_backend: str = None) -> Predictor:
+    """
+    Predictor for a bundle directory. Bundles are cached by content hash, so asking
+    again for an unchanged directory (or an identical copy of it) returns the loaded one.
+    """
+    mode = mode or os.getenv("INFERENCE_MODE", "compiled")
+    xgb_backend = xgb_backend or XGB_BACKEND
+    with _bundles_lock:
+        manifest = read_manifest(base_dir)
+        content_hash = bundle_hash(base_dir, manifest, mode)
+        key = (content_hash, mode, xgb_backend)
+        predictor = _bundles.get(key)
+        if predictor is None:
+            predictor = _bundles[key] = Predictor(base_dir, mode, manifest, content_hash, xgb_backend)
+        return predictor
+
+def cached_bundles() -> list:
+    with _bundles_lock:
+        return [(p.base_dir, p.version, p.mode, p.xgb_backend, content_hash[:12])
+                for (content_hash, _, _), p in _bundles.items()]
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] != "manifest":
+        print(__doc__)
+        return 1
+    base_dir = argv[2] if len(argv) > 2 else "newmodels"
+    manifest = read_manifest(base_dir)
+    if len(argv) > 3:
+        manifest["version"] = argv[3]
+    path = os.path.join(base_dir, MANIFEST_NAME)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f" Wrote {path} (version {manifest['version']})")
+    for mode in ("compiled", "numpy"):
+        try:
+            print(f" Content hash ({mode}): {bundle_hash(base_dir, manifest, mode)}")
+        except FileNotFoundError as e:
+            print(f" Content hash ({mode}): missing file {e.filename}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
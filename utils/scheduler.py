@@ -0,0 +1,101 @@
+# utils/scheduler.py
+
+"""
+Bar-close-aligned scheduling for the live trading jobs.
+A BarScheduler fires at exact bar boundaries (e.g. every M15 close) plus a
+configurable settle delay, so predictions always run on the freshly closed bar.
+Wake-ups are computed from absolute boundaries rather than sleeping a fixed
+interval after each run, so the schedule never drifts by the job's own runtime.
+It also tracks missed and late ticks and the latency measured from bar close,
+and is shared by the trading cycle (live_loop.py) and the position monitor (live_monitor.py).
+"""
+
+import time
+
+
+class BarScheduler:
+    def __init__(self, interval_seconds, settle_delay=0.0, late_threshold=5.0,
+                 name="job", clock=time.time, sleep=time.sleep):
+        self.interval = float(interval_seconds)
+        self.settle_delay = float(settle_delay)
+        self.late_threshold = float(late_threshold)
+        self.name = name
+        self._clock = clock
+        self._sleep = sleep
+        self._next_close = self.bar_close_before(self._clock()) + self.interval
+
+        # === Metrics ===
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.late_ticks = 0
+        self.last_start_latency = None
+        self.last_latency = None
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+        self._finished = 0
+
+    def bar_close_before(self, ts: float) -> float:
+        """Most recent bar boundary at or before `ts` (epoch seconds)."""
+        return (ts // self.interval) * self.interval
+
+    def next_due(self) -> float:
+        return self._next_close + self.settle_delay
+
+    def sleep_until_due(self):
+        # Sleep in bounded chunks and re-check the clock so oversleep or clock
+        # adjustments cannot push the wake-up off the bar boundary
+        while True:
+            remaining = self.next_due() - self._clock()
+            if remaining <= 0:
+                return
+            self._sleep(min(remaining, 60.0))
+
+    def begin(self, now=None) -> float:
+        """Mark a tick as started; returns the bar close it is running for."""
+        now = self._clock() if now is None else now
+        latest_close = self.bar_close_before(now - self.settle_delay)
+        bar_close = max(self._next_close, latest_close)
+
+        # Whole bars that closed while a previous job was still running are skipped, not replayed
+        skipped = int(round((bar_close - self._next_close) / self.interval))
+        if skipped > 0:
+            self.missed_ticks += skipped
+            print(f" {self.name}: missed {skipped} tick(s)")
+
+        self.last_start_latency = now - bar_close
+        if self.last_start_latency - self.settle_delay > self.late_threshold:
+            self.late_ticks += 1
+        self.ticks += 1
+        self._next_close = bar_close + self.interval
+        return bar_close
+
+    def finish(self, bar_close: float, now=None) -> float:
+        """Record completion of the tick for `bar_close`; returns latency from bar close."""
+        now = self._clock() if now is None else now
+        self.last_latency = now - bar_close
+        self.max_latency = max(self.max_latency, self.last_latency)
+        self._total_latency += self.last_latency
+        self._finished += 1
+        return self.last_latency
+
+    def metrics(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "missed_ticks": self.missed_ticks,
+            "late_ticks": self.late_ticks,
+            "last_start_latency": self.last_start_latency,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "avg_latency": self._total_latency / self._finished if self._finished else None,
+        }
+
+    def run_forever(self, func):
+        """Blocking loop: run `func` once per bar close."""
+        while True:
+            self.sleep_until_due()
+            bar_close = self.begin()
+            try:
+                func()
+            finally:
+                latency = self.finish(bar_close)
+                print(f" {self.name}: finished {latency:.3f}s after bar close")
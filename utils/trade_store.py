@@ -0,0 +1,156 @@
+# utils/trade_store.py
+
+"""
+SQLite-backed trade store, an optional alternative to the JSONL journal in utils/logger.
+Select it by setting TRADE_LOG_BACKEND=sqlite; create_trade_entry / update_trade_exit
+keep the same API. The database runs in WAL mode so the dashboard can read while the
+trading loop writes, and is indexed on ticket, timestamp and status.
+Besides writes it provides a small query layer so the dashboard pulls only the
+filtered or aggregated rows it displays instead of parsing the whole history.
+"""
+
+import json
+import sqlite3
+import threading
+
+import pandas as pd
+
+# Columns lifted out of each record for filtering and aggregation; the full record lives in `data`
+INDEXED_FIELDS = ["ticket", "timestamp", "status", "log_type", "symbol", "direction",
+                  "exit_time", "pnl_usd", "tp1_hit", "sl_hit"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket INTEGER,
+    timestamp TEXT,
+    status TEXT,
+    log_type TEXT,
+    symbol TEXT,
+    direction TEXT,
+    exit_time TEXT,
+    pnl_usd REAL,
+    tp1_hit INTEGER,
+    sl_hit INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_trades_ticket ON trades (ticket);
+CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp);
+CREATE INDEX IF NOT EXISTS idx_trades_status ON trades (status);
+CREATE INDEX IF NOT EXISTS idx_trades_closed ON trades (log_type, symbol);
+"""
+
+
+class SQLiteTradeStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # === Writes ===
+    def insert(self, record: dict):
+        self.insert_many([record])
+
+    def insert_many(self, records):
+        rows = [_row(record) for record in records]
+        placeholders = ", ".join("?" * (len(INDEXED_FIELDS) + 1))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO trades ({', '.join(INDEXED_FIELDS)}, data) VALUES ({placeholders})", rows
+            )
+
+    def close_trade(self, ticket: int, exit_fields: dict) -> bool:
+        """Merges exit info into the open entry for `ticket`; False if none is open."""
+        with self._lock, self._conn:
+            found = self._conn.execute(
+                "SELECT id, data FROM trades WHERE ticket = ? AND exit_time IS NULL ORDER BY id LIMIT 1",
+                (ticket,)
+            ).fetchone()
+            if found is None:
+                return False
+            record = json.loads(found[1])
+            record.update(exit_fields)
+            self._conn.execute(
+                f"UPDATE trades SET {', '.join(f'{f} = ?' for f in INDEXED_FIELDS)}, data = ? WHERE id = ?",
+                _row(record) + (found[0],)
+            )
+        return True
+
+    # === Query Layer ===
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def symbols(self) -> list:
+        return [r[0] for r in self._query(
+            "SELECT DISTINCT symbol FROM trades WHERE symbol IS NOT NULL ORDER BY symbol")]
+
+    def summary(self, symbols) -> dict:
+        where, params = _symbol_filter(symbols)
+        total, executed, closed = self._query(
+            f"SELECT COUNT(*), COALESCE(SUM(status = 'executed'), 0), COALESCE(SUM(log_type = 'closed'), 0) "
+            f"FROM trades WHERE {where}", params
+        )[0]
+        return {"total": total, "executed": executed, "closed": closed}
+
+    def history(self, symbols, limit: int = None) -> pd.DataFrame:
+        """Full records, newest first."""
+        where, params = _symbol_filter(symbols)
+        sql = f"SELECT data FROM trades WHERE {where} ORDER BY timestamp DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params = params + (limit,)
+        return pd.DataFrame([json.loads(r[0]) for r in self._query(sql, params)])
+
+    def closed_pnl(self, symbols) -> pd.DataFrame:
+        """Closed trades ordered by exit time with their cumulative PnL."""
+        where, params = _symbol_filter(symbols)
+        rows = self._query(
+            f"SELECT exit_time, pnl_usd FROM trades WHERE {where} AND log_type = 'closed' ORDER BY exit_time",
+            params
+        )
+        df = pd.DataFrame(rows, columns=["exit_time", "pnl_usd"])
+        df["cumulative_pnl"] = df["pnl_usd"].cumsum()
+        return df
+
+    def breakdown(self, symbols) -> dict:
+        where, params = _symbol_filter(symbols)
+        tp1_hits, sl_hits, mean_pnl = self._query(
+            f"SELECT COALESCE(SUM(tp1_hit), 0), COALESCE(SUM(sl_hit), 0), AVG(pnl_usd) "
+            f"FROM trades WHERE {where} AND log_type = 'closed'", params
+        )[0]
+        directions = self._query(
+            f"SELECT direction, COUNT(*) FROM trades WHERE {where} AND log_type = 'closed' "
+            f"AND direction IS NOT NULL GROUP BY direction ORDER BY COUNT(*) DESC", params
+        )
+        return {
+            "tp1_hits": tp1_hits,
+            "sl_hits": sl_hits,
+            "mean_pnl": mean_pnl if mean_pnl is not None else float("nan"),
+            "directions": pd.Series(dict(directions), name="direction", dtype="int64"),
+        }
+
+
+# === Internal Helpers ===
+def _row(record: dict) -> tuple:
+    values = []
+    for field in INDEXED_FIELDS:
+        value = record.get(field)
+        values.append(int(value) if isinstance(value, bool) else value)
+    return tuple(values) + (json.dumps(record),)
+
+def _symbol_filter(symbols):
+    if symbols is None:
+        return "1 = 1", ()
+    symbols = list(symbols)
+    if not symbols:
+        return "0 = 1", ()
+    return f"symbol IN ({', '.join('?' * len(symbols))})", tuple(symbols)
@@ -5,10 +5,10 @@ This script handles live trade execution logic for the BTCUSD AI trading system.
 It performs:
 1. Market condition checks (e.g. spread, cooldown, opposing trades)
 2. SL/TP calculation based on predefined USD values
-3. Trade execution via MetaTrader5 using a confirmed filling mode (FOK)
+3. Trade execution via the MT5 (or replay) backend using a confirmed filling mode (FOK)
 4. Trade logging through the logger module
 """
-import MetaTrader5 as mt5
+from utils.broker import mt5
 import datetime
 from utils import logger
 
@@ -37,7 +37,7 @@ def check_open_trades(symbol):
     return len(positions or []) >= MAX_OPEN_TRADES
 
 def cooldown_check(symbol):
-    now = datetime.datetime.now()
+    now = mt5.now()  # backend clock, so cooldowns also hold under accelerated replay
     if symbol not in last_trade_time:
         return False
     elapsed = (now - last_trade_time[symbol]).total_seconds() / 60
@@ -76,7 +76,7 @@ def execute_trade(symbol, direction, lot, sl, tp, price):
     if result.retcode != mt5.TRADE_RETCODE_DONE:
         return {"status": "failed", "reason": result.comment}
 
-    last_trade_time[symbol] = datetime.datetime.now()
+    last_trade_time[symbol] = mt5.now()
     return {"status": "executed", "ticket": result.order}
 
 # === Main Entry Point ===
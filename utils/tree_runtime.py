@@ -0,0 +1,186 @@
+# utils/tree_runtime.py
+
+"""
+NumPy evaluator for the XGBoost member of the ensemble (xgboost_model.json), selectable
+with XGB_BACKEND=numpy in utils/predictor. All trees are packed into flat node arrays
+and every (row, tree) pair descends one level per step, so a prediction is
+max_depth rounds of vectorised gathers instead of a call into the xgboost library.
+It follows XGBoost's own arithmetic: float32 features and split thresholds, `x < threshold`
+goes left, NaN takes the default branch, and each class margin starts at base_score and
+adds its trees' leaf values in tree order in float32. check_exactness() compares the
+margins bit for bit and the probabilities against Booster.predict.
+
+Usage (exactness check against the xgboost library on random and threshold-valued inputs):
+    python -m utils.tree_runtime check [MODEL_JSON]
+"""
+
+import json
+import sys
+
+import numpy as np
+
+CHUNK_ROWS = 2048  # rows evaluated at once; node-state arrays are rows x trees
+PROBABILITY_TOLERANCE = 1e-6
+SUPPORTED_OBJECTIVES = ("multi:softprob", "binary:logistic", "reg:squarederror")
+
+
+# === Runtime ===
+class NumpyTreeEnsemble:
+    """Packed gbtree model; predict_proba() returns what Booster.predict() returns."""
+
+    def __init__(self, model: dict):
+        learner = model["learner"]
+        self.objective = learner["objective"]["name"]
+        if self.objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {self.objective}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster: {learner['gradient_booster']['name']}")
+
+        params = learner["learner_model_param"]
+        self.num_features = int(params["num_feature"])
+        self.feature_names = learner.get("feature_names") or None
+        self.num_groups = max(int(params["num_class"]), 1)
+        base_score = params["base_score"]
+        base = np.array(json.loads(base_score) if base_score.startswith("[") else [float(base_score)],
+                        dtype=np.float32)
+        if self.objective == "binary:logistic":
+            # base_score is stored as a probability; XGBoost takes -logf(1/p - 1) with the
+            # argument in float32, and a float64 log of that argument rounds to the same float32
+            base = -np.log((np.float32(1) / base - np.float32(1)).astype(np.float64))
+        self.base_margin = np.broadcast_to(base, (self.num_groups,)).astype(np.float32)
+
+        booster = learner["gradient_booster"]["model"]
+        self.tree_group = np.asarray(booster["tree_info"], dtype=np.intp)
+        self._pack(booster["trees"])
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def _pack(self, trees):
+        # Node j of tree t lives at t * width + j; leaves point at themselves, so extra
+        # descent steps past a shallow leaf are no-ops
+        width = max(len(tree["left_children"]) for tree in trees)
+        size = len(trees) * width
+        self.feature = np.zeros(size, dtype=np.intp)
+        self.threshold = np.zeros(size, dtype=np.float32)
+        self.left = np.zeros(size, dtype=np.intp)
+        self.right = np.zeros(size, dtype=np.intp)
+        self.missing = np.zeros(size, dtype=np.intp)
+        self.value = np.zeros(size, dtype=np.float32)
+        self.max_depth = 0
+
+        for t, tree in enumerate(trees):
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+            left = np.asarray(tree["left_children"], dtype=np.intp)
+            right = np.asarray(tree["right_children"], dtype=np.intp)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            n, offset = len(left), t * width
+            nodes = np.arange(n)
+            leaf = left == -1
+            left = np.where(leaf, nodes, left) + offset
+            right = np.where(leaf, nodes, right) + offset
+
+            span = slice(offset, offset + n)
+            self.feature[span] = np.where(leaf, 0, tree["split_indices"])
+            self.threshold[span] = conditions
+            self.left[span], self.right[span] = left, right
+            self.missing[span] = np.where(np.asarray(tree["default_left"], dtype=bool), left, right)
+            self.value[span] = np.where(leaf, conditions, 0)  # a leaf's split_condition is its value
+
+            depth = np.zeros(n, dtype=np.intp)
+            for node in range(n):  # children always follow their parent
+                if not leaf[node]:
+                    depth[tree["left_children"][node]] = depth[tree["right_children"][node]] = depth[node] + 1
+            self.max_depth = max(self.max_depth, int(depth.max()))
+
+        self.roots = np.arange(len(trees), dtype=np.intp) * width
+        self.group_trees = [np.flatnonzero(self.tree_group == g) for g in range(self.num_groups)]
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """(rows, trees) leaf value reached by every row in every tree."""
+        rows = np.arange(len(X), dtype=np.intp)[:, None] * self.num_features
+        flat = X.ravel()
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = flat[rows + self.feature[node]]
+            step = np.where(x < self.threshold[node], self.left[node], self.right[node])
+            node = np.where(np.isnan(x), self.missing[node], step)
+        return self.value[node]
+
+    def predict_margin(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.num_features:
+            raise ValueError(f"Expected (rows, {self.num_features}) input, got {X.shape}")
+        margin = np.empty((len(X), self.num_groups), dtype=np.float32)
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.leaf_values(X[start:start + CHUNK_ROWS])
+            for g, trees in enumerate(self.group_trees):
+                # cumsum adds left to right in float32, the order XGBoost accumulates trees in
+                terms = np.concatenate([np.full((len(leaves), 1), self.base_margin[g]), leaves[:, trees]], axis=1)
+                margin[start:start + len(leaves), g] = np.cumsum(terms, axis=1)[:, -1]
+        return margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        margin = self.predict_margin(X)
+        if self.objective == "multi:softprob":
+            z = np.exp(margin - margin.max(axis=1, keepdims=True))
+            return z / z.sum(axis=1, keepdims=True)
+        if self.objective == "binary:logistic":
+            return (1 / (1 + np.exp(-margin[:, 0]))).astype(np.float32)
+        return margin[:, 0]
+
+
+# === Exactness check ===
+def exactness_inputs(ensemble: NumpyTreeEnsemble, rows: int = 2000, seed: int = 0) -> np.ndarray:
+    """Random rows where a third of the values sit exactly on split thresholds and some are NaN."""
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((rows, ensemble.num_features)).astype(np.float32)
+    splits = ensemble.left != np.arange(len(ensemble.left))
+    on_threshold = rng.random(X.shape) < 1 / 3
+    for f in range(ensemble.num_features):
+        thresholds = ensemble.threshold[splits & (ensemble.feature == f)]
+        if len(thresholds):
+            pick = on_threshold[:, f]
+            X[pick, f] = rng.choice(thresholds, pick.sum())
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+def check_exactness(booster, ensemble: NumpyTreeEnsemble, X: np.ndarray) -> dict:
+    import xgboost as xgb
+    dmatrix = xgb.DMatrix(X, feature_names=booster.feature_names)
+    expected_margin = booster.predict(dmatrix, output_margin=True).reshape(len(X), -1)
+    margin = ensemble.predict_margin(X)
+    proba_diff = np.abs(booster.predict(dmatrix).reshape(len(X), -1) -
+                        ensemble.predict_proba(X).reshape(len(X), -1)).max()
+    return {
+        "rows": len(X),
+        "margin_mismatches": int((expected_margin.view(np.int32) != margin.view(np.int32)).sum()),
+        "max_margin_diff": float(np.abs(expected_margin - margin).max()),
+        "max_proba_diff": float(proba_diff),
+    }
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] != "check":
+        print(__doc__)
+        return 1
+    path = argv[2] if len(argv) > 2 else "newmodels/xgboost_model.json"
+
+    import xgboost as xgb
+    booster = xgb.Booster()
+    booster.load_model(path)
+    ensemble = NumpyTreeEnsemble.load(path)
+    report = check_exactness(booster, ensemble, exactness_inputs(ensemble))
+    print(f" {path}: {len(ensemble.roots)} trees, depth {ensemble.max_depth}, {report['rows']} rows")
+    print(f"   margins differing from Booster.predict: {report['margin_mismatches']} "
+          f"(max |diff| {report['max_margin_diff']:.2e})")
+    print(f"   max |probability diff|: {report['max_proba_diff']:.2e}")
+    ok = report["margin_mismatches"] == 0 and report["max_proba_diff"] <= PROBABILITY_TOLERANCE
+    print(" Exact." if ok else " Mismatch beyond tolerance!")
+    return 0 if ok else 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,92 @@
+# validate_resampled_bars.py
+
+"""
+Checks that H1/H4/D1 bars built locally from M15 (utils.datafeed.resample_ohlcv)
+match the broker's native bars before enabling RESAMPLE_HIGHER_TIMEFRAMES.
+NUM_BARS is the M15 window (as num_candles in get_merged_ohlcv); the resampled bars
+cover that window plus one day. For each timeframe it reports bars missing on either side and, per column,
+how many overlapping closed bars differ and by how much. When daily bars disagree
+it also scans session offsets to suggest a SESSION_OFFSET_HOURS value.
+
+Usage:
+    python validate_resampled_bars.py [SYMBOL] [NUM_BARS] [SESSION_OFFSET_HOURS]
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.broker import mt5
+from utils.datafeed import SESSION_OFFSET_HOURS, TIMEFRAME_SECONDS, get_mt5_data, resample_ohlcv
+
+PRICE_TOLERANCE = 1e-9
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def diff_bars(native: pd.DataFrame, resampled: pd.DataFrame) -> dict:
+    # The last bar of each side may still be forming, so only closed bars are compared
+    native, resampled = native.iloc[:-1], resampled.iloc[:-1]
+    start = max(native["Timestamp"].iloc[0], resampled["Timestamp"].iloc[0])
+    end = min(native["Timestamp"].iloc[-1], resampled["Timestamp"].iloc[-1])
+    native = native[native["Timestamp"].between(start, end)]
+    resampled = resampled[resampled["Timestamp"].between(start, end)]
+
+    both = native.merge(resampled, on="Timestamp", how="outer", suffixes=("_native", "_resampled"), indicator=True)
+    matched = both[both["_merge"] == "both"]
+    report = {
+        "compared": len(matched),
+        "only_native": int((both["_merge"] == "left_only").sum()),
+        "only_resampled": int((both["_merge"] == "right_only").sum()),
+        "columns": {},
+    }
+    for col in COLUMNS:
+        delta = np.abs(matched[f"{col}_native"].to_numpy(dtype=float) - matched[f"{col}_resampled"].to_numpy(dtype=float))
+        tolerance = 0 if col == "Volume" else PRICE_TOLERANCE
+        report["columns"][col] = {"mismatched": int((delta > tolerance).sum()),
+                                  "max_abs_diff": float(delta.max()) if len(delta) else 0.0}
+    return report
+
+def best_session_offset(base: pd.DataFrame, native_daily: pd.DataFrame):
+    """Offset (whole hours) whose daily buckets agree with the most native daily bars."""
+    scores = {}
+    for hours in range(24):
+        report = diff_bars(native_daily, resample_ohlcv(base, "D1", hours))
+        wrong = sum(c["mismatched"] for c in report["columns"].values())
+        scores[hours] = report["compared"] - wrong / len(COLUMNS)
+    return max(scores, key=scores.get)
+
+def main(argv):
+    symbol = argv[1] if len(argv) > 1 else "BTCUSD"
+    num_bars = int(argv[2]) if len(argv) > 2 else 200
+    offset = float(argv[3]) if len(argv) > 3 else SESSION_OFFSET_HOURS
+
+    if not mt5.initialize():
+        print(f" MT5 initialization failed: {mt5.last_error()}")
+        return 1
+    try:
+        # Same M15 request as get_merged_ohlcv with RESAMPLE_HIGHER_TIMEFRAMES; bars are
+        # compared where both sides overlap, i.e. over the window the live merge uses
+        base_count = num_bars + TIMEFRAME_SECONDS["D1"] // TIMEFRAME_SECONDS["M15"]
+        base = get_mt5_data(symbol, "M15", base_count)
+        clean = True
+        for timeframe in ("H1", "H4", "D1"):
+            native = get_mt5_data(symbol, timeframe, num_bars)
+            report = diff_bars(native, resample_ohlcv(base, timeframe, offset))
+            print(f" {symbol} {timeframe}: compared {report['compared']} bars, "
+                  f"{report['only_native']} only in MT5, {report['only_resampled']} only resampled")
+            for col, stats in report["columns"].items():
+                print(f"   {col:<6} mismatched {stats['mismatched']:>5}  max |diff| {stats['max_abs_diff']:.6g}")
+            bad = report["only_native"] + report["only_resampled"] + \
+                sum(c["mismatched"] for c in report["columns"].values())
+            clean = clean and bad == 0
+            if timeframe == "D1" and bad:
+                print(f" Daily bars disagree; best matching SESSION_OFFSET_HOURS: {best_session_offset(base, native)}")
+    finally:
+        mt5.shutdown()
+
+    print(" Resampled bars match MT5." if clean else " Resampled bars differ from MT5; see above.")
+    return 0 if clean else 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))